@@ -4,12 +4,14 @@ import uuid
 import plotly.graph_objs as go
 import plotly.offline as pyo
 
+from backend.api.shared_state import SharedMapping, shared_backend
+
 app = Flask(__name__)
 # Replace with a securely generated key
 app.secret_key = 'your_generated_secret_key'
 
-# Global dictionary to store scenarios (in-memory, not persistent)
-SCENARIOS = {}
+# Saved scenarios, shared by all worker processes (see backend/api/shared_state.py)
+SCENARIOS = SharedMapping(shared_backend, "scenarios")
 
 
 def parse_float(field):
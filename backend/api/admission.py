@@ -0,0 +1,259 @@
+"""
+Admission control for the calculation endpoints.
+
+Every request is given a cost from its shape (schedule length, detail level,
+batch size) and must pass two checks before it runs:
+
+1. The client's token bucket: each client (by IP, or by the header named in
+   ADMISSION_CLIENT_HEADER behind a proxy) earns ADMISSION_RATE cost units
+   per second up to ADMISSION_BURST. A client that has spent its budget gets
+   429 Too Many Requests with a Retry-After telling it when it can afford
+   the request.
+2. A priority lane: cheap requests go to the interactive lane, expensive ones
+   (or ones sent with "X-Priority: bulk") to the bulk lane. Each lane runs a
+   bounded number of requests at once with a short, bounded queue behind
+   them, so bulk work can never take the capacity interactive users need.
+   When a lane's queue is full, or a request has waited longer than
+   ADMISSION_QUEUE_TIMEOUT_MS, it is shed at once with 503 Service Unavailable
+   rather than left to time out.
+
+Buckets and lanes are per worker process.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional, Tuple
+
+from .calculator import estimate_calculation_cost
+from .metrics import ADMISSION_DECISIONS, ADMISSION_QUEUE_WAIT
+
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_RATE = float(os.environ.get("ADMISSION_RATE", "20"))
+ADMISSION_BURST = float(os.environ.get("ADMISSION_BURST", "40"))
+ADMISSION_BULK_COST = float(os.environ.get("ADMISSION_BULK_COST", "4"))
+ADMISSION_INTERACTIVE_SLOTS = int(os.environ.get("ADMISSION_INTERACTIVE_SLOTS", "16"))
+ADMISSION_INTERACTIVE_QUEUE = int(os.environ.get("ADMISSION_INTERACTIVE_QUEUE", "64"))
+ADMISSION_BULK_SLOTS = int(os.environ.get("ADMISSION_BULK_SLOTS", "2"))
+ADMISSION_BULK_QUEUE = int(os.environ.get("ADMISSION_BULK_QUEUE", "8"))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_MS", "1000"))
+ADMISSION_CLIENT_HEADER = os.environ.get("ADMISSION_CLIENT_HEADER", "")
+
+# A 30-year calculation with a monthly table costs 2 units: 1 to simulate, 1 to render
+REFERENCE_MONTHS = 360
+MIN_COST = 0.1
+
+# Buckets idle long enough to be full again are forgotten once there are this many clients
+MAX_TRACKED_CLIENTS = 10000
+
+def request_cost(data: Dict, multiplier: float = 1.0, batch: int = 1, rendered: bool = True) -> float:
+    """
+    Estimate the cost of a request in units of one 30-year simulation.
+
+    Args:
+        data: Dictionary containing mortgage calculation parameters
+        multiplier: Simulations the endpoint runs per request (e.g. an optimizer search)
+        batch: Number of items in the request (queries, loans, grid points)
+        rendered: Whether the schedule is returned, so its table and extra
+            views add to the cost (monthly rows cost as much as the simulation,
+            aggregated ones a quarter)
+
+    Returns:
+        float: Cost in units, at least MIN_COST
+    """
+    cost = estimate_calculation_cost(data) / REFERENCE_MONTHS
+    if rendered:
+        views = data.get("views")
+        views = [data.get("table_view") or "monthly"] + (views if isinstance(views, list) else [])
+        cost *= 1 + sum(1.0 if view == "monthly" else 0.25 for view in views)
+    return max(cost * multiplier * max(batch, 1), MIN_COST)
+
+
+def client_identity(request) -> str:
+    """
+    Rate-limiting identity of a Starlette request: the first address in
+    ADMISSION_CLIENT_HEADER when set (e.g. X-Forwarded-For behind a trusted
+    proxy), otherwise the peer address.
+    """
+    if ADMISSION_CLIENT_HEADER:
+        forwarded = request.headers.get(ADMISSION_CLIENT_HEADER)
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class AdmissionRejected(Exception):
+    """
+    A request was refused admission.
+
+    Attributes:
+        status_code: 429 when the client is over its rate, 503 when a lane is overloaded
+        detail: Human-readable reason
+        retry_after: Seconds the client should wait before retrying
+    """
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class _Lane:
+    """A bounded number of running requests with a bounded FIFO queue behind them."""
+
+    def __init__(self, name: str, slots: int, queue_limit: int):
+        self.name = name
+        self.slots = slots
+        self.queue_limit = queue_limit
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self, timeout: float) -> float:
+        """
+        Take a slot, waiting at most timeout seconds.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if self.in_flight < self.slots and not self.waiters:
+            self.in_flight += 1
+            return 0.0
+        if len(self.waiters) >= self.queue_limit:
+            raise AdmissionRejected(503, f"Server busy: the {self.name} queue is full", 1)
+
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: keep it unless cancelled
+                if isinstance(e, asyncio.TimeoutError):
+                    return time.perf_counter() - start
+                self.release()
+            else:
+                waiter.cancel()
+                self.waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise AdmissionRejected(503, f"Server busy: timed out in the {self.name} queue", 1)
+            raise
+        return time.perf_counter() - start
+
+    def release(self) -> None:
+        """Hand the slot to the oldest waiter still waiting, or free it."""
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class AdmissionController:
+    """
+    Per-client token buckets plus interactive and bulk lanes.
+    """
+
+    def __init__(self, enabled: bool = ADMISSION_ENABLED, rate: float = ADMISSION_RATE,
+                 burst: float = ADMISSION_BURST, bulk_cost: float = ADMISSION_BULK_COST,
+                 interactive_slots: int = ADMISSION_INTERACTIVE_SLOTS,
+                 interactive_queue: int = ADMISSION_INTERACTIVE_QUEUE,
+                 bulk_slots: int = ADMISSION_BULK_SLOTS, bulk_queue: int = ADMISSION_BULK_QUEUE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_MS / 1000):
+        self.enabled = enabled
+        self.rate = rate
+        self.burst = burst
+        self.bulk_cost = bulk_cost
+        self.queue_timeout = queue_timeout
+        self.lanes = {
+            "interactive": _Lane("interactive", interactive_slots, interactive_queue),
+            "bulk": _Lane("bulk", bulk_slots, bulk_queue),
+        }
+        # client -> (tokens, time of last update)
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+
+    def classify(self, cost: float, priority: Optional[str] = None) -> str:
+        """Lane for a request: bulk if it is expensive or the client asked for bulk."""
+        if cost >= self.bulk_cost or (priority or "").lower() == "bulk":
+            return "bulk"
+        return "interactive"
+
+    def take_tokens(self, client: str, cost: float) -> None:
+        """
+        Charge a request to the client's bucket.
+
+        Requests costing more than the whole burst are charged the full burst,
+        so they are slow to repeat but never impossible.
+
+        Raises:
+            AdmissionRejected: 429 if the client cannot afford the request yet
+        """
+        now = time.monotonic()
+        cost = min(cost, self.burst)
+        tokens, updated = self.buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < cost:
+            self.buckets[client] = (tokens, now)
+            retry_after = (cost - tokens) / self.rate if self.rate > 0 else 60
+            raise AdmissionRejected(429, "Rate limit exceeded: too many or too expensive requests", retry_after)
+        self.buckets[client] = (tokens - cost, now)
+        if len(self.buckets) > MAX_TRACKED_CLIENTS:
+            self._forget_idle(now)
+
+    def _forget_idle(self, now: float) -> None:
+        refill_time = self.burst / self.rate if self.rate > 0 else math.inf
+        for client, (_, updated) in list(self.buckets.items()):
+            if now - updated >= refill_time:
+                del self.buckets[client]
+
+    @asynccontextmanager
+    async def admit(self, client: str, cost: float, priority: Optional[str] = None):
+        """
+        Hold an admission slot for the duration of a request.
+
+        Args:
+            client: Client identity for rate limiting
+            cost: Request cost from request_cost
+            priority: Value of the request's X-Priority header, if any
+
+        Raises:
+            AdmissionRejected: If the request is rate limited or shed
+        """
+        if not self.enabled:
+            yield
+            return
+        lane = self.classify(cost, priority)
+        try:
+            self.take_tokens(client, cost)
+        except AdmissionRejected:
+            ADMISSION_DECISIONS.labels(lane, "rate_limited").inc()
+            raise
+        try:
+            waited = await self.lanes[lane].acquire(self.queue_timeout)
+        except AdmissionRejected:
+            ADMISSION_DECISIONS.labels(lane, "shed").inc()
+            raise
+        ADMISSION_DECISIONS.labels(lane, "admitted").inc()
+        ADMISSION_QUEUE_WAIT.labels(lane).observe(waited)
+        try:
+            yield
+        finally:
+            self.lanes[lane].release()
+
+    def stats(self) -> Dict:
+        """Current lane occupancy and the number of tracked clients."""
+        return {
+            "enabled": self.enabled,
+            "clients": len(self.buckets),
+            "lanes": {name: {"in_flight": lane.in_flight, "queued": len(lane.waiters),
+                             "slots": lane.slots, "queue_limit": lane.queue_limit}
+                      for name, lane in self.lanes.items()},
+        }
+
+
+# Initialize the shared admission controller
+admission_controller = AdmissionController()
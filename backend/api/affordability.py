@@ -0,0 +1,203 @@
+"""
+Affordability search: the most house a budget buys across grids of rates, terms and down payments.
+
+The house_price branch of solve_for_unknown answers one combination at a
+time. Here every combination of EURIBOR tenor, bank spread, loan term and
+down payment is evaluated at once with numpy broadcasting:
+
+1. The monthly budget for the installment is the maximum monthly payment
+   minus bank insurances, tightened by the maximum total cost spread over
+   the term. It depends only on the term.
+2. The largest principal that budget repays is budget * annuity factor,
+   computed on the (tenor x spread x term) grid.
+3. Combinations that cannot afford anything, or cannot reach a target house
+   price with any down payment in range, are pruned before the down payment
+   axis is broadcast, so the full four-dimensional grid is never built for them.
+4. The best options are picked with np.argpartition, and the Pareto frontier
+   with one sort and a running minimum.
+
+With a target house price, the best options are the cheapest in total.
+Without one, every option spends its whole budget, so its total cost depends
+only on the term and the cheapest would simply be the shortest terms; the
+options are ranked instead by house price per euro paid out (down payment
+plus total cost), which rewards lower rates and less interest.
+
+Rates are held for the whole term (tenor rate + spread), as in /api/calc.
+"""
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+AFFORDABILITY_MAX_POINTS = int(os.environ.get("AFFORDABILITY_MAX_POINTS", "1000000"))
+
+OPTION_FIELDS = ("tenor", "base_rate", "bank_spread", "interest_rate", "loan_term", "down_payment",
+                 "house_price", "max_house_price", "loan_amount", "monthly_payment", "monthly_total",
+                 "total_interest", "total_cost")
+
+def annuity_factor(monthly_rate: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """
+    Present value of 1 paid monthly for months months: (1 - (1 + r)^-n) / r, or n when r is 0.
+
+    Args:
+        monthly_rate: Monthly interest rates (broadcastable with months)
+        months: Number of payments
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = -np.expm1(-months * np.log1p(monthly_rate)) / monthly_rate
+    return np.where(monthly_rate == 0, months, factor)
+
+def _pareto(gain: np.ndarray, cost: np.ndarray) -> np.ndarray:
+    """
+    Indices of the points no other point beats: none has a gain at least as
+    high at a lower or equal cost (with one of them strictly better).
+
+    Returns:
+        np.ndarray: Frontier indices, by decreasing gain
+    """
+    if not len(cost):
+        return np.zeros(0, dtype=np.int64)
+    order = np.lexsort((cost, -gain))
+    sorted_cost = cost[order]
+    best_before = np.concatenate(([np.inf], np.minimum.accumulate(sorted_cost)[:-1]))
+    return order[sorted_cost < best_before]
+
+def search_affordability(base_rates: Dict[str, float], spreads: Sequence[float], loan_terms: Sequence[float],
+                         down_payment_min: float, down_payment_max: float, down_payment_steps: int,
+                         max_monthly_payment: float, max_total_cost: Optional[float] = None,
+                         bank_insurances: float = 0, house_price: Optional[float] = None,
+                         top_k: int = 10) -> Dict:
+    """
+    Evaluate every combination of tenor, spread, term and down payment against a budget.
+
+    Without a house_price, each option borrows as much as the budget allows and
+    its house price is the down payment plus that principal. With a target
+    house_price, an option is feasible when it can afford the target, and its
+    cost is that of borrowing exactly house_price - down_payment.
+
+    Args:
+        base_rates: Annual base rate in percent per EURIBOR tenor (e.g. {"3M": 2.1})
+        spreads: Bank spreads in percent
+        loan_terms: Loan terms in years
+        down_payment_min: Smallest down payment considered
+        down_payment_max: Largest down payment considered
+        down_payment_steps: Evenly spaced down payments from min to max
+        max_monthly_payment: Most the buyer pays per month, bank insurances included
+        max_total_cost: Most the loan may cost in total (installments plus insurances), if limited
+        bank_insurances: Monthly bank insurances
+        house_price: Target house price, if any
+        top_k: Number of best options to return
+
+    Returns:
+        Dictionary with the grid size, the points evaluated after pruning, the
+        feasible count, the frontier (options no other beats on house price, or
+        on down payment for a target house_price, at a lower or equal total cost),
+        the top_k best feasible options and what they are ranked by: "total_cost"
+        (lowest first) with a target house_price, otherwise "price_per_cost"
+        (house price per euro of down payment plus total cost, highest first)
+    """
+    if not base_rates or not len(spreads) or not len(loan_terms):
+        raise ValueError("At least one tenor, spread and loan term is required.")
+    if down_payment_steps < 1:
+        raise ValueError("down_payment_steps must be at least 1.")
+    if down_payment_min < 0 or down_payment_max < down_payment_min:
+        raise ValueError("Invalid down payment range: 0 <= down_payment_min <= down_payment_max is required.")
+    if top_k < 1:
+        raise ValueError("top_k must be at least 1.")
+
+    tenors = list(base_rates)
+    base = np.array([base_rates[tenor] for tenor in tenors], dtype=np.float64)
+    spreads = np.asarray(spreads, dtype=np.float64)
+    terms = np.asarray(loan_terms, dtype=np.float64)
+    months = (terms * 12).astype(np.int64)  # Whole months, as int(loan_term * 12) elsewhere
+    if (months <= 0).any():
+        raise ValueError("Loan terms must be at least one month.")
+    downs = np.linspace(down_payment_min, down_payment_max, down_payment_steps)
+    grid_points = len(base) * len(spreads) * len(terms) * len(downs)
+    if grid_points > AFFORDABILITY_MAX_POINTS:
+        raise ValueError(f"Grid too large: {grid_points} points (at most {AFFORDABILITY_MAX_POINTS}).")
+
+    # Installment budget per term
+    budget = np.full(len(months), max_monthly_payment - bank_insurances, dtype=np.float64)
+    if max_total_cost is not None:
+        budget = np.minimum(budget, max_total_cost / months - bank_insurances)
+
+    # (tenor, spread, term) grid
+    rates = (base[:, None] + spreads[None, :]) / 100 / 12
+    if (rates <= -1).any():
+        raise ValueError("Interest rate plus spread must be above -1200%.")
+    annuity = annuity_factor(rates[:, :, None], months[None, None, :])
+    max_principal = np.maximum(budget, 0)[None, None, :] * annuity
+
+    # Prune combinations before broadcasting the down payments
+    viable = max_principal > 0
+    if house_price is not None:
+        viable &= (house_price - max_principal <= down_payment_max) & (down_payment_min <= house_price)
+    combos = np.flatnonzero(viable)
+    t, s, m = np.unravel_index(combos, viable.shape)
+    principal_cap = max_principal.ravel()[combos][:, None]
+    combo_annuity = annuity.ravel()[combos][:, None]
+    combo_months = months[m][:, None]
+
+    # (combination, down payment) grid of the survivors
+    max_price = downs[None, :] + principal_cap
+    if house_price is None:
+        # Borrowing the maximum: the installment is the whole budget
+        principal = np.broadcast_to(principal_cap, max_price.shape)
+        installment = np.broadcast_to(np.maximum(budget, 0)[m][:, None], max_price.shape)
+        feasible = np.ones(max_price.shape, dtype=bool)
+    else:
+        principal = np.broadcast_to(house_price - downs[None, :], max_price.shape)
+        installment = principal / combo_annuity
+        # Relative tolerance: the target may be exactly what a combination affords
+        feasible = (principal >= 0) & (principal <= principal_cap * (1 + 1e-12))
+    total_cost = (installment + bank_insurances) * combo_months
+
+    rows, cols = np.nonzero(feasible)
+    cost = total_cost[rows, cols]
+    price = max_price[rows, cols] if house_price is None else np.full(len(rows), float(house_price))
+
+    # Lowest score first, then the higher house price: keep every tie with the k-th score
+    if house_price is None:
+        ranked_by = "price_per_cost"
+        score = -price / (downs[cols] + cost)
+    else:
+        ranked_by = "total_cost"
+        score = cost
+    if len(score) > top_k:
+        kth_score = score[np.argpartition(score, top_k - 1)[top_k - 1]]
+        candidates = np.flatnonzero(score <= kth_score)
+    else:
+        candidates = np.arange(len(score))
+    best = candidates[np.lexsort((-price[candidates], score[candidates]))][:top_k]
+    frontier = _pareto(price if house_price is None else -downs[cols], cost)
+
+    def options(indices: np.ndarray) -> List[Dict]:
+        r, c = rows[indices], cols[indices]
+        tenor_index, spread_index, term_index = t[r], s[r], m[r]
+        values = {
+            "base_rate": base[tenor_index],
+            "bank_spread": spreads[spread_index],
+            "interest_rate": base[tenor_index] + spreads[spread_index],
+            "loan_term": terms[term_index],
+            "down_payment": downs[c],
+            "house_price": price[indices],
+            "max_house_price": max_price[r, c],
+            "loan_amount": principal[r, c],
+            "monthly_payment": installment[r, c],
+            "monthly_total": installment[r, c] + bank_insurances,
+            "total_interest": installment[r, c] * combo_months[r, 0] - principal[r, c],
+            "total_cost": total_cost[r, c],
+        }
+        columns = {name: values[name].tolist() for name in values}
+        columns["tenor"] = [tenors[i] for i in tenor_index.tolist()]
+        return [dict(zip(OPTION_FIELDS, row)) for row in zip(*(columns[name] for name in OPTION_FIELDS))]
+
+    return {
+        "grid_points": grid_points,
+        "evaluated": int(feasible.size),
+        "feasible": int(len(cost)),
+        "frontier": options(frontier),
+        "best": options(best),
+        "ranked_by": ranked_by,
+    }
@@ -0,0 +1,135 @@
+"""
+Aggregation of a monthly amortization schedule into periods.
+
+The simulation produces the schedule as columns (one list or numpy array per
+field, one element per month). Every view is a set of bucket start months: flow
+columns (payment, extra, fee, interest, principal) are summed per bucket
+with one np.add.reduceat over all columns at once, and the balance is the
+balance at the end of each bucket. Any number of views can be built from one
+simulation.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Columns of a monthly schedule, in row order
+SCHEDULE_COLUMNS = ("payment", "extra", "fee", "interest", "principal", "balance")
+FLOW_COLUMNS = ("payment", "extra", "fee", "interest", "principal")
+
+VIEWS = ("monthly", "quarterly", "yearly", "rate_period", "custom")
+
+def bucket_starts(duration: int, view: str, fixed_months: int = 0,
+                  custom_buckets: Optional[Sequence[int]] = None) -> np.ndarray:
+    """
+    First month index (0-based) of every bucket of a view.
+
+    Args:
+        duration: Number of months in the schedule
+        view: "quarterly", "yearly", "rate_period" (fixed-rate period, then
+            after the rate reset) or "custom"
+        fixed_months: Months at the initial rate, for "rate_period"
+        custom_buckets: Last month of each bucket for "custom"; months after
+            the last one form a final bucket
+
+    Returns:
+        np.ndarray: Sorted bucket start indices, starting with 0
+    """
+    if view == "quarterly":
+        return np.arange(0, duration, 3)
+    if view == "yearly":
+        return np.arange(0, duration, 12)
+    if view == "rate_period":
+        ends = [fixed_months] if 0 < fixed_months < duration else []
+    elif view == "custom":
+        if not custom_buckets:
+            raise ValueError("The custom view requires custom_buckets (the last month of each bucket).")
+        ends = sorted({int(month) for month in custom_buckets if 0 < int(month) < duration})
+    else:
+        raise ValueError(f"Invalid view: {view}. Must be one of {list(VIEWS)}")
+    return np.array([0] + ends, dtype=np.int64)
+
+def aggregate(columns: Dict[str, Sequence], starts: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Sum the flow columns per bucket and take each bucket's closing balance.
+
+    Args:
+        columns: Monthly schedule columns (SCHEDULE_COLUMNS), all the same length
+        starts: Bucket start indices from bucket_starts
+
+    Returns:
+        Dict[str, np.ndarray]: One element per bucket for every column, plus
+        the 1-based start_month and end_month of each bucket
+    """
+    duration = len(columns["balance"])
+    if duration == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return dict({name: np.asarray(columns[name])[:0] for name in SCHEDULE_COLUMNS},
+                    start_month=empty, end_month=empty)
+
+    flows = np.vstack([columns[name] for name in FLOW_COLUMNS])
+    sums = np.add.reduceat(flows, starts, axis=1)
+    ends = np.append(starts[1:], duration) - 1
+    result = {name: sums[i] for i, name in enumerate(FLOW_COLUMNS)}
+    result["balance"] = np.asarray(columns["balance"])[ends]
+    result["start_month"] = starts + 1
+    result["end_month"] = ends + 1
+    return result
+
+def _as_list(column: Sequence) -> list:
+    return column if isinstance(column, list) else column.tolist()
+
+def _rows(columns: Dict[str, Sequence], names: Sequence[str], unit: int) -> List[Dict]:
+    """Turn columns into a list of row dicts, dividing amounts by unit (100 for cents)."""
+    values = [_as_list(columns[name]) for name in names]
+    if unit != 1:
+        values = [values[0]] + [[value / unit for value in column] for column in values[1:]]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+def schedule_view(columns: Dict[str, Sequence], view: str = "monthly", fixed_months: int = 0,
+                  custom_buckets: Optional[Sequence[int]] = None, unit: int = 1) -> List[Dict]:
+    """
+    Render one view of a monthly schedule as rows.
+
+    Monthly rows carry month and period (both the month number); aggregated
+    rows carry period (the bucket number), start_month and end_month.
+
+    Args:
+        columns: Monthly schedule columns (SCHEDULE_COLUMNS)
+        view: One of VIEWS
+        fixed_months: Months at the initial rate, for "rate_period"
+        custom_buckets: Last month of each bucket, for "custom"
+        unit: Amounts are divided by this (100 for integer cents)
+
+    Returns:
+        List[Dict]: Schedule rows
+    """
+    duration = len(columns["balance"])
+    if view == "monthly":
+        values = [_as_list(columns[name]) for name in SCHEDULE_COLUMNS]
+        if unit != 1:
+            values = [[value / unit for value in column] for column in values]
+        return [{"month": month, "payment": payment, "extra": extra, "fee": fee, "interest": interest,
+                 "principal": principal, "balance": balance, "period": month}
+                for month, payment, extra, fee, interest, principal, balance
+                in zip(range(1, duration + 1), *values)]
+
+    buckets = aggregate(columns, bucket_starts(duration, view, fixed_months, custom_buckets))
+    buckets["period"] = np.arange(1, len(buckets["balance"]) + 1)
+    rows = _rows(buckets, ("period",) + SCHEDULE_COLUMNS, unit)
+    for row, start, end in zip(rows, buckets["start_month"].tolist(), buckets["end_month"].tolist()):
+        row["start_month"] = start
+        row["end_month"] = end
+    return rows
+
+def schedule_views(columns: Dict[str, Sequence], views: Sequence[str], fixed_months: int = 0,
+                   custom_buckets: Optional[Sequence[int]] = None, unit: int = 1) -> Dict[str, List[Dict]]:
+    """
+    Render several views of one simulated schedule.
+
+    Returns:
+        Dict[str, List[Dict]]: Rows of each requested view, keyed by view name
+    """
+    for view in views:
+        if view not in VIEWS:
+            raise ValueError(f"Invalid view: {view}. Must be one of {list(VIEWS)}")
+    return {view: schedule_view(columns, view, fixed_months, custom_buckets, unit) for view in dict.fromkeys(views)}
@@ -1,5 +1,8 @@
 import math
-from typing import Dict, List, Optional, Tuple
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .aggregation import SCHEDULE_COLUMNS, VIEWS, schedule_view, schedule_views
 
 def parse_float(value) -> Optional[float]:
     """
@@ -59,7 +62,8 @@ def solve_for_unknown(data: Dict) -> Dict:
         data: Dictionary containing mortgage calculation parameters
         
     Returns:
-        Dictionary with calculated field and value
+        Dictionary with calculated field and value, plus the number of solver
+        iterations used (0 for closed-form solutions)
     """
     house_price = parse_float(data.get("house_price"))
     down_payment = parse_float(data.get("down_payment"))
@@ -86,6 +90,7 @@ def solve_for_unknown(data: Dict) -> Dict:
             "Please leave exactly one required field empty so that it can be calculated automatically.")
     
     unknown = missing[0]
+    iterations = 0
     
     if unknown == "house_price":
         r = effective_interest_rate(interest_rate, bank_spread)
@@ -126,6 +131,7 @@ def solve_for_unknown(data: Dict) -> Dict:
         
         r_guess = 0.01
         for i in range(100):
+            iterations = i + 1
             f_val = f(r_guess)
             fp = fprime(r_guess)
             if fp == 0:
@@ -146,18 +152,20 @@ def solve_for_unknown(data: Dict) -> Dict:
     else:
         calc = 0
     
-    return {"calculated_field": unknown, "calculated_value": calc}
+    return {"calculated_field": unknown, "calculated_value": calc, "iterations": iterations}
 
-def simulate_amortization(data: Dict, computed_monthly_payment: Optional[float]) -> Tuple[List[Dict], float, float, int]:
+def loan_parameters(data: Dict, computed_monthly_payment: Optional[float]) -> Dict:
     """
-    Simulate amortization schedule.
+    Parse the parameters that drive an amortization simulation.
     
     Args:
         data: Dictionary containing mortgage calculation parameters
         computed_monthly_payment: Pre-computed monthly payment if available
         
     Returns:
-        Tuple of (schedule, total_interest, total_cost, duration)
+        Dictionary with principal, monthly_payment, bank_insurances, extra_monthly,
+        extra_annual, extra_fee_rate, term_months, fixed_months and the monthly
+        rates r_fixed (first fixed_months months) and r_adjusted (afterwards)
     """
     house_price = parse_float(data.get("house_price"))
     down_payment = parse_float(data.get("down_payment"))
@@ -165,21 +173,11 @@ def simulate_amortization(data: Dict, computed_monthly_payment: Optional[float])
     interest_rate = parse_float(data.get("interest_rate"))
     bank_spread = parse_float(data.get("bank_spread"))
     monthly_payment = parse_float(data.get("monthly_payment"))
-    bank_insurances = parse_float(data.get("bank_insurances")) or 0
-    extra_monthly = parse_float(data.get("extra_monthly")) or 0
-    extra_annual = parse_float(data.get("extra_annual")) or 0
-    extra_fee_rate = parse_float(data.get("extra_fee_rate")) or 0
     loan_type = data.get("loan_type", "fixed")
     fixed_period = parse_float(data.get("fixed_period")) if data.get("fixed_period") else None
     adjusted_interest_rate = parse_float(data.get("adjusted_interest_rate")) if data.get("adjusted_interest_rate") else None
-    table_view = data.get("table_view", "monthly")
     
     principal = house_price - down_payment if house_price is not None and down_payment is not None else 0
-    balance = principal
-    schedule = []
-    total_interest = 0
-    total_fee = 0
-    month = 0
     n = int(loan_term * 12) if loan_term is not None else 0
     
     # Determine interest rate behavior based on loan type:
@@ -200,7 +198,48 @@ def simulate_amortization(data: Dict, computed_monthly_payment: Optional[float])
     if monthly_payment is None:
         monthly_payment = computed_monthly_payment
     
-    monthly_schedule = []
+    return {
+        "principal": principal,
+        "monthly_payment": monthly_payment,
+        "bank_insurances": parse_float(data.get("bank_insurances")) or 0,
+        "extra_monthly": parse_float(data.get("extra_monthly")) or 0,
+        "extra_annual": parse_float(data.get("extra_annual")) or 0,
+        "extra_fee_rate": parse_float(data.get("extra_fee_rate")) or 0,
+        "term_months": n,
+        "fixed_months": fixed_months,
+        "r_fixed": r_fixed,
+        "r_adjusted": r_adjusted
+    }
+
+def simulate_schedule(data: Dict, computed_monthly_payment: Optional[float]) -> Tuple[Dict[str, List[float]], float, float, int]:
+    """
+    Simulate the monthly amortization schedule as columns.
+    
+    Args:
+        data: Dictionary containing mortgage calculation parameters
+        computed_monthly_payment: Pre-computed monthly payment if available
+        
+    Returns:
+        Tuple of (columns, total_interest, total_cost, duration) where columns
+        maps each of SCHEDULE_COLUMNS to a list with one element per month
+    """
+    params = loan_parameters(data, computed_monthly_payment)
+    principal = params["principal"]
+    monthly_payment = params["monthly_payment"]
+    bank_insurances = params["bank_insurances"]
+    extra_monthly = params["extra_monthly"]
+    extra_annual = params["extra_annual"]
+    extra_fee_rate = params["extra_fee_rate"]
+    fixed_months = params["fixed_months"]
+    r_fixed = params["r_fixed"]
+    r_adjusted = params["r_adjusted"]
+    
+    balance = principal
+    total_interest = 0
+    total_fee = 0
+    month = 0
+    
+    payments, extras, fees, interests, principals, balances = [], [], [], [], [], []
     while balance > 0.01 and month < 1000:
         month += 1
         current_r = r_fixed if month <= fixed_months else r_adjusted
@@ -223,56 +262,214 @@ def simulate_amortization(data: Dict, computed_monthly_payment: Optional[float])
         total_interest += interest if interest is not None else 0
         total_fee += fee if fee is not None else 0
         
-        monthly_schedule.append({
-            "month": month,
-            "payment": payment,
-            "extra": extra,
-            "fee": fee,
-            "interest": interest,
-            "principal": principal_payment + extra,
-            "balance": max(balance, 0) if balance is not None else 0
-        })
-    
-    aggregated_schedule = []
-    if table_view == "yearly":
-        current_year = 1
-        year_data = {"payment": 0, "extra": 0, "fee": 0,
-                     "interest": 0, "principal": 0, "balance": None}
-        for row in monthly_schedule:
-            year_data["payment"] += row["payment"]
-            year_data["extra"] += row["extra"]
-            year_data["fee"] += row["fee"]
-            year_data["interest"] += row["interest"]
-            year_data["principal"] += row["principal"]
-            year_data["balance"] = row["balance"]
-            if row["month"] % 12 == 0:
-                aggregated_schedule.append({
-                    "period": current_year,
-                    "payment": year_data["payment"],
-                    "extra": year_data["extra"],
-                    "fee": year_data["fee"],
-                    "interest": year_data["interest"],
-                    "principal": year_data["principal"],
-                    "balance": year_data["balance"]
-                })
-                current_year += 1
-                year_data = {"payment": 0, "extra": 0, "fee": 0,
-                             "interest": 0, "principal": 0, "balance": None}
-        if monthly_schedule and monthly_schedule[-1]["month"] % 12 != 0:
-            aggregated_schedule.append({
-                "period": current_year,
-                "payment": year_data["payment"],
-                "extra": year_data["extra"],
-                "fee": year_data["fee"],
-                "interest": year_data["interest"],
-                "principal": year_data["principal"],
-                "balance": year_data["balance"]
-            })
-    else:
-        for row in monthly_schedule:
-            row["period"] = row["month"]
-            aggregated_schedule.append(row)
+        payments.append(payment)
+        extras.append(extra)
+        fees.append(fee)
+        interests.append(interest)
+        principals.append(principal_payment + extra)
+        balances.append(max(balance, 0) if balance is not None else 0)
     
-    total_payments = sum([row["payment"] for row in monthly_schedule]) + bank_insurances * len(monthly_schedule) if monthly_schedule else 0
+    columns = dict(zip(SCHEDULE_COLUMNS, (payments, extras, fees, interests, principals, balances)))
+    total_payments = sum(payments) + bank_insurances * month if month else 0
     total_cost = total_payments + total_fee
-    return aggregated_schedule, total_interest, total_cost, month
\ No newline at end of file
+    return columns, total_interest, total_cost, month
+
+def simulate_amortization(data: Dict, computed_monthly_payment: Optional[float]) -> Tuple[List[Dict], float, float, int]:
+    """
+    Simulate amortization schedule.
+    
+    Args:
+        data: Dictionary containing mortgage calculation parameters
+        computed_monthly_payment: Pre-computed monthly payment if available
+        
+    Returns:
+        Tuple of (schedule, total_interest, total_cost, duration); the schedule
+        is in the granularity of data["table_view"] (monthly by default)
+    """
+    columns, total_interest, total_cost, duration = simulate_schedule(data, computed_monthly_payment)
+    schedule = render_table_view(columns, data, computed_monthly_payment)
+    return schedule, total_interest, total_cost, duration
+
+def render_table_view(columns: Dict[str, Sequence], data: Dict, computed_monthly_payment: Optional[float],
+                      unit: int = 1) -> List[Dict]:
+    """
+    Render a simulated schedule in the request's table_view.
+    
+    Unknown table views fall back to monthly rows.
+    
+    Args:
+        columns: Monthly schedule columns
+        data: Dictionary containing mortgage calculation parameters
+        computed_monthly_payment: Pre-computed monthly payment if available
+        unit: Amounts are divided by this (100 for integer cents)
+        
+    Returns:
+        List of schedule rows
+    """
+    view = data.get("table_view", "monthly")
+    if view not in VIEWS:
+        view = "monthly"
+    fixed_months = loan_parameters(data, computed_monthly_payment)["fixed_months"] if view == "rate_period" else 0
+    return schedule_view(columns, view, fixed_months, data.get("custom_buckets"), unit)
+
+def summarize_amortization(data: Dict, computed_monthly_payment: Optional[float],
+                           lump_sum: float = 0) -> Tuple[float, float, int]:
+    """
+    Compute the totals of simulate_amortization without building the schedule.
+    
+    Runs the same month-by-month loop (extra payments, extra_fee_rate, rate
+    reset) but keeps only running sums, which makes it cheap enough to call
+    repeatedly from the optimizers. Instead of the total cost of
+    simulate_amortization, which counts installments, fees and insurances but
+    not extra payments, it returns the total outlay: everything the borrower
+    pays out, extra payments included, so targets on it cannot be met by
+    moving money into extra payments.
+    
+    Args:
+        data: Dictionary containing mortgage calculation parameters
+        computed_monthly_payment: Pre-computed monthly payment if available
+        lump_sum: One-off extra payment made at the start of the loan; it is
+            charged extra_fee_rate like any other extra payment and counted
+            in the total outlay
+        
+    Returns:
+        Tuple of (total_interest, total_outlay, duration)
+    """
+    params = loan_parameters(data, computed_monthly_payment)
+    monthly_payment = params["monthly_payment"] or 0
+    extra_monthly = params["extra_monthly"]
+    extra_annual = params["extra_annual"]
+    fee_rate = params["extra_fee_rate"] / 100
+    fixed_months = params["fixed_months"]
+    r_fixed = params["r_fixed"] or 0
+    r_adjusted = params["r_adjusted"] or 0
+    
+    lump_sum = min(max(lump_sum, 0), params["principal"])
+    balance = params["principal"] - lump_sum
+    total_payments = lump_sum
+    total_interest = 0
+    total_fee = lump_sum * fee_rate
+    month = 0
+    
+    while balance > 0.01 and month < 1000:
+        month += 1
+        interest = balance * (r_fixed if month <= fixed_months else r_adjusted)
+        principal_payment = monthly_payment - interest
+        extra = extra_monthly + extra_annual if month % 12 == 0 else extra_monthly
+        if principal_payment + extra > balance:
+            total_payments += balance + interest
+            balance -= balance
+        else:
+            total_payments += monthly_payment + extra
+            if extra > 0:
+                total_fee += extra * fee_rate
+            balance -= principal_payment + extra
+        total_interest += interest
+    
+    total_outlay = total_payments + params["bank_insurances"] * month + total_fee
+    return total_interest, total_outlay, month
+
+def estimate_calculation_cost(data: Dict) -> int:
+    """
+    Estimate the cost of a calculation as the number of months to simulate.
+    
+    Args:
+        data: Dictionary containing mortgage calculation parameters
+        
+    Returns:
+        Estimated number of simulated months
+    """
+    loan_term = parse_float(data.get("loan_term"))
+    if loan_term is None or not loan_term > 0:
+        # Term is the unknown: the simulation may run up to its 1000 month cap
+        months = 1000
+    else:
+        months = int(min(loan_term * 12, 1000))
+    # Integer-cent months cost about five float months
+    return months * 5 if data.get("precision") == "cents" else months
+
+def run_calculation(data: Dict) -> Dict:
+    """
+    Run a full mortgage calculation: solve for the unknown and simulate amortization.
+    
+    Pure CPU work with no I/O, so it can be run on a thread or process pool.
+    
+    Args:
+        data: Dictionary containing mortgage calculation parameters
+        
+    Returns:
+        Dictionary with the fields of a calculation response
+    """
+    return run_calculation_timed(data)[0]
+
+def run_calculation_timed(data: Dict) -> Tuple[Dict, Dict]:
+    """
+    Run a full mortgage calculation and report where the time went.
+    
+    The schedule is simulated in binary floats, or in integer cents with
+    per-period rounding when data["precision"] is "cents". It is simulated
+    once and rendered in data["table_view"] plus every view listed in
+    data["views"].
+    
+    Args:
+        data: Dictionary containing mortgage calculation parameters
+        
+    Returns:
+        Tuple of (calculation response fields, stats) where stats holds the
+        "solve" and "amortize" stage timings in seconds, the solver iteration
+        count and the simulated schedule length in months
+    """
+    # Imported here: the exact engine builds on loan_parameters from this module
+    from .exact import PRECISIONS, simulate_schedule_cents
+    
+    data = dict(data)
+    precision = data.get("precision") or "float"
+    if precision not in PRECISIONS:
+        raise ValueError(f"Invalid precision: {precision}. Must be one of {list(PRECISIONS)}")
+    simulate = simulate_schedule_cents if precision == "cents" else simulate_schedule
+    unit = 100 if precision == "cents" else 1
+    
+    # Solve for unknown field
+    start = time.perf_counter()
+    unknown_result = solve_for_unknown(data)
+    solved = time.perf_counter()
+    
+    # Calculate computed monthly payment if needed
+    computed_monthly_payment = None
+    if unknown_result and unknown_result["calculated_field"] == "monthly_payment":
+        computed_monthly_payment = unknown_result["calculated_value"]
+        data["monthly_payment"] = computed_monthly_payment
+    else:
+        computed_monthly_payment = parse_float(data.get("monthly_payment"))
+    
+    # Simulate amortization
+    columns, total_interest, total_cost, duration = simulate(
+        data, computed_monthly_payment)
+    schedule = render_table_view(columns, data, computed_monthly_payment, unit)
+    views = None
+    if data.get("views"):
+        fixed_months = loan_parameters(data, computed_monthly_payment)["fixed_months"]
+        views = schedule_views(columns, data["views"], fixed_months, data.get("custom_buckets"), unit)
+    amortized = time.perf_counter()
+    
+    # Calculate total borrowed
+    house_price = parse_float(data.get("house_price"))
+    down_payment = parse_float(data.get("down_payment"))
+    total_borrowed = house_price - down_payment if house_price is not None and down_payment is not None else None
+    
+    result = {
+        "calculated_field": unknown_result["calculated_field"] if unknown_result else "None",
+        "calculated_value": unknown_result["calculated_value"] if unknown_result else 0,
+        "total_borrowed": total_borrowed,
+        "amortization": schedule,
+        "total_interest": total_interest,
+        "total_cost": total_cost,
+        "duration": duration,
+        "views": views
+    }
+    stats = {
+        "stages": {"solve": solved - start, "amortize": amortized - solved},
+        "iterations": unknown_result.get("iterations", 0) if unknown_result else 0,
+        "schedule_length": duration
+    }
+    return result, stats
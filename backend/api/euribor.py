@@ -2,14 +2,31 @@ import requests
 import pandas as pd
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+import csv
+import io
 import logging
+import os
+import time
+
+from .metrics import EURIBOR_CACHE_REQUESTS, EURIBOR_FETCH_DURATION
+from .shared_state import SharedMapping, StateBackend, shared_backend
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# ECB SDW API endpoint for EURIBOR rates
-ECB_API_URL = "https://sdw-wsrest.ecb.europa.eu/service/data"
+# Where rates come from: "mock" (random placeholder data) or "ecb" (the ECB SDW API)
+EURIBOR_SOURCE = os.environ.get("EURIBOR_SOURCE", "mock")
+
+# ECB SDW API endpoint for EURIBOR rates; point it at a stand-in for load tests
+ECB_API_URL = os.environ.get("ECB_API_URL", "https://sdw-wsrest.ecb.europa.eu/service/data")
+ECB_TIMEOUT = float(os.environ.get("ECB_TIMEOUT", "10"))
+# Connections kept open to the ECB, shared by the threadpool threads fetching rates
+ECB_POOL_SIZE = int(os.environ.get("ECB_POOL_SIZE", "40"))
+# Series frequency: "B" (business-daily fixings) or "M" (monthly averages)
+ECB_FREQUENCY = os.environ.get("ECB_FREQUENCY", "B")
+# Seconds a fetched value is kept after it goes stale, to be served when the ECB is unreachable
+EURIBOR_CACHE_RETENTION = float(os.environ.get("EURIBOR_CACHE_RETENTION", "86400"))
 
 # EURIBOR series keys for different tenors
 EURIBOR_SERIES = {
@@ -19,10 +36,46 @@ EURIBOR_SERIES = {
     "12M": "EURIBOR12MD."
 }
 
+def ecb_series_url(series_key: str) -> str:
+    """SDW data URL of a EURIBOR series, e.g. .../FM/B.U2.EUR.RT.MM.EURIBOR3MD_.HSTA"""
+    return f"{ECB_API_URL}/FM/{ECB_FREQUENCY}.U2.EUR.RT.MM.{series_key.rstrip('.')}_.HSTA"
+
+def parse_ecb_csv(text: str) -> List[Dict]:
+    """
+    Observations of an SDW "csvdata" response.
+    
+    Args:
+        text (str): Response body with TIME_PERIOD and OBS_VALUE columns
+        
+    Returns:
+        List[Dict]: Rates with dates in YYYY-MM-DD format, oldest first
+    """
+    rates = []
+    for row in csv.DictReader(io.StringIO(text)):
+        value = row.get("OBS_VALUE")
+        if not value:
+            continue
+        date = row["TIME_PERIOD"]
+        if len(date) == 7:  # Monthly series: YYYY-MM
+            date += "-01"
+        rates.append({"date": date, "rate": float(value)})
+    rates.sort(key=lambda rate: rate["date"])
+    return rates
+
 class EuriborAPI:
-    def __init__(self):
-        self.cache = {}
+    def __init__(self, backend: StateBackend = shared_backend, source: str = EURIBOR_SOURCE):
+        if source not in ("mock", "ecb"):
+            raise ValueError(f"Invalid EURIBOR_SOURCE: {source}. Must be one of ['mock', 'ecb']")
         self.cache_duration = timedelta(hours=6)  # Cache for 6 hours
+        # Shared by all workers; entries are [fetched_at timestamp, value], dropped by the
+        # backend once stale for EURIBOR_CACHE_RETENTION so distinct history ranges don't pile up
+        self.cache = SharedMapping(backend, "euribor",
+                                   ttl=self.cache_duration.total_seconds() + EURIBOR_CACHE_RETENTION)
+        self.source = source
+        # Keeps connections to the ECB open between fetches, one per threadpool thread
+        self.session = requests.Session()
+        self.session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=ECB_POOL_SIZE))
+        self.session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=ECB_POOL_SIZE))
     
     def get_latest_rate(self, tenor: str) -> Optional[float]:
         """
@@ -39,25 +92,27 @@ class EuriborAPI:
         
         # Check cache first
         cache_key = f"latest_{tenor}"
-        if cache_key in self.cache:
-            cached_time, cached_value = self.cache[cache_key]
-            if datetime.now() - cached_time < self.cache_duration:
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            cached_time, cached_value = cached
+            if time.time() - cached_time < self.cache_duration.total_seconds():
+                EURIBOR_CACHE_REQUESTS.labels("latest", "hit").inc()
                 return cached_value
+        EURIBOR_CACHE_REQUESTS.labels("latest", "miss").inc()
         
+        fetch_start = time.perf_counter()
         try:
             # Fetch data from ECB API
             series_key = EURIBOR_SERIES[tenor]
-            url = f"{ECB_API_URL}/FM/{series_key}"
-            
-            # For now, we'll return mock data since we need to implement the actual API call
-            # This is a placeholder implementation
             latest_rate = self._fetch_from_ecb(series_key)
+            EURIBOR_FETCH_DURATION.labels("latest", "success").observe(time.perf_counter() - fetch_start)
             
             # Cache the result
-            self.cache[cache_key] = (datetime.now(), latest_rate)
+            self.cache[cache_key] = (time.time(), latest_rate)
             return latest_rate
             
         except Exception as e:
+            EURIBOR_FETCH_DURATION.labels("latest", "error").observe(time.perf_counter() - fetch_start)
             logger.error(f"Error fetching EURIBOR rate for {tenor}: {str(e)}")
             # Try to return cached value if available
             return self._get_cached_value(cache_key)
@@ -79,46 +134,69 @@ class EuriborAPI:
         
         # Check cache first
         cache_key = f"history_{tenor}_{from_date}_{to_date}"
-        if cache_key in self.cache:
-            cached_time, cached_value = self.cache[cache_key]
-            if datetime.now() - cached_time < self.cache_duration:
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            cached_time, cached_value = cached
+            if time.time() - cached_time < self.cache_duration.total_seconds():
+                EURIBOR_CACHE_REQUESTS.labels("history", "hit").inc()
                 return cached_value
+        EURIBOR_CACHE_REQUESTS.labels("history", "miss").inc()
         
+        fetch_start = time.perf_counter()
         try:
             # Fetch data from ECB API
             series_key = EURIBOR_SERIES[tenor]
-            url = f"{ECB_API_URL}/FM/{series_key}"
-            
-            # For now, we'll return mock data since we need to implement the actual API call
-            # This is a placeholder implementation
             historical_rates = self._fetch_historical_from_ecb(series_key, from_date, to_date)
+            EURIBOR_FETCH_DURATION.labels("history", "success").observe(time.perf_counter() - fetch_start)
             
             # Cache the result
-            self.cache[cache_key] = (datetime.now(), historical_rates)
+            self.cache[cache_key] = (time.time(), historical_rates)
             return historical_rates
             
         except Exception as e:
+            EURIBOR_FETCH_DURATION.labels("history", "error").observe(time.perf_counter() - fetch_start)
             logger.error(f"Error fetching historical EURIBOR rates for {tenor}: {str(e)}")
             # Try to return cached value if available
             return self._get_cached_value(cache_key) or []
     
+    def _get_ecb_observations(self, series_key: str, params: Dict) -> List[Dict]:
+        """
+        Query the SDW API for observations of a series.
+        
+        Args:
+            series_key (str): Value from EURIBOR_SERIES
+            params (Dict): SDW query parameters (startPeriod, endPeriod, lastNObservations)
+            
+        Returns:
+            List[Dict]: Rates with dates, oldest first; empty when the period has no data
+        """
+        response = self.session.get(ecb_series_url(series_key), params=dict(params, format="csvdata"),
+                                    timeout=ECB_TIMEOUT)
+        if response.status_code == 404:  # SDW answers "No results found" with 404
+            return []
+        response.raise_for_status()
+        return parse_ecb_csv(response.text)
+    
     def _fetch_from_ecb(self, series_key: str) -> float:
         """
         Fetch the latest rate from ECB API.
-        This is a placeholder implementation.
+        Returns mock data unless EURIBOR_SOURCE is "ecb".
         """
-        # TODO: Implement actual ECB API call
-        # For now, return a mock value
+        if self.source == "ecb":
+            observations = self._get_ecb_observations(series_key, {"lastNObservations": 1})
+            if not observations:
+                raise ValueError(f"No observations for series {series_key}")
+            return observations[-1]["rate"]
         import random
         return round(random.uniform(0.5, 3.0), 3)
     
     def _fetch_historical_from_ecb(self, series_key: str, from_date: str, to_date: str) -> List[Dict]:
         """
         Fetch historical rates from ECB API.
-        This is a placeholder implementation.
+        Returns mock data unless EURIBOR_SOURCE is "ecb".
         """
-        # TODO: Implement actual ECB API call
-        # For now, return mock data
+        if self.source == "ecb":
+            return self._get_ecb_observations(series_key, {"startPeriod": from_date, "endPeriod": to_date})
         import random
         from datetime import datetime, timedelta
         
@@ -139,9 +217,8 @@ class EuriborAPI:
     
     def _get_cached_value(self, cache_key: str):
         """Get value from cache if it exists."""
-        if cache_key in self.cache:
-            return self.cache[cache_key][1]
-        return None
+        cached = self.cache.get(cache_key)
+        return cached[1] if cached is not None else None
 
 # Initialize the EURIBOR API instance
 euribor_api = EuriborAPI()
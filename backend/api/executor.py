@@ -0,0 +1,147 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .metrics import CALC_EXECUTOR_CALLS, CALC_EXECUTOR_QUEUE
+
+# Executor configuration (overridable through the environment)
+CALC_EXECUTOR = os.environ.get("CALC_EXECUTOR", "thread")  # thread | process | inline
+CALC_MAX_WORKERS = int(os.environ.get("CALC_MAX_WORKERS", "4"))
+CALC_MAX_CONCURRENCY = int(os.environ.get("CALC_MAX_CONCURRENCY", "8"))
+CALC_INLINE_MAX_COST = int(os.environ.get("CALC_INLINE_MAX_COST", "120"))
+
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+
+def _timed_call(fn: Callable, args: Tuple) -> Tuple[float, Any]:
+    """
+    Run a function and report the wall-clock time at which it started.
+
+    Lives at module level so it can be pickled for process pools.
+    """
+    started_at = time.time()
+    return started_at, fn(*args)
+
+
+class CalcExecutor:
+    """
+    Runs CPU-bound calculation work off the event loop.
+
+    Cheap calls (cost <= inline_max_cost) run inline since dispatching them to
+    a pool costs more than the work itself. Everything else goes through a
+    thread or process pool, gated by a semaphore so that a burst of long
+    schedules queues up instead of piling onto the pool.
+    """
+
+    def __init__(self, kind: str = CALC_EXECUTOR, max_workers: int = CALC_MAX_WORKERS,
+                 max_concurrency: int = CALC_MAX_CONCURRENCY, inline_max_cost: int = CALC_INLINE_MAX_COST):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Invalid executor kind: {kind}. Must be one of {list(EXECUTOR_KINDS)}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.inline_max_cost = inline_max_cost
+        self._pool: Optional[Executor] = None
+        self._pool_lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "inline": 0,
+            "offloaded": 0,
+            "in_flight": 0,
+            "queue_time_total": 0.0,
+            "queue_time_max": 0.0,
+            "run_time_total": 0.0,
+        }
+
+    def _get_pool(self) -> Executor:
+        """Create the worker pool lazily so importing this module stays cheap."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    if self.kind == "process":
+                        self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                    else:
+                        self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="calc")
+        return self._pool
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def should_run_inline(self, cost: int) -> bool:
+        """Whether a call of the given estimated cost is cheaper to run inline."""
+        return self.kind == "inline" or cost <= self.inline_max_cost
+
+    def _record(self, key: str, queue_time: float = 0.0, run_time: float = 0.0) -> None:
+        CALC_EXECUTOR_CALLS.labels(key).inc()
+        if key == "offloaded":
+            CALC_EXECUTOR_QUEUE.observe(queue_time)
+        with self._stats_lock:
+            self._stats[key] += 1
+            self._stats["queue_time_total"] += queue_time
+            self._stats["queue_time_max"] = max(self._stats["queue_time_max"], queue_time)
+            self._stats["run_time_total"] += run_time
+
+    async def run(self, fn: Callable, *args, cost: int = 0) -> Any:
+        """
+        Run fn(*args), inline or on the pool depending on its estimated cost.
+
+        Args:
+            fn: Function to run (must be picklable for the process executor)
+            *args: Positional arguments for fn
+            cost: Estimated cost of the call, in simulated months
+
+        Returns:
+            Whatever fn returns
+        """
+        if self.should_run_inline(cost):
+            start = time.perf_counter()
+            result = fn(*args)
+            self._record("inline", run_time=time.perf_counter() - start)
+            return result
+
+        submitted_at = time.time()
+        async with self._get_semaphore():
+            with self._stats_lock:
+                self._stats["in_flight"] += 1
+            try:
+                loop = asyncio.get_running_loop()
+                started_at, result = await loop.run_in_executor(self._get_pool(), _timed_call, fn, args)
+            finally:
+                with self._stats_lock:
+                    self._stats["in_flight"] -= 1
+        finished_at = time.time()
+        self._record("offloaded", queue_time=max(started_at - submitted_at, 0.0),
+                     run_time=finished_at - started_at)
+        return result
+
+    def stats(self) -> Dict:
+        """Snapshot of executor counters and queue-time metrics."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        offloaded = stats["offloaded"]
+        stats["queue_time_avg"] = stats["queue_time_total"] / offloaded if offloaded else 0.0
+        stats.update({
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "inline_max_cost": self.inline_max_cost,
+        })
+        return stats
+
+    def shutdown(self) -> None:
+        """Shut down the worker pool, if one was created."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+
+# Initialize the shared calculation executor
+calc_executor = CalcExecutor()
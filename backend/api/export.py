@@ -0,0 +1,229 @@
+"""
+Portfolio schedule export in a memory-mappable columnar file.
+
+Risk systems need the full monthly schedule of many loans; as JSON rows
+(CalculationResponse.amortization) that is about ten times the size of the
+numbers themselves and slow to parse. The export file stores every schedule
+column as one contiguous little-endian float64 array covering all loans back
+to back, with an index of each loan's first row:
+
+    header      magic "MCSCHED1", version, column counts, loan and row counts,
+                length of a JSON metadata block (column names, unit)
+    offsets     int64[loans + 1]: rows of loan i are offsets[i]:offsets[i + 1]
+    loan table  float64[loans] per LOAN_COLUMNS (principal, payment, totals)
+    schedule    float64[rows] per SCHEDULE_COLUMNS, loan after loan
+
+Every section starts on a 64-byte boundary, so a reader can memory-map the
+file and take any loan's schedule as numpy views without copying or parsing.
+The file is deliberately uncompressed: compression would rule out mapping it.
+"""
+import json
+import os
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .aggregation import SCHEDULE_COLUMNS
+from .calculator import loan_parameters, simulate_schedule
+from .exact import PRECISIONS, amortize_cents
+from .optimizer import prepare_loan
+
+EXPORT_MAX_LOANS = int(os.environ.get("EXPORT_MAX_LOANS", "10000"))
+
+MAGIC = b"MCSCHED1"
+VERSION = 1
+# magic, version, schedule columns, loan columns, loans, rows, metadata length
+HEADER = struct.Struct("<8sIIIQQQ")
+ALIGNMENT = 64
+CHUNK_SIZE = 1 << 20
+
+LOAN_COLUMNS = ("principal", "monthly_payment", "total_interest", "total_cost")
+
+MEDIA_TYPE = "application/octet-stream"
+
+def _padding(size: int) -> int:
+    return -size % ALIGNMENT
+
+def build_export(loans: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Solve and simulate every loan and lay out the export arrays.
+
+    Loans with precision "cents" are simulated together by the vectorized
+    exact engine; the others by the float engine, one at a time. Amounts are
+    in euros either way.
+
+    Args:
+        loans: Calculation parameters of each loan
+
+    Returns:
+        Dictionary with "offsets" (int64, loans + 1), "loans" (a float64 array
+        per LOAN_COLUMNS, one element per loan) and "columns" (a float64 array
+        per SCHEDULE_COLUMNS, one element per month)
+
+    Raises:
+        ValueError: If there are too many loans or a loan is invalid, naming the loan
+    """
+    if len(loans) > EXPORT_MAX_LOANS:
+        raise ValueError(f"Too many loans: {len(loans)} (at most {EXPORT_MAX_LOANS} per export).")
+
+    prepared = []
+    for i, data in enumerate(loans):
+        precision = data.get("precision") or "float"
+        if precision not in PRECISIONS:
+            raise ValueError(f"Loan {i}: Invalid precision: {precision}. Must be one of {list(PRECISIONS)}")
+        try:
+            data, monthly_payment = prepare_loan(data)
+        except ValueError as e:
+            raise ValueError(f"Loan {i}: {e}")
+        prepared.append((data, monthly_payment, precision))
+
+    # Per loan: its schedule columns and (principal, payment, total interest, total cost)
+    schedules: List[Optional[Dict[str, np.ndarray]]] = [None] * len(prepared)
+    summaries: List[Optional[Tuple[float, ...]]] = [None] * len(prepared)
+
+    exact = [i for i, (_, _, precision) in enumerate(prepared) if precision == "cents"]
+    if exact:
+        params = [loan_parameters(prepared[i][0], prepared[i][1]) for i in exact]
+        cents = amortize_cents(params)
+        for j, i in enumerate(exact):
+            duration = int(cents["duration"][j])
+            schedules[i] = {name: cents[name][:duration, j] / 100 for name in SCHEDULE_COLUMNS}
+            summaries[i] = (params[j]["principal"], prepared[i][1] or 0.0,
+                            int(cents["total_interest"][j]) / 100, int(cents["total_cost"][j]) / 100)
+
+    for i, (data, monthly_payment, precision) in enumerate(prepared):
+        if precision == "cents":
+            continue
+        columns, total_interest, total_cost, _ = simulate_schedule(data, monthly_payment)
+        schedules[i] = columns
+        summaries[i] = (loan_parameters(data, monthly_payment)["principal"], monthly_payment or 0.0,
+                        total_interest, total_cost)
+
+    durations = [len(schedule["balance"]) for schedule in schedules]
+    table = np.array(summaries, dtype=np.float64).reshape(len(prepared), len(LOAN_COLUMNS))
+    return {
+        "offsets": np.concatenate(([0], np.cumsum(durations, dtype=np.int64))).astype(np.int64),
+        "loans": {name: np.ascontiguousarray(table[:, k]) for k, name in enumerate(LOAN_COLUMNS)},
+        "columns": {name: np.concatenate([np.asarray(schedule[name], dtype=np.float64) for schedule in schedules]
+                                         or [np.zeros(0)])
+                    for name in SCHEDULE_COLUMNS},
+    }
+
+def encode_export(export: Dict[str, np.ndarray]) -> Iterator[bytes]:
+    """
+    Serialize export arrays into the file layout, in chunks of at most CHUNK_SIZE bytes.
+
+    Args:
+        export: Arrays from build_export
+
+    Yields:
+        bytes: Consecutive pieces of the file
+    """
+    metadata = json.dumps({"columns": list(SCHEDULE_COLUMNS), "loan_columns": list(LOAN_COLUMNS),
+                           "unit": "EUR"}).encode()
+    offsets = export["offsets"]
+    header = HEADER.pack(MAGIC, VERSION, len(SCHEDULE_COLUMNS), len(LOAN_COLUMNS),
+                         len(offsets) - 1, int(offsets[-1]), len(metadata)) + metadata
+    yield header + b"\0" * _padding(len(header))
+
+    arrays = [offsets.astype("<i8", copy=False)]
+    arrays += [export["loans"][name].astype("<f8", copy=False) for name in LOAN_COLUMNS]
+    arrays += [export["columns"][name].astype("<f8", copy=False) for name in SCHEDULE_COLUMNS]
+    for array in arrays:
+        data = memoryview(np.ascontiguousarray(array)).cast("B")
+        for start in range(0, len(data), CHUNK_SIZE):
+            yield data[start:start + CHUNK_SIZE].tobytes()
+        if _padding(len(data)):
+            yield b"\0" * _padding(len(data))
+
+def write_export(path: str, loans: List[Dict]) -> int:
+    """
+    Export the schedules of a list of loans to a file.
+
+    Returns:
+        int: Bytes written
+    """
+    size = 0
+    with open(path, "wb") as f:
+        for chunk in encode_export(build_export(loans)):
+            f.write(chunk)
+            size += len(chunk)
+    return size
+
+class ScheduleFile:
+    """
+    Reader of an export file, memory-mapped so only the pages touched are read.
+
+    Args:
+        source: Path of an export file, or its contents as a bytes-like object
+            (e.g. the body of a /api/schedule/export response)
+
+    Attributes:
+        offsets: Row index of each loan's first month, plus the total row count
+        columns: Every schedule column across all loans, as float64 views
+        loans: Per-loan LOAN_COLUMNS, as float64 views
+    """
+
+    def __init__(self, source: Union[str, bytes, bytearray, memoryview]):
+        if isinstance(source, (str, os.PathLike)):
+            self._buffer = np.memmap(source, dtype=np.uint8, mode="r")
+        else:
+            self._buffer = np.frombuffer(source, dtype=np.uint8)
+        if len(self._buffer) < HEADER.size:
+            raise ValueError("Not a schedule export: file too short.")
+        magic, version, n_columns, n_loan_columns, n_loans, n_rows, metadata_length = \
+            HEADER.unpack(self._buffer[:HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError("Not a schedule export: bad magic number.")
+        if version != VERSION:
+            raise ValueError(f"Unsupported schedule export version: {version}")
+        self.metadata = json.loads(self._buffer[HEADER.size:HEADER.size + metadata_length].tobytes())
+
+        position = HEADER.size + metadata_length
+        position += _padding(position)
+        self.offsets, position = self._view(position, np.dtype("<i8"), n_loans + 1)
+        self.loans: Dict[str, np.ndarray] = {}
+        for name in self.metadata["loan_columns"]:
+            self.loans[name], position = self._view(position, np.dtype("<f8"), n_loans)
+        self.columns: Dict[str, np.ndarray] = {}
+        for name in self.metadata["columns"]:
+            self.columns[name], position = self._view(position, np.dtype("<f8"), n_rows)
+
+    def _view(self, position: int, dtype: np.dtype, count: int) -> Tuple[np.ndarray, int]:
+        end = position + dtype.itemsize * count
+        if end > len(self._buffer):
+            raise ValueError("Truncated schedule export.")
+        view = self._buffer[position:end].view(dtype)
+        return view, end + _padding(end)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def loan(self, index: int) -> Dict[str, np.ndarray]:
+        """
+        Schedule of one loan as zero-copy views, one element per month.
+
+        Args:
+            index: Position of the loan in the export
+
+        Returns:
+            Dict[str, np.ndarray]: Every schedule column of the loan
+        """
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"Loan index out of range: {index}")
+        index %= len(self)
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return {name: column[start:end] for name, column in self.columns.items()}
+
+    def close(self) -> None:
+        """Drop the mapping; views handed out keep it alive until they are released."""
+        self._buffer = None
+        self.offsets = self.offsets.copy()
+        self.columns, self.loans = {}, {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
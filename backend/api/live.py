@@ -0,0 +1,175 @@
+"""
+Session-based live recalculation over WebSocket.
+
+The client sends only the fields that changed; the session keeps the merged
+inputs and the last result, coalesces bursts of edits (typing) into a single
+recalculation, and replies with the summary values that changed plus a diff
+of the amortization schedule.
+
+Client messages:
+    {"type": "delta", "fields": {"loan_term": 25}}   merge fields into the inputs
+    {"type": "reset", "fields": {...}}                replace all inputs
+
+Server messages:
+    {"type": "result", "seq": n, "summary": {...changed values...},
+     "schedule": {"length": L, "rows": [[index, row], ...]} or {"length": L, "full": [...]}}
+    {"type": "error", "seq": n, "detail": "..."}
+    {"type": "error", "seq": n, "detail": "...", "retry_after": s}   refused admission; resend to retry
+"""
+import asyncio
+import json
+import os
+from typing import AsyncContextManager, Callable, Dict, List, Optional
+
+from .admission import AdmissionRejected
+from .calculator import estimate_calculation_cost, run_calculation
+from .executor import calc_executor
+
+LIVE_DEBOUNCE_MS = float(os.environ.get("LIVE_DEBOUNCE_MS", "150"))
+LIVE_MAX_WAIT_MS = float(os.environ.get("LIVE_MAX_WAIT_MS", "1000"))
+
+SUMMARY_FIELDS = ("calculated_field", "calculated_value", "total_borrowed",
+                  "total_interest", "total_cost", "duration")
+
+def schedule_diff(previous: List[Dict], current: List[Dict]) -> Dict:
+    """
+    Diff two amortization schedules row by row.
+
+    Returns:
+        Dict: The new length plus either the changed rows as [index, row]
+        pairs, or the full schedule when most rows changed anyway
+    """
+    changed = [[index, row] for index, row in enumerate(current)
+               if index >= len(previous) or previous[index] != row]
+    if len(changed) * 2 > len(current):
+        return {"length": len(current), "full": current}
+    return {"length": len(current), "rows": changed}
+
+class LiveSession:
+    """
+    State of one live calculation session.
+
+    Args:
+        validate: Turns raw client fields into normalized calculation parameters,
+            raising ValueError on invalid input (e.g. CalculationRequest parsing)
+        debounce: Seconds to wait for further edits before recalculating
+        max_wait: Seconds after the first edit of a burst by which the session
+            recalculates, even if edits keep arriving
+        admit: Returns a context manager holding an admission slot for a
+            recalculation of the given parameters (raising AdmissionRejected
+            when refused), or None to recalculate without admission
+    """
+
+    def __init__(self, validate: Callable[[Dict], Dict], debounce: float = LIVE_DEBOUNCE_MS / 1000,
+                 admit: Optional[Callable[[Dict], AsyncContextManager]] = None,
+                 max_wait: float = LIVE_MAX_WAIT_MS / 1000):
+        self.validate = validate
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.admit = admit
+        self.fields: Dict = {}
+        self.pending: Optional[Dict] = None
+        self.data: Optional[Dict] = None
+        self.result: Optional[Dict] = None
+        self.seq = 0
+
+    def apply(self, text: str) -> None:
+        """Queue a raw client message; it takes effect at the next recalculation."""
+        try:
+            message = json.loads(text)
+        except ValueError:
+            message = None
+        if not isinstance(message, dict):
+            raise ValueError("Messages must be JSON objects")
+        message_type = message.get("type", "delta")
+        fields = message.get("fields") or {}
+        if not isinstance(fields, dict):
+            raise ValueError("fields must be an object")
+        if message_type == "reset":
+            self.pending = dict(fields)
+        elif message_type == "delta":
+            self.pending = dict(self.pending if self.pending is not None else self.fields, **fields)
+        else:
+            raise ValueError(f"Invalid message type: {message_type}. Must be one of ['delta', 'reset']")
+
+    async def recalculate(self) -> Optional[Dict]:
+        """
+        Apply queued edits and recalculate if the inputs changed.
+
+        Returns:
+            Message for the client, or None if nothing changed
+        """
+        if self.pending is None:
+            return None
+        fields, self.pending = self.pending, None
+        self.seq += 1
+        try:
+            data = self.validate(fields)
+            self.fields = fields
+            if data == self.data and self.result is not None:
+                return None
+            if self.admit is None:
+                result = await calc_executor.run(run_calculation, data, cost=estimate_calculation_cost(data))
+            else:
+                async with self.admit(data):
+                    result = await calc_executor.run(run_calculation, data, cost=estimate_calculation_cost(data))
+        except AdmissionRejected as e:
+            return {"type": "error", "seq": self.seq, "detail": e.detail, "retry_after": e.retry_after}
+        except ValueError as e:
+            return {"type": "error", "seq": self.seq, "detail": str(e)}
+        except Exception as e:
+            # e.g. OverflowError from extreme inputs: report it and keep the session open
+            return {"type": "error", "seq": self.seq, "detail": f"Error calculating mortgage: {str(e)}"}
+
+        previous = self.result or {}
+        summary = {field: result[field] for field in SUMMARY_FIELDS
+                   if field not in previous or previous[field] != result[field]}
+        schedule = schedule_diff(previous.get("amortization", []), result["amortization"])
+        self.data, self.result = data, result
+        return {"type": "result", "seq": self.seq, "summary": summary, "schedule": schedule}
+
+    async def serve(self, websocket) -> None:
+        """
+        Run the session until the client disconnects.
+
+        A reader task queues incoming messages; the main loop waits for the
+        first edit of a burst, then keeps absorbing edits until the client has
+        been quiet for the debounce interval, and recalculates once. A burst
+        lasts at most max_wait from its first edit, so a client that never
+        pauses (or a reconnecting one replaying edits) still gets results;
+        edits still queued start the next burst.
+        """
+        inbox: asyncio.Queue = asyncio.Queue()
+
+        async def reader():
+            try:
+                while True:
+                    await inbox.put(await websocket.receive_text())
+            finally:
+                await inbox.put(None)
+
+        loop = asyncio.get_running_loop()
+        reader_task = asyncio.ensure_future(reader())
+        try:
+            while True:
+                message = await inbox.get()
+                deadline = loop.time() + self.max_wait
+                while message is not None:
+                    try:
+                        self.apply(message)
+                    except ValueError as e:
+                        await websocket.send_json({"type": "error", "seq": self.seq, "detail": str(e)})
+                    timeout = min(self.debounce, deadline - loop.time())
+                    if timeout <= 0:
+                        break
+                    try:
+                        message = await asyncio.wait_for(inbox.get(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if message is None:
+                    return
+                reply = await self.recalculate()
+                if reply is not None:
+                    await websocket.send_json(reply)
+        finally:
+            reader_task.cancel()
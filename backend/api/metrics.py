@@ -0,0 +1,128 @@
+"""
+Prometheus metrics for the Mortgage Calculator API.
+
+Metrics are kept in process by default. To aggregate across several uvicorn or
+gunicorn workers, point PROMETHEUS_MULTIPROC_DIR at an empty directory shared
+by the workers before they start; /metrics then merges every worker's samples.
+Only counters and histograms are used: a dead worker's samples must keep
+counting towards the totals, so no cleanup is needed when a worker exits.
+"""
+import os
+import time
+from typing import Dict
+
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram,
+                               generate_latest, REGISTRY)
+from prometheus_client import multiprocess
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+# Latency buckets from 0.5 ms to 10 s, suited to both inline and offloaded calculations
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS)
+
+CALC_STAGE_DURATION = Histogram(
+    "calc_stage_duration_seconds", "Time spent in each stage of /api/calc",
+    ["stage"], buckets=LATENCY_BUCKETS)
+
+CALC_SOLVER_ITERATIONS = Histogram(
+    "calc_solver_iterations", "Iterations used to solve for the unknown field",
+    ["field"], buckets=(0, 1, 2, 4, 8, 16, 32, 64, 100))
+
+CALC_SCHEDULE_LENGTH = Histogram(
+    "calc_schedule_length_months", "Number of simulated months per calculation",
+    buckets=(12, 60, 120, 240, 360, 480, 600, 1000))
+
+CALC_EXECUTOR_CALLS = Counter(
+    "calc_executor_calls_total", "Calculations run by the executor", ["mode"])
+
+CALC_EXECUTOR_QUEUE = Histogram(
+    "calc_executor_queue_seconds", "Time offloaded calculations waited before running",
+    buckets=LATENCY_BUCKETS)
+
+ADMISSION_DECISIONS = Counter(
+    "admission_decisions_total", "Admission decisions for calculation requests", ["lane", "outcome"])
+
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds", "Time admitted requests waited for a lane slot",
+    ["lane"], buckets=LATENCY_BUCKETS)
+
+EURIBOR_CACHE_REQUESTS = Counter(
+    "euribor_cache_requests_total", "EURIBOR cache lookups", ["kind", "result"])
+
+EURIBOR_FETCH_DURATION = Histogram(
+    "euribor_fetch_duration_seconds", "Upstream EURIBOR fetch latency",
+    ["kind", "outcome"], buckets=LATENCY_BUCKETS)
+
+
+def observe_calc_stages(stages: Dict[str, float]) -> None:
+    """Record per-stage timings (in seconds) of a calculation."""
+    for stage, seconds in stages.items():
+        CALC_STAGE_DURATION.labels(stage).observe(seconds)
+
+
+def render_metrics():
+    """
+    Render all metrics in the Prometheus text format.
+
+    Returns:
+        Tuple of (payload bytes, content type)
+    """
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def _route_label(scope: Dict) -> str:
+    """Route template for a request, so path parameters don't explode label cardinality."""
+    # Newer FastAPI keeps included routers nested; the effective route carries the prefixed path
+    fastapi_scope = scope.get("fastapi")
+    context = fastapi_scope.get("effective_route_context") if isinstance(fastapi_scope, dict) else None
+    if context is not None and getattr(context, "path_format", None):
+        return context.path_format
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        return getattr(endpoint, "__name__", "unknown")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route.
+
+    Written as plain ASGI rather than BaseHTTPMiddleware to keep the per-request
+    overhead to a couple of microseconds.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], _route_label(scope), str(status["code"])
+            ).observe(time.perf_counter() - start)
+
@@ -0,0 +1,222 @@
+import math
+from typing import Callable, Dict, Optional, Tuple
+
+from .calculator import (calculate_monthly_payment, loan_parameters, parse_float, solve_for_unknown,
+                         summarize_amortization)
+
+PAYOFF_TARGETS = ("duration", "total_interest", "total_outlay")
+PAYOFF_VARIABLES = ("extra_monthly", "extra_annual", "lump_sum")
+
+# Answers are in euros, so searching below a cent is pointless
+TOLERANCE = 0.01
+MAX_EVALUATIONS = 80
+# Cells scanned before searching a metric that may not be monotone
+GRID_POINTS = 32
+
+def prepare_loan(data: Dict) -> Tuple[Dict, Optional[float]]:
+    """
+    Solve for the unknown field and write it back into the loan parameters.
+
+    Args:
+        data: Dictionary containing mortgage calculation parameters
+
+    Returns:
+        Tuple of (completed parameters, monthly payment)
+    """
+    data = dict(data)
+    unknown_result = solve_for_unknown(data)
+    data[unknown_result["calculated_field"]] = unknown_result["calculated_value"]
+    return data, parse_float(data.get("monthly_payment"))
+
+def _metric(target: str, summary: Tuple[float, float, int]) -> float:
+    total_interest, total_outlay, duration = summary
+    if target == "duration":
+        return duration
+    if target == "total_interest":
+        return total_interest
+    return total_outlay
+
+def _closed_form(data: Dict, monthly_payment: float, target_value: float, variable: str) -> Optional[float]:
+    """
+    Closed-form extra payment for a duration target, where annuity math applies.
+
+    Needs a single rate over the target horizon and no annual extra payment
+    (other than the one being solved for, which has no closed form).
+
+    Returns:
+        The extra payment, or None if no closed form applies
+    """
+    params = loan_parameters(data, monthly_payment)
+    n = int(target_value)
+    r = params["r_fixed"] or 0
+    single_rate = params["r_adjusted"] == params["r_fixed"] or n <= params["fixed_months"]
+    if variable == "extra_annual" or params["extra_annual"] or not single_rate or n <= 0:
+        return None
+
+    principal = params["principal"]
+    if variable == "extra_monthly":
+        return max(calculate_monthly_payment(principal, r, n) - monthly_payment, 0)
+
+    payment = monthly_payment + params["extra_monthly"]
+    present_value = payment * (1 - (1 + r)**-n) / r if r != 0 else payment * n
+    return min(max(principal - present_value, 0), principal)
+
+def _search(evaluate: Callable[[float], float], target_value: float, lo: float, hi: float,
+            f_lo: float, f_hi: float, continuous: bool) -> float:
+    """
+    Find the smallest x in [lo, hi] with evaluate(x) <= target_value.
+
+    evaluate must be non-increasing in x, with f_lo = evaluate(lo) > target_value
+    and f_hi = evaluate(hi) <= target_value. Step-valued metrics (duration) are bisected;
+    continuous ones use the Illinois variant of false position, falling back to
+    bisection whenever it fails to halve the bracket.
+
+    Returns:
+        The smallest feasible x found, to within TOLERANCE
+    """
+    g_lo = f_lo - target_value
+    g_hi = f_hi - target_value
+    side = 0
+    for _ in range(MAX_EVALUATIONS):
+        if hi - lo <= TOLERANCE:
+            break
+        width = hi - lo
+        x = (lo + hi) / 2
+        if continuous and g_lo != g_hi:
+            candidate = hi - g_hi * (hi - lo) / (g_hi - g_lo)
+            if lo < candidate < hi:
+                x = candidate
+        g = evaluate(x) - target_value
+        if g <= 0:
+            hi, g_hi = x, g
+            if side == -1:
+                g_lo /= 2
+            side = -1
+        else:
+            lo, g_lo = x, g
+            if side == 1:
+                g_hi /= 2
+            side = 1
+        if hi - lo > width / 2:
+            # False position stalled on one side: take a bisection step
+            mid = (lo + hi) / 2
+            g = evaluate(mid) - target_value
+            if g <= 0:
+                hi, g_hi = mid, g
+            else:
+                lo, g_lo = mid, g
+    return hi
+
+def _grid_bracket(evaluate: Callable[[float], float], target_value: float, lo: float, hi: float,
+                  f_lo: float, f_hi: float) -> Tuple[float, float, float, float]:
+    """
+    First cell of an even grid over [lo, hi] whose right end meets the target.
+
+    For metrics that are not monotone, where a bracket from the range ends
+    proves nothing: the search then runs inside the returned cell only.
+
+    Args:
+        f_lo: evaluate(lo), above target_value
+        f_hi: evaluate(hi), at or below target_value
+
+    Returns:
+        Tuple of (lo, hi, evaluate(lo), evaluate(hi)) of the cell
+    """
+    step = (hi - lo) / GRID_POINTS
+    for i in range(1, GRID_POINTS):
+        x = lo + i * step
+        f_x = evaluate(x)
+        if f_x <= target_value:
+            return x - step, x, f_lo, f_x
+        f_lo = f_x
+    return hi - step, hi, f_lo, f_hi
+
+def optimize_payoff(data: Dict, target: str, target_value: float, variable: str) -> Dict:
+    """
+    Solve for the extra payment that reaches a payoff target.
+
+    Args:
+        data: Dictionary containing mortgage calculation parameters
+        target: "duration" (months), "total_interest" or "total_outlay"
+            (everything paid out, extra payments included)
+        target_value: Value the target must not exceed
+        variable: "extra_monthly", "extra_annual" or "lump_sum" (paid at the start)
+
+    Duration and total interest never rise with a larger extra payment, so
+    they are searched from the whole range. The total outlay can: fees grow
+    with the extra payment while the interest it saves shrinks, and an extra
+    payment that repays the loan outright is charged no fee. With an
+    extra_fee_rate, the range is first scanned on a grid of GRID_POINTS cells
+    and the search runs in the first cell that meets the target.
+
+    Returns:
+        Dictionary with the extra payment, how it was found and the resulting totals
+    """
+    if target not in PAYOFF_TARGETS:
+        raise ValueError(f"Invalid target: {target}. Must be one of {list(PAYOFF_TARGETS)}")
+    if variable not in PAYOFF_VARIABLES:
+        raise ValueError(f"Invalid variable: {variable}. Must be one of {list(PAYOFF_VARIABLES)}")
+
+    data, monthly_payment = prepare_loan(data)
+    if not monthly_payment or monthly_payment <= 0:
+        raise ValueError("A positive monthly payment is required to optimize the payoff.")
+    principal = loan_parameters(data, monthly_payment)["principal"]
+
+    def summarize(x: float) -> Tuple[float, float, int]:
+        if variable == "lump_sum":
+            return summarize_amortization(data, monthly_payment, lump_sum=x)
+        return summarize_amortization(dict(data, **{variable: x}), monthly_payment)
+
+    evaluations = 0
+
+    def evaluate(x: float) -> float:
+        nonlocal evaluations
+        evaluations += 1
+        return _metric(target, summarize(x))
+
+    baseline = summarize(0 if variable == "lump_sum" else parse_float(data.get(variable)) or 0)
+    value = None
+    method = None
+
+    f_zero = evaluate(0)
+    if f_zero <= target_value:
+        value, method = 0.0, "already_met"
+
+    if value is None and target == "duration":
+        guess = _closed_form(data, monthly_payment, target_value, variable)
+        if guess is not None:
+            # Round up to the cent and confirm against the simulation, allowing for float noise
+            guess = math.ceil(guess * 100) / 100
+            for _ in range(3):
+                if evaluate(guess) <= target_value:
+                    value, method = guess, "closed_form"
+                    break
+                guess += TOLERANCE
+
+    if value is None:
+        f_principal = evaluate(principal)
+        if f_principal > target_value:
+            raise ValueError(f"Target {target} <= {target_value} cannot be reached by adjusting {variable}.")
+        lo, hi, f_lo, f_hi = 0.0, principal, f_zero, f_principal
+        method = "bisection" if target == "duration" else "regula_falsi"
+        if target == "total_outlay" and loan_parameters(data, monthly_payment)["extra_fee_rate"]:
+            lo, hi, f_lo, f_hi = _grid_bracket(evaluate, target_value, lo, hi, f_lo, f_hi)
+            method = "grid_scan"
+        value = _search(evaluate, target_value, lo, hi, f_lo, f_hi, continuous=target != "duration")
+        value = math.ceil(value * 100) / 100
+
+    total_interest, total_outlay, duration = summarize(value)
+    return {
+        "variable": variable,
+        "target": target,
+        "target_value": target_value,
+        "value": value,
+        "method": method,
+        "evaluations": evaluations,
+        "total_interest": total_interest,
+        "total_outlay": total_outlay,
+        "duration": duration,
+        "baseline_total_interest": baseline[0],
+        "baseline_total_outlay": baseline[1],
+        "baseline_duration": baseline[2]
+    }
@@ -0,0 +1,257 @@
+"""
+Opt-in request profiling and slow-request capture.
+
+A request is profiled when PROFILE_SAMPLE_RATE selects it, or when it carries
+an "X-Profile: 1" header and PROFILE_HEADER_ENABLED is set. Requests slower than
+SLOW_REQUEST_MS are captured automatically. Every capture is written to
+PROFILE_DIR as a JSON file (normalized request, stage timings, duration) next
+to a cProfile artifact readable with pstats, and only the newest
+PROFILE_MAX_CAPTURES captures are kept. A relative PROFILE_DIR is resolved
+against the backend directory, so captures land in backend/profiles whether
+the app is started from backend/main.py or the root app.py. Captures can be
+re-run with `python -m tools.replay`.
+
+Disk writes and re-profiling of slow requests run on one background worker
+behind a queue of PROFILE_QUEUE_SIZE jobs, so they never block the event
+loop; when the queue is full, captures are dropped. Slow requests are
+re-profiled at most once per PROFILE_REPROFILE_INTERVAL_MS, so an overloaded
+server does not spend more CPU profiling its slowness.
+"""
+import cProfile
+import json
+import logging
+import marshal
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILE_DIR = os.path.join(BACKEND_DIR, os.environ.get("PROFILE_DIR", "profiles"))
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_HEADER_ENABLED = os.environ.get("PROFILE_HEADER_ENABLED", "0") == "1"
+PROFILE_MAX_CAPTURES = int(os.environ.get("PROFILE_MAX_CAPTURES", "50"))
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "0"))  # 0 disables slow capture
+PROFILE_QUEUE_SIZE = int(os.environ.get("PROFILE_QUEUE_SIZE", "32"))
+PROFILE_REPROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_REPROFILE_INTERVAL_MS", "10000"))
+
+CAPTURE_SUFFIX = ".json"
+PROFILE_SUFFIX = ".prof"
+
+
+def profiled_call(fn: Callable, args: Tuple) -> Tuple[Any, bytes]:
+    """
+    Run fn(*args) under cProfile.
+
+    Lives at module level so it can be sent to a process pool.
+
+    Returns:
+        Tuple of (fn's return value, marshalled profile stats)
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = fn(*args)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    return result, marshal.dumps(profiler.stats)
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and writes captures to disk from a background worker.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 header_enabled: bool = PROFILE_HEADER_ENABLED, slow_ms: float = SLOW_REQUEST_MS,
+                 max_captures: int = PROFILE_MAX_CAPTURES, queue_size: int = PROFILE_QUEUE_SIZE,
+                 reprofile_interval: float = PROFILE_REPROFILE_INTERVAL_MS / 1000):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.header_enabled = header_enabled
+        self.slow_ms = slow_ms
+        self.max_captures = max_captures
+        self.reprofile_interval = reprofile_interval
+        self.dropped = 0
+        self._jobs: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._next_reprofile = 0.0
+
+    def should_profile(self, header_value: Optional[str] = None) -> bool:
+        """
+        Whether the current request should run under the profiler.
+
+        Args:
+            header_value: Value of the request's X-Profile header, if any
+        """
+        if self.header_enabled and header_value and header_value.lower() in ("1", "true", "yes"):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def is_slow(self, duration: float) -> bool:
+        return self.slow_ms > 0 and duration * 1000 >= self.slow_ms
+
+    def record(self, kind: str, request: Dict, stages: Dict[str, float], duration: float,
+               profile: Optional[bytes] = None) -> Optional[str]:
+        """
+        Capture a request if it was profiled or was slow.
+
+        Args:
+            kind: Capture kind, "calc", "euribor_latest" or "euribor_history"
+            request: Normalized request parameters, enough to replay the request
+            stages: Stage timings in seconds
+            duration: Total handler time in seconds
+            profile: Marshalled profile stats, if the request was profiled
+
+        Returns:
+            Capture id, or None if the request was not captured (or the
+            capture was dropped because the write queue is full)
+        """
+        slow = self.is_slow(duration)
+        if profile is None and not slow:
+            return None
+        capture_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{kind}-{uuid.uuid4().hex[:8]}"
+        capture = {
+            "id": capture_id,
+            "kind": kind,
+            "captured_at": datetime.now().isoformat(),
+            "reason": "slow" if slow else "profiled",
+            "duration": duration,
+            "stages": stages,
+            "request": request,
+            "profile": capture_id + PROFILE_SUFFIX if profile is not None else None,
+        }
+
+        def write():
+            try:
+                self._write(capture, profile)
+            except OSError as e:
+                logger.error(f"Error writing profile capture {capture_id}: {str(e)}")
+
+        return capture_id if self._submit(write) else None
+
+    def attach_profile(self, capture_id: str, profile: bytes) -> None:
+        """Add a profile artifact to an existing capture (used after re-profiling a slow request)."""
+        path = os.path.join(self.directory, capture_id + CAPTURE_SUFFIX)
+        try:
+            with open(path) as f:
+                capture = json.load(f)
+            capture["profile"] = capture_id + PROFILE_SUFFIX
+            capture["reprofiled"] = True
+            with open(os.path.join(self.directory, capture["profile"]), "wb") as f:
+                f.write(profile)
+            with open(path, "w") as f:
+                json.dump(capture, f, indent=2)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error attaching profile to capture {capture_id}: {str(e)}")
+
+    def reprofile(self, capture_id: str, fn: Callable, args: Tuple) -> bool:
+        """
+        Re-run a deterministic call under the profiler on the background worker
+        and attach the result to its capture. Used for slow requests that were
+        not sampled for profiling when they ran.
+
+        Returns:
+            bool: Whether the re-profile was queued; it is skipped when another
+            one was queued less than reprofile_interval ago or the queue is full
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_reprofile:
+                return False
+            self._next_reprofile = now + self.reprofile_interval
+
+        def run():
+            try:
+                _, profile = profiled_call(fn, args)
+            except Exception as e:
+                logger.error(f"Error re-profiling capture {capture_id}: {str(e)}")
+                return
+            self.attach_profile(capture_id, profile)
+
+        return self._submit(run)
+
+    def flush(self) -> None:
+        """Wait until every queued write and re-profile is done."""
+        self._jobs.join()
+
+    def _submit(self, job: Callable[[], None]) -> bool:
+        """Queue a job for the background worker, starting it if needed; False if the queue is full."""
+        with self._lock:
+            # Started on first use, so each forked worker process gets its own
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._worker.start()
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Profiling queue full: dropping a capture")
+            return False
+        return True
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            try:
+                job()
+            except Exception as e:
+                logger.error(f"Error in profiling worker: {str(e)}")
+            finally:
+                self._jobs.task_done()
+
+    def _write(self, capture: Dict, profile: Optional[bytes]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if profile is not None:
+            with open(os.path.join(self.directory, capture["profile"]), "wb") as f:
+                f.write(profile)
+        with open(os.path.join(self.directory, capture["id"] + CAPTURE_SUFFIX), "w") as f:
+            json.dump(capture, f, indent=2, default=str)
+        self._rotate()
+
+    def _rotate(self) -> None:
+        """Delete the oldest captures beyond max_captures (ids sort chronologically)."""
+        captures = sorted(name for name in os.listdir(self.directory) if name.endswith(CAPTURE_SUFFIX))
+        for name in captures[:max(len(captures) - self.max_captures, 0)]:
+            capture_id = name[:-len(CAPTURE_SUFFIX)]
+            for suffix in (CAPTURE_SUFFIX, PROFILE_SUFFIX):
+                try:
+                    os.remove(os.path.join(self.directory, capture_id + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+class Stopwatch:
+    """Collects named stage timings, in seconds."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.stages: Dict[str, float] = {}
+
+    def lap(self, stage: str) -> None:
+        """Record the time since the previous lap (or mark) as a stage."""
+        now = time.perf_counter()
+        self.stages[stage] = now - self.last
+        self.last = now
+
+    def mark(self) -> None:
+        """Start the next stage now, without recording the time in between."""
+        self.last = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+
+# Initialize the shared request profiler
+request_profiler = RequestProfiler()
@@ -0,0 +1,180 @@
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .calculator import loan_parameters, simulate_amortization
+from .schedule_query import add_months
+
+# Months between rate resets of a variable loan indexed on each EURIBOR tenor
+RESET_MONTHS = {"1M": 1, "3M": 3, "6M": 6, "12M": 12}
+
+def monthly_rate_series(history: List[Dict], start: date, months: int) -> np.ndarray:
+    """
+    Resample a daily EURIBOR history to one rate per calendar month.
+
+    Each month takes the last fixing observed in it; months without fixings
+    carry the previous value forward, and months before the first fixing are
+    NaN.
+
+    Args:
+        history: Rates as returned by EuriborAPI.get_historical_rates
+        start: Any date in the first month of the series
+        months: Number of months in the series
+
+    Returns:
+        np.ndarray: Annual rates in percent, one per month
+    """
+    series = np.full(months, np.nan)
+    for row in history:
+        # Dates are YYYY-MM-DD; slicing is much cheaper than strptime over years of daily fixings
+        row_date = row["date"]
+        index = (int(row_date[:4]) - start.year) * 12 + int(row_date[5:7]) - start.month
+        if 0 <= index < months:
+            # History is in date order, so the last write in a month wins
+            series[index] = row["rate"]
+    for index in range(1, months):
+        if np.isnan(series[index]):
+            series[index] = series[index - 1]
+    return series
+
+def history_end(data: Dict, start_date: str, to_date: str, today: Optional[date] = None) -> str:
+    """
+    Last date of EURIBOR history a refinance analysis needs.
+
+    Resets of the new loan happen until the loan ends, so fixings are needed
+    through the end of the term (as far as they exist, i.e. until today), and
+    at least through the end of the switch window.
+
+    Args:
+        data: Prepared calculation parameters (loan_term solved)
+        start_date: Loan start date (YYYY-MM-DD)
+        to_date: Last candidate switch date (YYYY-MM-DD)
+        today: Current date (date.today() by default)
+
+    Returns:
+        str: End date in YYYY-MM-DD format
+    """
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD.")
+    term_months = min(int((data.get("loan_term") or 0) * 12), 1000)
+    end = min(today or date.today(), add_months(start, term_months))
+    return max(end.isoformat(), to_date)
+
+def analyze_refinance(data: Dict, computed_monthly_payment: Optional[float], history: List[Dict],
+                      tenor: str, new_spread: float, start_date: str, from_date: str, to_date: str,
+                      switching_fee: float = 0, switching_fee_rate: float = 0,
+                      discount_rate: float = 0) -> Dict:
+    """
+    Evaluate switching the current loan to a EURIBOR-indexed variable loan at every month in a window.
+
+    The new loan repays principal on the same schedule as the current one
+    (including extra payments), so the monthly saving of switching after month
+    s is balance_{t-1} * (current rate_t - new rate_t) for every later month t.
+    The new rate is the EURIBOR fixing at the last reset plus new_spread,
+    resetting every tenor; resets past the end of the history keep the last
+    fixing, and the result says from which fixing on rates were carried
+    forward that way (rates_extrapolated_from). All switch dates are evaluated at once as a (switch month x loan
+    month) matrix, from one preloaded rate series.
+
+    Args:
+        data: Dictionary containing mortgage calculation parameters
+        computed_monthly_payment: Pre-computed monthly payment if available
+        history: Daily EURIBOR fixings from from_date, ideally through history_end
+        tenor: EURIBOR tenor of the new loan (1M, 3M, 6M, 12M)
+        new_spread: Spread of the new loan over EURIBOR, in percent
+        start_date: Loan start date (YYYY-MM-DD); payment k is due k months later
+        from_date: First candidate switch date (YYYY-MM-DD)
+        to_date: Last candidate switch date (YYYY-MM-DD)
+        switching_fee: Fixed cost of switching
+        switching_fee_rate: Cost of switching as a percentage of the balance switched
+        discount_rate: Annual discount rate in percent for the NPV of savings
+
+    Returns:
+        Dictionary with one result per candidate switch date, the best one by
+        NPV, and rates_extrapolated_from: the date of the last fixing if any
+        candidate used a fixing after it, else None
+    """
+    if tenor not in RESET_MONTHS:
+        raise ValueError(f"Invalid tenor: {tenor}. Must be one of {list(RESET_MONTHS.keys())}")
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        first = datetime.strptime(from_date, "%Y-%m-%d").date()
+        last = datetime.strptime(to_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD.")
+
+    rows, _, _, duration = simulate_amortization(dict(data, table_view="monthly"), computed_monthly_payment)
+    if duration < 2:
+        raise ValueError("The loan is too short to refinance.")
+    params = loan_parameters(data, computed_monthly_payment)
+
+    # Opening balance and current monthly rate of each loan month t = 1..duration
+    closing = np.array([row["balance"] for row in rows])
+    opening = np.concatenate(([params["principal"]], closing[:-1]))
+    months = np.arange(1, duration + 1)
+    current_rate = np.where(months <= params["fixed_months"], params["r_fixed"] or 0, params["r_adjusted"] or 0)
+
+    # EURIBOR by loan month (index m = calendar month of payment m)
+    euribor = monthly_rate_series(history, start, duration + 1)
+
+    # Candidate switch months: switching right after payment s, inside the window and the history
+    candidates = np.array([s for s in range(1, duration)
+                           if first <= add_months(start, s) <= last and not np.isnan(euribor[s])], dtype=int)
+    if candidates.size == 0:
+        raise ValueError("No candidate switch dates: check the date range against the loan and EURIBOR history.")
+
+    # Rate fixing in force in loan month t after switching at s: the last reset at or before t - 1
+    period = RESET_MONTHS[tenor]
+    s = candidates[:, None]
+    t = months[None, :]
+    fixing_month = s + ((t - 1 - s) // period) * period
+    fixing_month = np.clip(fixing_month, 0, duration)
+    # The series is forward-filled, so resets past the end of the history keep the last fixing
+    new_rate = (euribor[fixing_month] + new_spread) / 100 / 12
+
+    after_switch = t > s
+    rates_extrapolated_from = None
+    if history:
+        last_fixing = history[-1]["date"]
+        last_month = (int(last_fixing[:4]) - start.year) * 12 + int(last_fixing[5:7]) - start.month
+        if (fixing_month[after_switch] > last_month).any():
+            rates_extrapolated_from = last_fixing
+    savings = np.where(after_switch, opening[None, :] * (current_rate[None, :] - new_rate), 0.0)
+
+    fees = switching_fee + switching_fee_rate / 100 * closing[candidates - 1]
+    cumulative = np.cumsum(savings, axis=1)
+    recovered = (cumulative >= fees[:, None]) & after_switch
+    breakeven = np.where(recovered.any(axis=1), recovered.argmax(axis=1) + 1 - candidates, -1)
+
+    monthly_discount = (1 + discount_rate / 100) ** (1 / 12)
+    discount = np.where(after_switch, monthly_discount ** -np.maximum(t - s, 0).astype(float), 0.0)
+    npv = (savings * discount).sum(axis=1) - fees
+    net_savings = cumulative[:, -1] - fees
+
+    results = []
+    for i, month in enumerate(candidates.tolist()):
+        results.append({
+            "switch_date": add_months(start, month).isoformat(),
+            "switch_month": month,
+            "balance": float(closing[month - 1]),
+            "euribor": float(euribor[month]),
+            "new_rate": float(euribor[month] + new_spread),
+            "fees": float(fees[i]),
+            "breakeven_month": int(breakeven[i]) if breakeven[i] >= 0 else None,
+            "net_savings": float(net_savings[i]),
+            "npv": float(npv[i])
+        })
+
+    best = max(results, key=lambda r: r["npv"])
+    return {
+        "tenor": tenor,
+        "new_spread": new_spread,
+        "duration": duration,
+        "candidates": len(results),
+        "best": best,
+        "rates_extrapolated_from": rates_extrapolated_from,
+        "results": results
+    }
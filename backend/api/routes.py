@@ -1,12 +1,84 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import Dict, List, Optional
+import math
+from functools import partial
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional, Sequence, Type, Union
 from datetime import datetime
+from .affordability import search_affordability
+from .admission import MIN_COST, AdmissionRejected, admission_controller, client_identity, request_cost
 from .euribor import get_latest_euribor, get_historical_euribor
-from .calculator import solve_for_unknown, simulate_amortization, parse_float
+from .calculator import run_calculation_timed, estimate_calculation_cost
+from .executor import calc_executor
+from .export import MEDIA_TYPE, build_export, encode_export
+from .optimizer import optimize_payoff, prepare_loan
+from .schedule_query import answer_queries
+from .refinance import analyze_refinance, history_end
+from .live import LiveSession
+from .metrics import CALC_SCHEDULE_LENGTH, CALC_SOLVER_ITERATIONS, observe_calc_stages
+from .profiling import Stopwatch, profiled_call, request_profiler
 from pydantic import BaseModel
 
 router = APIRouter()
 
+def batch_size(data: Dict, batch_field: Union[str, Sequence[str]]) -> int:
+    """
+    Number of items in a request: the length of a list field, or the product
+    of several fields (lists or counts) spanning a grid.
+    """
+    size = 1
+    for field in ((batch_field,) if isinstance(batch_field, str) else batch_field):
+        value = data.get(field)
+        if isinstance(value, int) and not isinstance(value, bool):
+            size *= value
+        elif isinstance(value, list):
+            size *= len(value)
+    return size
+
+def admission(model: Type[BaseModel], multiplier: float = 1.0,
+              batch_field: Optional[Union[str, Sequence[str]]] = None,
+              rendered: bool = False, loans_field: Optional[str] = None):
+    """
+    Build a dependency that admits a request before its endpoint runs and holds its slot until it is done.
+    
+    The request is costed from the body parsed with the endpoint's model, so
+    fields the client left out count at their defaults.
+    
+    Args:
+        model: Request model of the endpoint
+        multiplier: Simulations the endpoint runs per request
+        batch_field: Request field listing the items of a batch, or fields whose sizes multiply into a grid
+        rendered: Whether the endpoint returns the schedule
+        loans_field: Request field listing loans, each costed from its own parameters
+        
+    Returns:
+        Dependency raising HTTP 429/503 with a Retry-After header when the request is refused
+    """
+    async def dependency(http_request: Request,
+                         x_priority: Optional[str] = Header(None, description="Set to bulk for batch work")):
+        if not admission_controller.enabled:
+            yield
+            return
+        try:
+            data = model(**await http_request.json()).dict()
+        except (ValueError, TypeError):
+            # Malformed bodies are rejected by the endpoint's own validation
+            data = None
+        if data is None:
+            cost = MIN_COST
+        elif loans_field:
+            cost = sum(request_cost(loan, multiplier, 1, rendered) for loan in data[loans_field]) or MIN_COST
+        else:
+            batch = batch_size(data, batch_field) if batch_field else 1
+            cost = request_cost(data, multiplier, batch, rendered)
+        try:
+            async with admission_controller.admit(client_identity(http_request), cost, x_priority):
+                yield
+        except AdmissionRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail,
+                                headers={"Retry-After": str(max(math.ceil(e.retry_after), 1))})
+    return dependency
+
 class CalculationRequest(BaseModel):
     house_price: Optional[float] = None
     down_payment: Optional[float] = None
@@ -22,6 +94,9 @@ class CalculationRequest(BaseModel):
     fixed_period: Optional[float] = None
     adjusted_interest_rate: Optional[float] = None
     table_view: str = "monthly"
+    views: Optional[List[str]] = None
+    custom_buckets: Optional[List[int]] = None
+    precision: str = "float"
 
 class CalculationResponse(BaseModel):
     calculated_field: str
@@ -31,20 +106,113 @@ class CalculationResponse(BaseModel):
     total_interest: float = 0
     total_cost: float = 0
     duration: int = 0
+    views: Optional[Dict[str, List[Dict]]] = None
+
+class ScheduleExportRequest(BaseModel):
+    loans: List[CalculationRequest]
+
+class AffordabilityRequest(BaseModel):
+    max_monthly_payment: float
+    max_total_cost: Optional[float] = None
+    bank_insurances: float = 0
+    down_payment_min: float = 0
+    down_payment_max: float
+    down_payment_steps: int = 11
+    tenors: List[str] = ["1M", "3M", "6M", "12M"]
+    base_rates: Optional[Dict[str, float]] = None
+    spreads: List[float]
+    loan_terms: List[float]
+    house_price: Optional[float] = None
+    top_k: int = 10
+
+class AffordabilityResponse(BaseModel):
+    grid_points: int
+    evaluated: int
+    feasible: int
+    base_rates: Dict[str, float]
+    frontier: List[Dict] = []
+    best: List[Dict] = []
+    ranked_by: str
+
+class ScheduleQuery(BaseModel):
+    type: str
+    month: Optional[int] = None
+    year: Optional[int] = None
+    from_month: Optional[int] = None
+    to_month: Optional[int] = None
+    date: Optional[str] = None
+
+class ScheduleQueryRequest(CalculationRequest):
+    start_date: Optional[str] = None
+    queries: List[ScheduleQuery] = []
+
+class ScheduleQueryResponse(BaseModel):
+    duration: int
+    total_interest: float
+    results: List[Dict] = []
+
+class RefinanceRequest(CalculationRequest):
+    tenor: str = "3M"
+    new_spread: float
+    start_date: str
+    from_date: str
+    to_date: str
+    switching_fee: float = 0
+    switching_fee_rate: float = 0
+    discount_rate: float = 0
+
+class RefinanceResponse(BaseModel):
+    tenor: str
+    new_spread: float
+    duration: int
+    candidates: int
+    best: Dict
+    rates_extrapolated_from: Optional[str] = None
+    results: List[Dict] = []
+
+class PayoffOptimizationRequest(CalculationRequest):
+    target: str = "duration"
+    target_value: float
+    variable: str = "extra_monthly"
+
+class PayoffOptimizationResponse(BaseModel):
+    variable: str
+    target: str
+    target_value: float
+    value: float
+    method: str
+    evaluations: int
+    total_interest: float
+    total_outlay: float
+    duration: int
+    baseline_total_interest: float
+    baseline_total_outlay: float
+    baseline_duration: int
 
 @router.get("/euribor/latest")
-async def get_latest_euribor_rate(tenor: str = Query("3M", description="EURIBOR tenor (1M, 3M, 6M, 12M)")):
+async def get_latest_euribor_rate(
+    tenor: str = Query("3M", description="EURIBOR tenor (1M, 3M, 6M, 12M)"),
+    x_profile: Optional[str] = Header(None, description="Set to 1 to profile this request (if enabled)")
+):
     """
     Get the latest EURIBOR rate for a specific tenor.
     
     Args:
         tenor (str): EURIBOR tenor (1M, 3M, 6M, 12M)
+        x_profile (str): Optional X-Profile header requesting profiling
         
     Returns:
         dict: Latest EURIBOR rate
     """
     try:
-        rate = get_latest_euribor(tenor)
+        watch = Stopwatch()
+        profile = None
+        if request_profiler.should_profile(x_profile):
+            rate, profile = await run_in_threadpool(profiled_call, get_latest_euribor, (tenor,))
+        else:
+            rate = await run_in_threadpool(get_latest_euribor, tenor)
+        watch.lap("fetch")
+        request_profiler.record("euribor_latest", {"tenor": tenor}, watch.stages, watch.elapsed, profile)
         if rate is None:
             raise HTTPException(status_code=404, detail=f"EURIBOR rate not found for tenor {tenor}")
         return {"tenor": tenor, "rate": rate, "timestamp": datetime.now()}
@@ -57,7 +225,8 @@ async def get_latest_euribor_rate(tenor: str = Query("3M", description="EURIBOR
 async def get_historical_euribor_rates(
     tenor: str = Query("3M", description="EURIBOR tenor (1M, 3M, 6M, 12M)"),
     from_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
-    to_date: str = Query(..., description="End date in YYYY-MM-DD format")
+    to_date: str = Query(..., description="End date in YYYY-MM-DD format"),
+    x_profile: Optional[str] = Header(None, description="Set to 1 to profile this request (if enabled)")
 ):
     """
     Get historical EURIBOR rates for a specific tenor within a date range.
@@ -66,6 +235,7 @@ async def get_historical_euribor_rates(
         tenor (str): EURIBOR tenor (1M, 3M, 6M, 12M)
         from_date (str): Start date in YYYY-MM-DD format
         to_date (str): End date in YYYY-MM-DD format
+        x_profile (str): Optional X-Profile header requesting profiling
         
     Returns:
         dict: Historical EURIBOR rates
@@ -78,58 +248,292 @@ async def get_historical_euribor_rates(
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
     
     try:
-        rates = get_historical_euribor(tenor, from_date, to_date)
+        watch = Stopwatch()
+        profile = None
+        if request_profiler.should_profile(x_profile):
+            rates, profile = await run_in_threadpool(
+                profiled_call, get_historical_euribor, (tenor, from_date, to_date))
+        else:
+            rates = await run_in_threadpool(get_historical_euribor, tenor, from_date, to_date)
+        watch.lap("fetch")
+        request_profiler.record("euribor_history", {"tenor": tenor, "from_date": from_date, "to_date": to_date},
+                                watch.stages, watch.elapsed, profile)
         return {"tenor": tenor, "from_date": from_date, "to_date": to_date, "rates": rates}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching historical EURIBOR rates: {str(e)}")
 
-@router.post("/calc", response_model=CalculationResponse)
-async def calculate_mortgage(request: CalculationRequest):
+@router.get("/calc/stats")
+async def get_calculation_stats():
+    """
+    Get calculation executor statistics.
+    
+    Returns:
+        dict: Inline/offloaded call counts and queue-time metrics
+    """
+    return calc_executor.stats()
+
+@router.get("/admission/stats")
+async def get_admission_stats():
+    """
+    Get admission control statistics.
+    
+    Returns:
+        dict: Requests running and queued per lane and the number of rate-limited clients tracked
+    """
+    return admission_controller.stats()
+
+@router.websocket("/calc/live")
+async def live_calculation(websocket: WebSocket):
+    """
+    Live recalculation session for interactive clients.
+    
+    The client sends field deltas; the server debounces bursts of edits and
+    replies with only the changed summary values and schedule rows. See
+    api/live.py for the message format. Each recalculation is admitted like
+    a /api/calc request from the same client.
+    """
+    await websocket.accept()
+    client = client_identity(websocket)
+    session = LiveSession(lambda fields: CalculationRequest(**fields).dict(),
+                          admit=lambda data: admission_controller.admit(client, request_cost(data, rendered=True)))
+    try:
+        await session.serve(websocket)
+    except WebSocketDisconnect:
+        pass
+
+@router.post("/calc", response_model=CalculationResponse,
+             dependencies=[Depends(admission(CalculationRequest, rendered=True))])
+async def calculate_mortgage(
+    request: CalculationRequest,
+    x_profile: Optional[str] = Header(None, description="Set to 1 to profile this request (if enabled)")
+):
     """
     Calculate mortgage details based on provided parameters.
     
     Args:
         request (CalculationRequest): Mortgage calculation parameters
+        x_profile (str): Optional X-Profile header requesting profiling
         
     Returns:
         CalculationResponse: Detailed mortgage calculation results
     """
     try:
+        watch = Stopwatch()
+        
         # Convert Pydantic model to dict for compatibility with existing functions
         data = request.dict()
+        cost = estimate_calculation_cost(data)
+        watch.lap("validation")
         
-        # Solve for unknown field
-        unknown_result = solve_for_unknown(data)
-        
-        # Calculate computed monthly payment if needed
-        computed_monthly_payment = None
-        if unknown_result and unknown_result["calculated_field"] == "monthly_payment":
-            computed_monthly_payment = unknown_result["calculated_value"]
-            data["monthly_payment"] = computed_monthly_payment
+        # Long schedules run on the calculation executor so they don't block the event loop
+        profile = None
+        if request_profiler.should_profile(x_profile):
+            (result, stats), profile = await calc_executor.run(
+                profiled_call, run_calculation_timed, (data,), cost=cost)
         else:
-            computed_monthly_payment = parse_float(data.get("monthly_payment"))
-        
-        # Simulate amortization
-        schedule, total_interest, total_cost, duration = simulate_amortization(
-            data, computed_monthly_payment)
-        
-        # Calculate total borrowed
-        house_price = parse_float(data.get("house_price"))
-        down_payment = parse_float(data.get("down_payment"))
-        total_borrowed = house_price - down_payment if house_price is not None and down_payment is not None else None
-        
-        return CalculationResponse(
-            calculated_field=unknown_result["calculated_field"] if unknown_result else "None",
-            calculated_value=unknown_result["calculated_value"] if unknown_result else 0,
-            total_borrowed=total_borrowed,
-            amortization=schedule,
-            total_interest=total_interest,
-            total_cost=total_cost,
-            duration=duration
-        )
+            result, stats = await calc_executor.run(run_calculation_timed, data, cost=cost)
+        # Solve/amortize timings come from the worker; executor queue time is tracked separately
+        watch.mark()
+        
+        # Serialize here rather than letting FastAPI re-validate the response model
+        response = CalculationResponse(**result)
+        body = response.model_dump_json() if hasattr(response, "model_dump_json") else response.json()
+        watch.lap("serialize")
+        
+        stages = dict(stats["stages"], **watch.stages)
+        observe_calc_stages(stages)
+        CALC_SOLVER_ITERATIONS.labels(result["calculated_field"]).observe(stats["iterations"])
+        CALC_SCHEDULE_LENGTH.observe(stats["schedule_length"])
+        
+        headers = {}
+        capture_id = request_profiler.record("calc", data, stages, watch.elapsed, profile)
+        if capture_id:
+            headers["X-Profile-Id"] = capture_id
+            if profile is None:
+                # The calculation is deterministic, so profiling a re-run reproduces the slow path
+                request_profiler.reprofile(capture_id, run_calculation_timed, (data,))
+        
+        return Response(content=body, media_type="application/json", headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating mortgage: {str(e)}")
+
+@router.post("/optimize/payoff", response_model=PayoffOptimizationResponse,
+             dependencies=[Depends(admission(PayoffOptimizationRequest, multiplier=10))])
+async def optimize_early_payoff(request: PayoffOptimizationRequest):
+    """
+    Solve for the extra payment needed to reach a payoff target.
+    
+    Answers questions like "how much extra per month to finish in 20 years?"
+    directly instead of by trial and error.
+    
+    Args:
+        request (PayoffOptimizationRequest): Loan parameters plus the target
+            ("duration" in months, "total_interest" or "total_outlay": everything
+            paid out, which unlike /api/calc's total_cost counts every extra
+            payment), the value it must not exceed and the variable
+            to solve for ("extra_monthly", "extra_annual" or "lump_sum")
+        
+    Returns:
+        PayoffOptimizationResponse: Required extra payment and resulting totals
+    """
+    try:
+        data = request.dict()
+        target = data.pop("target")
+        target_value = data.pop("target_value")
+        variable = data.pop("variable")
+        
+        # Each evaluation is a summary-only simulation; a search takes a few dozen
+        result = await calc_executor.run(optimize_payoff, data, target, target_value, variable,
+                                         cost=estimate_calculation_cost(data) * 10)
+        return PayoffOptimizationResponse(**result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error optimizing payoff: {str(e)}")
+
+@router.post("/schedule/query", response_model=ScheduleQueryResponse,
+             dependencies=[Depends(admission(ScheduleQueryRequest, multiplier=0.01, batch_field="queries"))])
+async def query_schedule(request: ScheduleQueryRequest):
+    """
+    Answer balance, interest and payoff queries without simulating the full schedule.
+    
+    Each query is answered in constant time per rate segment with closed-form
+    annuity formulas and matches what /api/calc's amortization table would show.
+    
+    Args:
+        request (ScheduleQueryRequest): Loan parameters, the loan start date
+            (for payoff queries) and a list of queries:
+            {"type": "balance", "month": k},
+            {"type": "interest", "year": y} or {"type": "interest", "from_month": a, "to_month": b},
+            {"type": "payoff", "date": "YYYY-MM-DD"}
+        
+    Returns:
+        ScheduleQueryResponse: Duration, total interest and one result per query
+    """
+    try:
+        data = request.dict()
+        queries = data.pop("queries")
+        start_date = data.pop("start_date")
+        data, monthly_payment = prepare_loan(data)
+        return ScheduleQueryResponse(**answer_queries(data, monthly_payment, queries, start_date))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying schedule: {str(e)}")
+
+@router.post("/schedule/export", response_class=StreamingResponse,
+             dependencies=[Depends(admission(ScheduleExportRequest, loans_field="loans"))])
+async def export_schedules(request: ScheduleExportRequest):
+    """
+    Stream the full monthly schedules of a portfolio of loans as a binary columnar file.
+    
+    The file (see api/export.py) holds one float64 array per schedule column
+    with an index of each loan's first row, aligned so that readers can
+    memory-map it and view any loan's schedule without parsing; use
+    api.export.ScheduleFile to read it.
+    
+    Args:
+        request (ScheduleExportRequest): Calculation parameters of each loan; loans
+            with precision "cents" are simulated in exact integer cents
+        
+    Returns:
+        StreamingResponse: The export file
+    """
+    try:
+        loans = [loan.dict() for loan in request.loans]
+        cost = sum(estimate_calculation_cost(loan) for loan in loans)
+        export = await calc_executor.run(build_export, loans, cost=cost)
+        return StreamingResponse(encode_export(export), media_type=MEDIA_TYPE,
+                                 headers={"Content-Disposition": 'attachment; filename="schedules.mcs"',
+                                          "X-Loan-Count": str(len(loans))})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting schedules: {str(e)}")
+
+@router.post("/affordability/search", response_model=AffordabilityResponse,
+             dependencies=[Depends(admission(AffordabilityRequest, multiplier=0.0002,
+                                             batch_field=("tenors", "spreads", "loan_terms", "down_payment_steps")))])
+async def search_affordability_grid(request: AffordabilityRequest):
+    """
+    Find the most house a budget buys across grids of EURIBOR tenors, spreads, terms and down payments.
+    
+    Every grid point is evaluated in one broadcast computation instead of
+    one solve per combination; combinations that cannot meet the budget are
+    pruned before the down payments are expanded.
+    
+    Args:
+        request (AffordabilityRequest): Budget (maximum monthly payment including
+            bank insurances, optional maximum total cost), down payment range,
+            the grids of tenors, spreads and terms, an optional target house
+            price and the number of options to return. Tenors without a rate in
+            base_rates use the latest EURIBOR fixing.
+        
+    Returns:
+        AffordabilityResponse: Grid size, points evaluated and feasible, the
+        base rates used, the frontier and the best options with what they are ranked by
+    """
+    try:
+        data = request.dict()
+        base_rates = {}
+        for tenor in dict.fromkeys(data.pop("tenors")):
+            rate = (data["base_rates"] or {}).get(tenor)
+            if rate is None:
+                rate = await run_in_threadpool(get_latest_euribor, tenor)
+            if rate is None:
+                raise HTTPException(status_code=404, detail=f"EURIBOR rate not found for tenor {tenor}")
+            base_rates[tenor] = rate
+        data["base_rates"] = base_rates
+        
+        # About a fifth of a simulated month per grid point
+        grid_points = len(base_rates) * len(data["spreads"]) * len(data["loan_terms"]) * data["down_payment_steps"]
+        result = await calc_executor.run(partial(search_affordability, **data), cost=grid_points // 5)
+        return AffordabilityResponse(base_rates=base_rates, **result)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching affordability: {str(e)}")
+
+@router.post("/refinance/analyze", response_model=RefinanceResponse,
+             dependencies=[Depends(admission(RefinanceRequest, multiplier=4))])
+async def analyze_refinancing(request: RefinanceRequest):
+    """
+    Compare keeping the current loan against switching to a EURIBOR-indexed loan at each month of a window.
+    
+    The EURIBOR history is fetched once and every candidate switch date is
+    evaluated against it in a single vectorized pass.
+    
+    Args:
+        request (RefinanceRequest): Current loan parameters, its start date, the
+            new loan's tenor and spread, switching fees, discount rate and the
+            window of candidate switch dates (from_date, to_date)
+        
+    Returns:
+        RefinanceResponse: Breakeven month, net savings and NPV per switch date, the best date by NPV,
+            and the last fixing carried forward to resets after it (rates_extrapolated_from), if any
+    """
+    try:
+        data = request.dict()
+        options = {key: data.pop(key) for key in ("tenor", "new_spread", "start_date", "from_date", "to_date",
+                                                  "switching_fee", "switching_fee_rate", "discount_rate")}
+        data, monthly_payment = prepare_loan(data)
+        
+        # Fixings before the window are not needed: rates only matter from the switch onwards,
+        # through every reset until the loan ends (or today, past which there are none)
+        history = await run_in_threadpool(get_historical_euribor, options["tenor"], options["from_date"],
+                                          history_end(data, options["start_date"], options["to_date"]))
+        result = await calc_executor.run(
+            analyze_refinance, data, monthly_payment, history, options["tenor"], options["new_spread"],
+            options["start_date"], options["from_date"], options["to_date"], options["switching_fee"],
+            options["switching_fee_rate"], options["discount_rate"], cost=estimate_calculation_cost(data) * 4)
+        return RefinanceResponse(**result)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calculating mortgage: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error analyzing refinance: {str(e)}")
@@ -0,0 +1,240 @@
+import calendar
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from .calculator import loan_parameters
+
+# Same stopping rules as simulate_amortization
+MAX_MONTHS = 1000
+BALANCE_EPSILON = 0.01
+
+QUERY_TYPES = ("balance", "interest", "payoff")
+
+def add_months(start: date, months: int) -> date:
+    """Add a number of months to a date, clamping the day to the end of the month."""
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+class ClosedFormSchedule:
+    """
+    Random-access view of the schedule simulate_amortization would produce.
+
+    Balances are computed with closed-form annuity formulas, jumping from one
+    rate segment (fixed period, then adjusted rate) to the next, so that
+    "balance after month k" costs O(1) instead of k simulated months. Regular
+    monthly extras fold into the annuity payment; annual extras are a
+    geometric series over the anniversary months.
+
+    Before payoff, the balance follows
+
+        B_k = B_{k-1} * (1 + r_k) - (monthly_payment + extra_monthly) - extra_annual * [k % 12 == 0]
+
+    and the simulation stops at the first month where this falls to 0.01 or
+    below (either a regular month or the final, partial payment).
+    """
+
+    def __init__(self, data: Dict, computed_monthly_payment: Optional[float]):
+        params = loan_parameters(data, computed_monthly_payment)
+        self.principal = params["principal"]
+        self.monthly_payment = params["monthly_payment"] or 0
+        self.extra_annual = params["extra_annual"]
+        self.outflow = self.monthly_payment + params["extra_monthly"]
+        self.fixed_months = params["fixed_months"]
+        self.r_fixed = params["r_fixed"] or 0
+        self.r_adjusted = params["r_adjusted"] or 0
+
+        # Segments as (start month, end month, monthly rate, balance at start month)
+        self.segments = []
+        start, balance = 0, self.principal
+        boundaries = [(min(self.fixed_months, MAX_MONTHS), self.r_fixed), (MAX_MONTHS, self.r_adjusted)]
+        for end, rate in boundaries:
+            if end > start:
+                self.segments.append((start, end, rate, balance))
+                balance = self._advance(balance, start, end - start, rate)
+                start = end
+
+        self.duration, self.paid_off = self._find_duration()
+
+    def _advance(self, balance: float, start: int, months: int, rate: float) -> float:
+        """Balance `months` months after month `start`, at a constant rate, ignoring payoff."""
+        if months <= 0:
+            return balance
+        end = start + months
+        first_annual = (start // 12 + 1) * 12
+        annual_count = (end - first_annual) // 12 + 1 if first_annual <= end else 0
+
+        if rate == 0:
+            return balance - self.outflow * months - self.extra_annual * annual_count
+
+        growth = 1 + rate
+        growth_k = growth**months
+        result = balance * growth_k - self.outflow * (growth_k - 1) / rate
+        if annual_count and self.extra_annual:
+            last_annual = first_annual + 12 * (annual_count - 1)
+            growth_year = growth**12
+            result -= self.extra_annual * growth**(end - last_annual) * (growth_year**annual_count - 1) / (growth_year - 1)
+        return result
+
+    def _segment_for(self, month: int):
+        for segment in self.segments:
+            if month <= segment[1]:
+                return segment
+        return self.segments[-1]
+
+    def _raw_balance(self, month: int) -> float:
+        """Balance after `month` months following the recurrence, ignoring payoff."""
+        if month <= 0 or not self.segments:
+            return self.principal
+        start, _, rate, balance = self._segment_for(month)
+        return self._advance(balance, start, month - start, rate)
+
+    def _find_duration(self):
+        """
+        Number of months simulate_amortization runs, and whether the loan is paid off.
+
+        Within a segment the balance is monotone once interest no longer exceeds
+        the monthly outflow, so the payoff month is found by binary search.
+        Negative amortization offset by annual extras is not monotone and
+        is scanned month by month instead.
+        """
+        if self.principal <= BALANCE_EPSILON or not self.segments:
+            return 0, True
+        for start, end, rate, balance in self.segments:
+            if balance * rate <= self.outflow:
+                if self._advance(balance, start, end - start, rate) > BALANCE_EPSILON:
+                    continue
+                lo, hi = start + 1, end
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if self._advance(balance, start, mid - start, rate) <= BALANCE_EPSILON:
+                        hi = mid
+                    else:
+                        lo = mid + 1
+                return lo, True
+            if not self.extra_annual:
+                # Interest exceeds the payment and nothing else reduces the balance
+                continue
+            current = balance
+            for month in range(start + 1, end + 1):
+                current = current * (1 + rate) - self.outflow - (self.extra_annual if month % 12 == 0 else 0)
+                if current <= BALANCE_EPSILON:
+                    return month, True
+        return MAX_MONTHS, False
+
+    def _rate(self, month: int) -> float:
+        return self.r_fixed if month <= self.fixed_months else self.r_adjusted
+
+    def balance(self, month: int) -> float:
+        """
+        Remaining balance after the payment of month `month` (month 0 is the principal).
+        """
+        if month <= 0:
+            return self.principal
+        if month >= self.duration:
+            return 0 if self.paid_off else max(self._raw_balance(self.duration), 0)
+        return self._raw_balance(month)
+
+    def interest(self, from_month: int, to_month: int) -> float:
+        """
+        Interest paid from month from_month to month to_month, inclusive.
+
+        For every month before the last, interest = balance change + outflow, so
+        the sum telescopes to a balance difference plus the outflows in range.
+        The final month's interest is taken directly from its opening balance.
+        """
+        from_month = max(from_month, 1)
+        to_month = min(to_month, self.duration)
+        if to_month < from_month:
+            return 0
+
+        last_regular = min(to_month, self.duration - 1)
+        total = 0
+        if last_regular >= from_month:
+            months = last_regular - from_month + 1
+            annual_months = last_regular // 12 - (from_month - 1) // 12
+            total = (self._raw_balance(last_regular) - self._raw_balance(from_month - 1)
+                     + self.outflow * months + self.extra_annual * annual_months)
+        if to_month == self.duration:
+            total += self._raw_balance(self.duration - 1) * self._rate(self.duration)
+        return total
+
+    def interest_in_year(self, year: int) -> float:
+        """Interest paid in loan year `year` (months 12 * (year - 1) + 1 to 12 * year)."""
+        return self.interest(12 * (year - 1) + 1, 12 * year)
+
+    def payoff_amount(self, on_date: date, start_date: date) -> float:
+        """
+        Amount needed to repay the loan in full on a given date.
+
+        Installment k falls due k months after start_date. The payoff amount is
+        the balance after the last installment due on or before on_date plus
+        interest accrued pro rata by day since that installment.
+        """
+        if on_date < start_date:
+            raise ValueError("Payoff date must not be before the loan start date.")
+        months = (on_date.year - start_date.year) * 12 + on_date.month - start_date.month
+        if add_months(start_date, months) > on_date:
+            months -= 1
+        balance = self.balance(months)
+        if balance <= 0:
+            return 0
+        period_start = add_months(start_date, months)
+        period_days = (add_months(start_date, months + 1) - period_start).days
+        elapsed_days = (on_date - period_start).days
+        return balance * (1 + self._rate(months + 1) * elapsed_days / period_days)
+
+def _parse_date(value: Optional[str], field: str) -> date:
+    if not value:
+        raise ValueError(f"{field} is required for payoff queries.")
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"Invalid {field}: {value}. Use YYYY-MM-DD.")
+
+def answer_queries(data: Dict, computed_monthly_payment: Optional[float], queries: List[Dict],
+                   start_date: Optional[str] = None) -> Dict:
+    """
+    Answer many balance/interest/payoff queries against one loan.
+
+    Args:
+        data: Dictionary containing mortgage calculation parameters
+        computed_monthly_payment: Pre-computed monthly payment if available
+        queries: Query dictionaries, each with a "type" and its arguments:
+            balance (month), interest (year, or from_month/to_month) or payoff (date)
+        start_date: Loan start date in YYYY-MM-DD format, needed for payoff queries
+
+    Returns:
+        Dictionary with the schedule's duration and total interest and one
+        result per query, in order
+    """
+    schedule = ClosedFormSchedule(data, computed_monthly_payment)
+    start = None
+    results = []
+    for query in queries:
+        query_type = query.get("type")
+        if query_type == "balance":
+            if query.get("month") is None:
+                raise ValueError("Balance queries require a month.")
+            value = schedule.balance(int(query["month"]))
+        elif query_type == "interest":
+            if query.get("year") is not None:
+                value = schedule.interest_in_year(int(query["year"]))
+            elif query.get("from_month") is not None and query.get("to_month") is not None:
+                value = schedule.interest(int(query["from_month"]), int(query["to_month"]))
+            else:
+                raise ValueError("Interest queries require a year or from_month and to_month.")
+        elif query_type == "payoff":
+            if start is None:
+                start = _parse_date(start_date, "start_date")
+            value = schedule.payoff_amount(_parse_date(query.get("date"), "date"), start)
+        else:
+            raise ValueError(f"Invalid query type: {query_type}. Must be one of {list(QUERY_TYPES)}")
+        results.append(dict({k: v for k, v in query.items() if v is not None}, value=value))
+
+    return {
+        "duration": schedule.duration,
+        "total_interest": schedule.interest(1, schedule.duration),
+        "results": results
+    }
@@ -0,0 +1,467 @@
+"""
+State shared by every worker process.
+
+Caches and saved scenarios used to live in module-level dicts, so each
+uvicorn/gunicorn worker had its own copy: every worker refetched EURIBOR
+rates, and a scenario saved on one worker was invisible to the others. They
+now live in a StateBackend that all workers reach:
+
+    SQLiteBackend   a local SQLite file in WAL mode (default), for workers on one host
+    RedisBackend    any redis-py compatible client, for workers on several hosts
+    MemoryBackend   process memory, for a single worker
+
+The backend selected by STATE_BACKEND is created on first use, not at import,
+so importing the API (e.g. from tools or tests) opens no file or connection.
+A relative STATE_SQLITE_PATH is resolved against the backend directory, so
+every entry point (backend/main.py, the root app.py, tools) shares one file
+whatever its working directory.
+
+Keys may be written with a TTL, which the backend enforces: Redis expires
+them itself (SET ... PX), SQLite stores an expires_at column that reads
+filter on and an indexed purge deletes every STATE_PURGE_INTERVAL seconds,
+so a cache of many distinct keys does not grow without limit.
+
+SharedMapping puts a dict-like namespace of JSON values on top of a backend,
+with a per-worker L1 cache in front. Every write also stores a new random
+version token for that key; a worker checks the token of an L1 entry at most
+once per L1 TTL and reloads only that entry when another worker has written
+it, so reads are served from process memory, are never more than one TTL
+stale, and a write to one key leaves the other keys cached.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "sqlite")
+STATE_SQLITE_PATH = os.path.join(BACKEND_DIR, os.environ.get("STATE_SQLITE_PATH", "state.db"))
+STATE_REDIS_URL = os.environ.get("STATE_REDIS_URL", "redis://localhost:6379/0")
+STATE_L1_TTL = float(os.environ.get("STATE_L1_TTL", "2"))
+STATE_PURGE_INTERVAL = float(os.environ.get("STATE_PURGE_INTERVAL", "60"))
+
+VERSION_PREFIX = "__version__:"
+
+
+class StateBackend(ABC):
+    """Key-value store of strings shared by all workers."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Value of a key, or None if it is not set."""
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """Set a key, expiring after ttl seconds if given."""
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Delete a key; returns whether it existed."""
+
+    @abstractmethod
+    def keys(self, prefix: str) -> List[str]:
+        """All keys starting with prefix."""
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Atomically increment an integer counter and return its new value."""
+
+    def counter(self, key: str) -> int:
+        """Current value of a counter (0 if unset)."""
+        value = self.get(key)
+        return int(value) if value is not None else 0
+
+    def clear(self, prefix: str) -> None:
+        """Delete every key starting with prefix."""
+        for key in self.keys(prefix):
+            self.delete(key)
+
+
+class MemoryBackend(StateBackend):
+    """Process-local backend: only correct with a single worker."""
+
+    def __init__(self, purge_interval: float = STATE_PURGE_INTERVAL):
+        self.purge_interval = purge_interval
+        self._data: Dict[str, str] = {}
+        self._expires: Dict[str, float] = {}
+        self._next_purge = 0.0
+        self._lock = threading.Lock()
+
+    def _live(self, key: str, now: float) -> bool:
+        return key in self._data and self._expires.get(key, now + 1) > now
+
+    def get(self, key: str) -> Optional[str]:
+        return self._data.get(key) if self._live(key, time.time()) else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._data[key] = value
+            if ttl is not None:
+                self._expires[key] = now + ttl
+            else:
+                self._expires.pop(key, None)
+            if now >= self._next_purge:
+                self.purge(now)
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """Delete expired keys; returns how many."""
+        now = time.time() if now is None else now
+        expired = [key for key, expires_at in list(self._expires.items()) if expires_at <= now]
+        for key in expired:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        self._next_purge = now + self.purge_interval
+        return len(expired)
+
+    def delete(self, key: str) -> bool:
+        live = self._live(key, time.time())
+        self._expires.pop(key, None)
+        return self._data.pop(key, None) is not None and live
+
+    def keys(self, prefix: str) -> List[str]:
+        now = time.time()
+        return [key for key in list(self._data) if key.startswith(prefix) and self._live(key, now)]
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self.get(key) or 0) + 1
+            self._data[key] = str(value)
+            self._expires.pop(key, None)
+            return value
+
+
+class SQLiteBackend(StateBackend):
+    """
+    Backend on a local SQLite file, shared by the workers of one host.
+
+    WAL mode lets readers proceed while a worker writes. Each process opens
+    its own connection (connections must not cross a fork) and threads share
+    it under a lock. Rows written with a TTL carry an expires_at timestamp:
+    reads skip expired rows, and writes delete them through the expires_at
+    index at most once per purge_interval seconds.
+    """
+
+    def __init__(self, path: str = STATE_SQLITE_PATH, timeout: float = 5.0,
+                 purge_interval: float = STATE_PURGE_INTERVAL):
+        self.path = path
+        self.timeout = timeout
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._next_purge = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS state "
+                               "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)")
+            # Files created before expiry was supported lack the column
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(state)")]
+            if "expires_at" not in columns:
+                connection.execute("ALTER TABLE state ADD COLUMN expires_at REAL")
+            connection.execute("CREATE INDEX IF NOT EXISTS state_expires_at ON state (expires_at)")
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute("INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                               (key, value, now + ttl if ttl is not None else None))
+            if now >= self._next_purge:
+                self._purge(connection, now)
+
+    def _purge(self, connection: sqlite3.Connection, now: float) -> int:
+        self._next_purge = now + self.purge_interval
+        return connection.execute("DELETE FROM state WHERE expires_at <= ?", (now,)).rowcount
+
+    def purge(self) -> int:
+        """Delete expired rows; returns how many."""
+        with self._lock:
+            return self._purge(self._connect(), time.time())
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            # An expired row is left to the purge: deleting it would report a key that was already gone
+            return self._connect().execute(
+                "DELETE FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())).rowcount > 0
+
+    def keys(self, prefix: str) -> List[str]:
+        # Range scan on the primary key instead of LIKE, which would need escaping
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT key FROM state WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?) "
+                "ORDER BY key", (prefix, prefix + "\U0010ffff", time.time())).fetchall()
+        return [row[0] for row in rows]
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute("SELECT value FROM state WHERE key = ? AND "
+                                         "(expires_at IS NULL OR expires_at > ?)", (key, time.time())).fetchone()
+                value = int(row[0]) + 1 if row else 1
+                connection.execute("INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, NULL)",
+                                   (key, str(value)))
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            return value
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+
+class RedisBackend(StateBackend):
+    """
+    Networked backend for workers on several hosts.
+
+    Args:
+        client: A redis-py compatible client (get, set, delete, scan_iter, incr);
+            tests can pass an in-process fake with the same methods
+        prefix: Prefix for every key, to share a Redis database with other apps
+    """
+
+    def __init__(self, client, prefix: str = "mortgage:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str = STATE_REDIS_URL, **kwargs) -> "RedisBackend":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("STATE_BACKEND=redis requires the redis package (pip install redis)")
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    @staticmethod
+    def _decode(value) -> Optional[str]:
+        return value.decode() if isinstance(value, bytes) else value
+
+    def get(self, key: str) -> Optional[str]:
+        return self._decode(self.client.get(self.prefix + key))
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        if ttl is None:
+            self.client.set(self.prefix + key, value)
+        else:
+            self.client.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    def delete(self, key: str) -> bool:
+        return bool(self.client.delete(self.prefix + key))
+
+    def keys(self, prefix: str) -> List[str]:
+        pattern = (self.prefix + prefix).replace("[", "\\[").replace("*", "\\*").replace("?", "\\?") + "*"
+        start = len(self.prefix)
+        return sorted(self._decode(key)[start:] for key in self.client.scan_iter(match=pattern))
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self.prefix + key))
+
+
+def create_backend(kind: str = STATE_BACKEND) -> StateBackend:
+    """
+    Create the backend selected by STATE_BACKEND.
+
+    Args:
+        kind: "sqlite", "redis" or "memory"
+    """
+    if kind == "sqlite":
+        return SQLiteBackend()
+    if kind == "redis":
+        return RedisBackend.from_url()
+    if kind == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Invalid STATE_BACKEND: {kind}. Must be one of ['sqlite', 'redis', 'memory']")
+
+
+class LazyBackend(StateBackend):
+    """
+    Backend created by a factory on first use, then delegated to.
+
+    Args:
+        factory: Builds the real backend (create_backend by default)
+    """
+
+    def __init__(self, factory: Callable[[], StateBackend] = create_backend):
+        self.factory = factory
+        self._backend: Optional[StateBackend] = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> StateBackend:
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self.factory()
+        return self._backend
+
+    def get(self, key: str) -> Optional[str]:
+        return self.backend.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self.backend.set(key, value, ttl)
+
+    def delete(self, key: str) -> bool:
+        return self.backend.delete(key)
+
+    def keys(self, prefix: str) -> List[str]:
+        return self.backend.keys(prefix)
+
+    def incr(self, key: str) -> int:
+        return self.backend.incr(key)
+
+    def counter(self, key: str) -> int:
+        return self.backend.counter(key)
+
+    def clear(self, prefix: str) -> None:
+        self.backend.clear(prefix)
+
+
+class SharedMapping(MutableMapping):
+    """
+    Dict-like namespace of JSON-serializable values in a StateBackend, with a per-worker L1 cache.
+
+    Values go through JSON, so tuples come back as lists. Lookups of single
+    keys are served from the L1 cache while it is fresh; iteration and len()
+    always read the backend, so listings include entries other workers just wrote.
+
+    Args:
+        backend: Shared backend
+        namespace: Key prefix separating this mapping from others in the backend
+        l1_ttl: Seconds between checks of an L1 entry's version; 0 disables the L1 cache
+        ttl: Seconds after which the backend drops an entry; None keeps entries until deleted
+    """
+
+    def __init__(self, backend: StateBackend, namespace: str, l1_ttl: float = STATE_L1_TTL,
+                 ttl: Optional[float] = None):
+        self.backend = backend
+        self.namespace = namespace
+        self.prefix = namespace + ":"
+        self.version_prefix = VERSION_PREFIX + self.prefix
+        self.l1_ttl = l1_ttl
+        self.ttl = ttl
+        # key -> [value, version token, last check (monotonic), expiry (wall clock) or None]
+        self._l1: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._stats = {"l1_hits": 0, "hits": 0, "misses": 0}
+
+    def _cached(self, key: str) -> Tuple[bool, Any]:
+        """(True, value) if the L1 entry of key is still current, else (False, None)."""
+        with self._lock:
+            entry = self._l1.get(key)
+        if entry is None:
+            return False, None
+        value, version, checked_at, expires_at = entry
+        if expires_at is not None and time.time() >= expires_at:
+            self._drop(key, entry)
+            return False, None
+        now = time.monotonic()
+        if now - checked_at < self.l1_ttl:
+            return True, value
+        # Due for a check: one small read of the version token instead of the value
+        if self.backend.get(self.version_prefix + key) != version:
+            self._drop(key, entry)
+            return False, None
+        entry[2] = now
+        return True, value
+
+    def _drop(self, key: str, entry: list) -> None:
+        with self._lock:
+            if self._l1.get(key) is entry:
+                del self._l1[key]
+
+    def _remember(self, key: str, value: Any, version: Optional[str]) -> None:
+        if self.l1_ttl <= 0 or version is None:
+            return
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._l1[key] = [value, version, time.monotonic(), expires_at]
+
+    def __getitem__(self, key: str) -> Any:
+        if self.l1_ttl > 0:
+            hit, value = self._cached(key)
+            if hit:
+                self._stats["l1_hits"] += 1
+                return value
+            # Read the version before the value: a write in between leaves an older
+            # token with the newer value, which the next check simply reloads
+            version = self.backend.get(self.version_prefix + key)
+        raw = self.backend.get(self.prefix + key)
+        if raw is None:
+            self._stats["misses"] += 1
+            raise KeyError(key)
+        self._stats["hits"] += 1
+        value = json.loads(raw)
+        if self.l1_ttl > 0:
+            self._remember(key, value, version)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        # Store what a reader would load, so the L1 copy matches other workers'
+        value = json.loads(json.dumps(value))
+        version = uuid.uuid4().hex
+        self.backend.set(self.prefix + key, json.dumps(value), self.ttl)
+        self.backend.set(self.version_prefix + key, version, self.ttl)
+        self._remember(key, value, version)
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            self._l1.pop(key, None)
+        existed = self.backend.delete(self.prefix + key)
+        self.backend.delete(self.version_prefix + key)
+        if not existed:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        start = len(self.prefix)
+        return iter([key[start:] for key in self.backend.keys(self.prefix)])
+
+    def __len__(self) -> int:
+        return len(self.backend.keys(self.prefix))
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def clear(self) -> None:
+        self.backend.clear(self.prefix)
+        self.backend.clear(self.version_prefix)
+        with self._lock:
+            self._l1.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Lookup counts: served by the L1 cache, by the backend, or missing."""
+        return dict(self._stats)
+
+
+# Initialize the backend shared by this process's mappings (created on first use)
+shared_backend = LazyBackend()
@@ -0,0 +1,144 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .harness import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    """Ask the OS for an unused local TCP port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalServer:
+    """
+    Runs the FastAPI app from main.py under uvicorn in a subprocess.
+    
+    Usable as a context manager; the server is stopped on exit.
+    """
+    
+    def __init__(self, port: Optional[int] = None, workers: int = 1, env: Optional[Dict[str, str]] = None):
+        self.port = port or free_port()
+        self.workers = workers
+        self.env = env or {}
+        self.process: Optional[subprocess.Popen] = None
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+    
+    def start(self, timeout: float = 20.0) -> None:
+        env = dict(os.environ)
+        env.update(self.env)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("uvicorn exited before becoming healthy")
+            try:
+                with urllib.request.urlopen(f"{self.base_url}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError(f"uvicorn did not become healthy within {timeout}s")
+    
+    def stop(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def post_json(url: str, payload: Dict, timeout: float = 30.0) -> int:
+    """POST a JSON payload and return the status code, reading the full body."""
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+
+
+def measure_throughput(url: str, payloads: List[Dict], concurrency: int) -> Dict:
+    """
+    Send every payload once using a pool of concurrent clients.
+    
+    Args:
+        url: Endpoint to POST to
+        payloads: Request bodies to send
+        concurrency: Number of concurrent clients
+        
+    Returns:
+        Dict: Throughput, latency percentiles (seconds) and error count
+    """
+    def send(payload):
+        start = time.perf_counter()
+        status = post_json(url, payload)
+        return time.perf_counter() - start, status
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(send, payloads))
+    elapsed = time.perf_counter() - start
+    
+    latencies = [latency for latency, _ in outcomes]
+    errors = sum(1 for _, status in outcomes if status >= 400)
+    return {
+        "requests": len(payloads),
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": len(payloads) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies) if latencies else 0.0,
+    }
+
+
+def run_e2e(payloads: Dict[str, Dict], requests: int = 500, concurrency: int = 16,
+            workers: int = 1, env: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+    """
+    Measure /api/calc throughput against a local uvicorn for each named payload.
+    
+    Returns:
+        Dict[str, Dict]: Throughput results keyed by "e2e.calc.<name>"
+    """
+    results = {}
+    # A single load generator would hit the per-client rate limit: measure raw capacity instead
+    env = dict({"ADMISSION_ENABLED": "0"}, **(env or {}))
+    with LocalServer(workers=workers, env=env) as server:
+        url = f"{server.base_url}/api/calc"
+        for name, payload in payloads.items():
+            measure_throughput(url, [payload] * concurrency, concurrency)  # Warm up
+            results[f"e2e.calc.{name}"] = measure_throughput(url, [payload] * requests, concurrency)
+    return results
@@ -0,0 +1,183 @@
+import json
+import math
+import platform
+import statistics
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Registered benchmark cases, keyed by name
+BENCHMARKS: Dict[str, Callable[[], None]] = {}
+
+
+def benchmark(name: str):
+    """
+    Register a zero-argument callable as a benchmark case.
+    
+    Args:
+        name (str): Dotted benchmark name, e.g. "calculator.solve.house_price"
+    """
+    def decorator(fn: Callable[[], None]) -> Callable[[], None]:
+        if name in BENCHMARKS:
+            raise ValueError(f"Duplicate benchmark name: {name}")
+        BENCHMARKS[name] = fn
+        return fn
+    return decorator
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def time_function(fn: Callable[[], None], min_time: float = 0.2, repeat: int = 5) -> Dict:
+    """
+    Time a callable, timeit style.
+    
+    The number of calls per round is calibrated so that each round takes at
+    least min_time / repeat seconds, then repeat rounds are timed.
+    
+    Args:
+        fn: Callable to time
+        min_time: Approximate total time budget in seconds
+        repeat: Number of timed rounds
+        
+    Returns:
+        Dict: Per-call timings in seconds (min, median, mean, max) and call counts
+    """
+    fn()  # Warm up caches and lazy imports
+    
+    number = 1
+    round_budget = min_time / repeat
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= round_budget or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < round_budget / 10 else 2
+    
+    per_call = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - start) / number)
+    
+    return {
+        "min": min(per_call),
+        "median": statistics.median(per_call),
+        "mean": statistics.mean(per_call),
+        "max": max(per_call),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run_benchmarks(pattern: Optional[str] = None, min_time: float = 0.2, repeat: int = 5) -> Dict[str, Dict]:
+    """
+    Run all registered benchmarks whose name contains pattern.
+    
+    Returns:
+        Dict[str, Dict]: Timings keyed by benchmark name
+    """
+    results = {}
+    for name in sorted(BENCHMARKS):
+        if pattern and pattern not in name:
+            continue
+        results[name] = time_function(BENCHMARKS[name], min_time=min_time, repeat=repeat)
+    return results
+
+
+def build_report(results: Dict[str, Dict], extra: Optional[Dict] = None) -> Dict:
+    """Wrap benchmark results with machine metadata for storage."""
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "benchmarks": results,
+    }
+    if extra:
+        report.update(extra)
+    return report
+
+
+def load_report(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_report(report: Dict, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def compare_reports(current: Dict, baseline: Dict, threshold: float = 0.2, metric: str = "median") -> List[Dict]:
+    """
+    Compare benchmark timings against a baseline report.
+    
+    Args:
+        current: Report from this run
+        baseline: Stored baseline report
+        threshold: Relative slowdown above which a benchmark counts as a regression
+        metric: Timing statistic to compare
+        
+    Returns:
+        List[Dict]: One entry per benchmark present in both reports
+    """
+    comparisons = []
+    for name, timings in sorted(current["benchmarks"].items()):
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base or not base.get(metric):
+            continue
+        ratio = timings[metric] / base[metric]
+        comparisons.append({
+            "name": name,
+            "baseline": base[metric],
+            "current": timings[metric],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold,
+            "improvement": ratio < 1 - threshold,
+        })
+    return comparisons
+
+
+def print_comparison(current: Dict, baseline: Dict, threshold: float = 0.2, metric: str = "median",
+                     label: str = "benchmark", width: int = 50) -> int:
+    """
+    Print how a report compares with a baseline, one line per entry present in both.
+
+    Args:
+        current: Report from this run
+        baseline: Stored baseline report
+        threshold: Relative slowdown above which an entry counts as a regression
+        metric: Timing statistic to compare
+        label: What an entry is, for the regression summary (e.g. "scenario")
+        width: Width of the name column
+
+    Returns:
+        int: Number of regressions
+    """
+    comparisons = compare_reports(current, baseline, threshold=threshold, metric=metric)
+    regressions = [c for c in comparisons if c["regression"]]
+    for c in comparisons:
+        flag = "REGRESSION" if c["regression"] else ("improved" if c["improvement"] else "")
+        print(f"{c['name']:<{width}} {c['ratio']:>6.2f}x  {flag}")
+    if regressions:
+        print(f"{len(regressions)} {label}(s) regressed by more than {threshold:.0%}")
+    return len(regressions)
+
+
+def format_seconds(seconds: float) -> str:
+    """Human-readable duration."""
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} ms"
+    return f"{seconds * 1e6:.3f} us"
@@ -0,0 +1,85 @@
+"""
+Run the backend benchmark suite.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.run                         # micro benchmarks
+    python -m benchmarks.run --e2e                   # plus /api/calc throughput
+    python -m benchmarks.run --output results.json   # machine-readable report
+    python -m benchmarks.run --save-baseline         # store benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.2
+
+Exits with status 1 when any benchmark regresses beyond the threshold.
+"""
+import argparse
+import os
+import sys
+
+from . import suites
+from .e2e import run_e2e
+from .harness import (build_report, format_seconds, load_report, print_comparison,
+                      run_benchmarks, save_report)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+E2E_PAYLOADS = {
+    "10y": suites.loan(loan_term=10),
+    "30y": suites.loan(loan_term=30),
+    "30y_yearly": suites.loan(loan_term=30, table_view="yearly"),
+    "solve_term": suites.loan(loan_term=None, monthly_payment=suites.BASE_PAYMENT),
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mortgage Calculator backend benchmarks")
+    parser.add_argument("-k", "--filter", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Time budget per benchmark in seconds")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed rounds per benchmark")
+    parser.add_argument("--e2e", action="store_true", help="Also measure /api/calc throughput against a local uvicorn")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per end-to-end scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients for end-to-end scenarios")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for end-to-end scenarios")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--baseline", help="Compare against this baseline report")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE,
+                        help=f"Store this run as the baseline (default {DEFAULT_BASELINE})")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown counted as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    
+    results = run_benchmarks(args.filter, min_time=args.min_time, repeat=args.repeat)
+    for name, timings in results.items():
+        print(f"{name:<50} {format_seconds(timings['median']):>12}  (min {format_seconds(timings['min'])})")
+    
+    e2e_results = {}
+    if args.e2e:
+        payloads = {name: payload for name, payload in E2E_PAYLOADS.items()
+                    if not args.filter or args.filter in f"e2e.calc.{name}"}
+        e2e_results = run_e2e(payloads, requests=args.requests, concurrency=args.concurrency,
+                              workers=args.workers)
+        for name, stats in e2e_results.items():
+            print(f"{name:<50} {stats['throughput']:>8.1f} req/s  p50 {format_seconds(stats['p50'])}  "
+                  f"p99 {format_seconds(stats['p99'])}  errors {stats['errors']}")
+    
+    # End-to-end latency is compared on p50 alongside the micro benchmark medians
+    for name, stats in e2e_results.items():
+        results[name] = dict(stats, median=stats["p50"])
+    report = build_report(results)
+    
+    if args.output:
+        save_report(report, args.output)
+    if args.save_baseline:
+        save_report(report, args.save_baseline)
+        print(f"Baseline saved to {args.save_baseline}")
+    
+    if args.baseline:
+        if print_comparison(report, load_report(args.baseline), threshold=args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
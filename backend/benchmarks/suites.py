@@ -0,0 +1,271 @@
+import os
+import tempfile
+
+from api.affordability import search_affordability
+from api.calculator import (loan_parameters, solve_for_unknown, simulate_amortization, summarize_amortization,
+                            run_calculation)
+from api.euribor import EuriborAPI
+from api.exact import amortize_cents, simulate_amortization_cents
+from api.export import build_export, encode_export
+from api.optimizer import optimize_payoff
+from api.refinance import analyze_refinance
+from api.schedule_query import ClosedFormSchedule
+from api.routes import CalculationRequest, CalculationResponse
+from api.shared_state import SQLiteBackend
+
+from .harness import benchmark
+
+# EuriborAPI instances here use a throwaway SQLite state file, so clearing
+# their cache never touches the one the API serves from
+STATE_DIR = tempfile.TemporaryDirectory(prefix="benchmark-state-")
+
+
+def private_euribor_api() -> EuriborAPI:
+    return EuriborAPI(SQLiteBackend(os.path.join(STATE_DIR.name, "state.db")))
+
+
+BASE_LOAN = {
+    "house_price": 300000,
+    "down_payment": 60000,
+    "loan_term": 30,
+    "interest_rate": 3.0,
+    "monthly_payment": None,
+    "bank_spread": 1.0,
+    "bank_insurances": 25,
+    "extra_monthly": 0,
+    "extra_annual": 0,
+    "extra_fee_rate": 0,
+    "loan_type": "fixed",
+    "fixed_period": None,
+    "adjusted_interest_rate": None,
+    "table_view": "monthly",
+}
+
+# Monthly payment of BASE_LOAN, used to pose the other unknowns
+BASE_PAYMENT = solve_for_unknown(BASE_LOAN)["calculated_value"]
+
+
+def loan(**overrides):
+    data = dict(BASE_LOAN)
+    data.update(overrides)
+    return data
+
+
+# solve_for_unknown, one case per unknown field
+
+SOLVE_CASES = {
+    "house_price": loan(house_price=None, monthly_payment=BASE_PAYMENT),
+    "down_payment": loan(down_payment=None, monthly_payment=BASE_PAYMENT),
+    "loan_term": loan(loan_term=None, monthly_payment=BASE_PAYMENT),
+    "interest_rate": loan(interest_rate=None, monthly_payment=BASE_PAYMENT),
+    "monthly_payment": loan(),
+}
+
+
+def _register_solve(unknown, data):
+    @benchmark(f"calculator.solve.{unknown}")
+    def bench():
+        solve_for_unknown(data)
+
+
+for _unknown, _data in SOLVE_CASES.items():
+    _register_solve(_unknown, _data)
+
+
+# simulate_amortization across terms, loan types and table views
+
+LOAN_TYPES = {
+    "fixed": {"loan_type": "fixed"},
+    "adjustable": {"loan_type": "adjustable", "fixed_period": 5, "adjusted_interest_rate": 4.0},
+    "full_variable": {"loan_type": "full_variable"},
+}
+
+
+def _register_amortization(term, loan_type, view):
+    data = loan(loan_term=term, table_view=view, extra_monthly=100, extra_annual=1000,
+                extra_fee_rate=0.5, **LOAN_TYPES[loan_type])
+    payment = solve_for_unknown(data)["calculated_value"]
+    
+    @benchmark(f"calculator.amortize.{loan_type}.{term}y.{view}")
+    def bench():
+        simulate_amortization(data, payment)
+
+
+for _term in (10, 30, 50):
+    for _loan_type in LOAN_TYPES:
+        for _view in ("monthly", "yearly"):
+            _register_amortization(_term, _loan_type, _view)
+
+
+@benchmark("calculator.run_calculation.30y")
+def bench_run_calculation():
+    run_calculation(BASE_LOAN)
+
+
+@benchmark("calculator.run_calculation.30y.four_views")
+def bench_run_calculation_views():
+    run_calculation(loan(views=["monthly", "quarterly", "yearly", "rate_period"]))
+
+
+@benchmark("calculator.summarize.30y")
+def bench_summarize():
+    summarize_amortization(BASE_LOAN, BASE_PAYMENT)
+
+
+# Exact integer-cent mode against the float fast path
+
+EXTRAS_LOAN = loan(extra_monthly=100, extra_annual=1000, extra_fee_rate=0.5, **LOAN_TYPES["adjustable"])
+EXTRAS_PAYMENT = solve_for_unknown(EXTRAS_LOAN)["calculated_value"]
+
+# 1000 loans of 10 to 40 years
+BATCH_LOANS = [loan(loan_term=10 + i % 31, house_price=200000 + 1000 * i, extra_annual=500 * (i % 3))
+               for i in range(1000)]
+BATCH_PAYMENTS = [solve_for_unknown(data)["calculated_value"] for data in BATCH_LOANS]
+BATCH_PARAMS = [loan_parameters(data, payment) for data, payment in zip(BATCH_LOANS, BATCH_PAYMENTS)]
+
+
+@benchmark("calculator.amortize.float.30y")
+def bench_amortize_float():
+    simulate_amortization(EXTRAS_LOAN, EXTRAS_PAYMENT)
+
+
+@benchmark("calculator.amortize.cents.30y")
+def bench_amortize_cents():
+    simulate_amortization_cents(EXTRAS_LOAN, EXTRAS_PAYMENT)
+
+
+@benchmark("calculator.amortize.float.batch1000")
+def bench_amortize_float_batch():
+    for data, payment in zip(BATCH_LOANS, BATCH_PAYMENTS):
+        simulate_amortization(data, payment)
+
+
+@benchmark("calculator.amortize.cents.batch1000")
+def bench_amortize_cents_batch():
+    amortize_cents(BATCH_PARAMS)
+
+
+# Portfolio export: simulate, lay out and encode the binary file
+
+EXPORT_LOANS = [dict(data, precision="cents") for data in BATCH_LOANS]
+
+
+@benchmark("export.cents.batch1000")
+def bench_export_cents_batch():
+    for _ in encode_export(build_export(EXPORT_LOANS)):
+        pass
+
+
+# Early-payoff optimizer
+
+@benchmark("optimizer.payoff.duration.extra_monthly")
+def bench_optimize_duration_closed_form():
+    optimize_payoff(BASE_LOAN, "duration", 240, "extra_monthly")
+
+
+@benchmark("optimizer.payoff.duration.extra_annual")
+def bench_optimize_duration_bisection():
+    optimize_payoff(BASE_LOAN, "duration", 240, "extra_annual")
+
+
+@benchmark("optimizer.payoff.total_interest.extra_monthly")
+def bench_optimize_interest():
+    optimize_payoff(BASE_LOAN, "total_interest", 100000, "extra_monthly")
+
+
+# Random-access schedule queries
+
+ADJUSTABLE_LOAN = loan(extra_annual=1000, **LOAN_TYPES["adjustable"])
+
+
+@benchmark("schedule_query.balance.100_points")
+def bench_schedule_query_balance():
+    schedule = ClosedFormSchedule(ADJUSTABLE_LOAN, BASE_PAYMENT)
+    for month in range(1, 360, 4):
+        schedule.balance(month)
+
+
+@benchmark("schedule_query.simulate_and_index.100_points")
+def bench_schedule_query_simulated():
+    rows = simulate_amortization(ADJUSTABLE_LOAN, BASE_PAYMENT)[0]
+    for month in range(1, 360, 4):
+        rows[min(month, len(rows)) - 1]["balance"]
+
+
+# Refinance breakeven sweep over a preloaded EURIBOR history
+
+REFINANCE_HISTORY = private_euribor_api().get_historical_rates("6M", "2012-01-01", "2024-12-31")
+
+
+@benchmark("refinance.analyze.13y_window")
+def bench_refinance():
+    analyze_refinance(BASE_LOAN, BASE_PAYMENT, REFINANCE_HISTORY, "6M", 0.5, "2010-01-15",
+                      "2012-01-01", "2024-12-31", switching_fee=1500, discount_rate=3)
+
+
+# Affordability grid search: 4 tenors x 20 spreads x 31 terms x 21 down payments
+
+AFFORDABILITY_GRID = {
+    "base_rates": {"1M": 1.9, "3M": 2.0, "6M": 2.1, "12M": 2.3},
+    "spreads": [0.3 + 0.1 * i for i in range(20)],
+    "loan_terms": list(range(10, 41)),
+    "down_payment_min": 20000,
+    "down_payment_max": 120000,
+    "down_payment_steps": 21,
+    "max_monthly_payment": 1500,
+    "max_total_cost": 500000,
+    "bank_insurances": 30,
+}
+
+
+@benchmark("affordability.search.52k_points")
+def bench_affordability():
+    search_affordability(**AFFORDABILITY_GRID)
+
+
+@benchmark("affordability.search.52k_points.target_price")
+def bench_affordability_target():
+    search_affordability(house_price=350000, **AFFORDABILITY_GRID)
+
+
+# Pydantic request/response round trips
+
+CALC_RESULT = run_calculation(BASE_LOAN)
+
+
+@benchmark("models.request.parse_dump")
+def bench_request_round_trip():
+    CalculationRequest(**BASE_LOAN).dict()
+
+
+@benchmark("models.response.30y.build_serialize")
+def bench_response_round_trip():
+    response = CalculationResponse(**CALC_RESULT)
+    if hasattr(response, "model_dump_json"):
+        response.model_dump_json()
+    else:
+        response.json()
+
+
+# EuriborAPI cache paths
+
+@benchmark("euribor.latest.cache_hit")
+def bench_euribor_latest_hit(api=private_euribor_api()):
+    api.get_latest_rate("3M")
+
+
+@benchmark("euribor.latest.cache_miss")
+def bench_euribor_latest_miss(api=private_euribor_api()):
+    api.cache.clear()
+    api.get_latest_rate("3M")
+
+
+@benchmark("euribor.history.1y.cache_hit")
+def bench_euribor_history_hit(api=private_euribor_api()):
+    api.get_historical_rates("3M", "2024-01-01", "2024-12-31")
+
+
+@benchmark("euribor.history.1y.cache_miss")
+def bench_euribor_history_miss(api=private_euribor_api()):
+    api.cache.clear()
+    api.get_historical_rates("3M", "2024-01-01", "2024-12-31")
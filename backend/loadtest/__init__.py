@@ -0,0 +1 @@
+"""End-to-end load tests of the Mortgage Calculator backend against a local ECB stand-in."""
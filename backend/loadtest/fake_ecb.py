@@ -0,0 +1,231 @@
+"""
+A local stand-in for the ECB Statistical Data Warehouse (SDW) API.
+
+Serves the EURIBOR series the backend asks for with EURIBOR_SOURCE=ecb
+(GET /service/data/FM/<freq>.U2.EUR.RT.MM.EURIBOR<n>MD_.HSTA?format=csvdata)
+with deterministic, smoothly varying rates, an added response latency and a
+share of injected 503 errors, so the backend's I/O path can be load tested
+without depending on, or hammering, the real service.
+
+Usage (from the backend directory):
+
+    python -m loadtest.fake_ecb --port 8081 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+
+then start the backend with ECB_API_URL=http://127.0.0.1:8081/service/data EURIBOR_SOURCE=ecb.
+"""
+import argparse
+import math
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# First EURIBOR fixing
+SERIES_START = date(1999, 1, 4)
+
+SERIES_PATTERN = re.compile(r"^/service/data/FM/([BDM])\.U2\.EUR\.RT\.MM\.EURIBOR(\d+)MD_\.HSTA$")
+
+
+def fixing(day: date, tenor_months: int) -> float:
+    """Deterministic EURIBOR rate of a tenor on a day: a slow cycle plus a term premium."""
+    days = (day - SERIES_START).days
+    return round(1.6 + 1.9 * math.sin(days / 1100) + 0.4 * math.sin(days / 170) + 0.04 * tenor_months, 3)
+
+
+def _parse_period(value: Optional[str], default: date, end: bool = False) -> date:
+    """An SDW period bound: YYYY-MM-DD, or YYYY-MM meaning the month's first (or last) day."""
+    if not value:
+        return default
+    if len(value) == 7:
+        first = date(int(value[:4]), int(value[5:]), 1)
+        if not end:
+            return first
+        return (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return date.fromisoformat(value)
+
+
+def observations(frequency: str, tenor_months: int, start: date, end: date) -> List[Tuple[str, float]]:
+    """
+    (TIME_PERIOD, OBS_VALUE) pairs of a series between two dates.
+
+    Args:
+        frequency: "B" (weekdays), "D" (every day) or "M" (monthly averages, labelled YYYY-MM)
+        tenor_months: EURIBOR tenor in months
+        start: First day, inclusive
+        end: Last day, inclusive
+    """
+    start = max(start, SERIES_START)
+    result = []
+    if frequency == "M":
+        month = start.replace(day=1)
+        while month <= end:
+            result.append((month.strftime("%Y-%m"), fixing(month.replace(day=15), tenor_months)))
+            month = (month + timedelta(days=32)).replace(day=1)
+        return result
+    day = start
+    while day <= end:
+        if frequency == "D" or day.weekday() < 5:
+            result.append((day.isoformat(), fixing(day, tenor_months)))
+        day += timedelta(days=1)
+    return result
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients reusing connections behave as they would against the real API
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def do_GET(self):
+        fake = self.server.fake
+        delay = fake.delay()
+        if delay:
+            time.sleep(delay)
+
+        url = urllib.parse.urlsplit(self.path)
+        match = SERIES_PATTERN.match(url.path)
+        if fake.inject_error():
+            return self._send(503, "Service temporarily unavailable", error=True)
+        if not match:
+            return self._send(404, "No results found.")
+
+        params = dict(urllib.parse.parse_qsl(url.query))
+        frequency, tenor_months = match.group(1), int(match.group(2))
+        today = date.today()
+        try:
+            start = _parse_period(params.get("startPeriod"), SERIES_START)
+            end = min(_parse_period(params.get("endPeriod"), today, end=True), today)
+        except ValueError:
+            return self._send(400, "Invalid period.")
+        rows = observations(frequency, tenor_months, start, end)
+        if "lastNObservations" in params:
+            rows = rows[-int(params["lastNObservations"]):]
+        if not rows:
+            return self._send(404, "No results found.")
+
+        key = "FM." + url.path.rsplit("/", 1)[-1]
+        lines = ["KEY,FREQ,TIME_PERIOD,OBS_VALUE"]
+        lines.extend(f"{key},{frequency},{period},{value}" for period, value in rows)
+        fake.record(len(rows))
+        self._send(200, "\n".join(lines) + "\n", content_type="text/csv")
+
+    def _send(self, status: int, body: str, content_type: str = "text/plain", error: bool = False) -> None:
+        if status != 200:
+            self.server.fake.record(0, error=error)
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: "FakeECB"
+
+
+class FakeECB:
+    """
+    Runs the SDW stand-in on a background thread.
+
+    Usable as a context manager; the server is stopped on exit.
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        latency_ms: Delay added to every response
+        jitter_ms: Extra random delay, uniform between 0 and this
+        error_rate: Share of requests answered with 503
+        seed: Seed for the jitter and the injected errors
+    """
+
+    def __init__(self, port: int = 0, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0, seed: Optional[int] = None):
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "errors": 0, "observations": 0}
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Value for the backend's ECB_API_URL."""
+        return f"http://127.0.0.1:{self.port}/service/data"
+
+    def delay(self) -> float:
+        with self._lock:
+            return (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000
+
+    def inject_error(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def record(self, rows: int, error: bool = False) -> None:
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["errors"] += error
+            self._stats["observations"] += rows
+
+    def stats(self) -> Dict[str, int]:
+        """Requests served, injected errors and observations returned so far."""
+        with self._lock:
+            return dict(self._stats)
+
+    def start(self) -> None:
+        self._server = _Server(("127.0.0.1", self.port), _Handler)
+        self._server.fake = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+        self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local stand-in for the ECB SDW EURIBOR API")
+    parser.add_argument("--port", type=int, default=8081, help="Port to listen on")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Extra random delay, up to this")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of requests answered with 503")
+    parser.add_argument("--seed", type=int, help="Seed for jitter and injected errors")
+    args = parser.parse_args(argv)
+
+    fake = FakeECB(args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    fake.start()
+    print(f"Serving EURIBOR series at {fake.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake.stop()
+        print(f"Served {fake.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
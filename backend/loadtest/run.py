@@ -0,0 +1,306 @@
+"""
+Load test the backend end to end against a local ECB stand-in.
+
+Starts the fake SDW server (loadtest/fake_ecb.py), starts main.py under
+uvicorn with EURIBOR_SOURCE=ecb pointed at it and a fresh state database (so
+the EURIBOR cache starts cold), then replays each traffic mix from
+loadtest/scenarios.py with a pool of concurrent clients and reports
+throughput, latency percentiles (overall and per request kind), the server's
+CPU time and memory, and the ECB calls the traffic caused.
+
+Usage (from the backend directory):
+
+    python -m loadtest.run                                     # every scenario, 300 requests each
+    python -m loadtest.run --scenario mixed --requests 2000 --concurrency 32 --workers 4
+    python -m loadtest.run --ecb-latency-ms 150 --ecb-jitter-ms 100 --ecb-error-rate 0.05
+    python -m loadtest.run --ecb-pool-size 8 --reference-date 2024-12-31
+    python -m loadtest.run --output loadtest.json
+    python -m loadtest.run --baseline loadtest.json --threshold 0.2
+
+Admission control is disabled unless --admission is given: a single load
+generator would otherwise be rate limited as one client.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Dict, List, Optional
+
+from benchmarks.e2e import LocalServer
+from benchmarks.harness import (build_report, format_seconds, load_report, percentile, print_comparison,
+                                save_report)
+
+from .fake_ecb import FakeECB
+from .scenarios import REFERENCE_DATE, SCENARIOS, build_calls
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def process_tree(pid: int) -> List[int]:
+    """A process and all its descendants (uvicorn workers), from /proc."""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        parents.setdefault(int(fields[1]), []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(parents.get(current, []))
+    return tree
+
+
+def tree_usage(pid: int) -> Dict[str, float]:
+    """CPU seconds (user + system) and resident memory in bytes of a process tree."""
+    cpu, rss = 0.0, 0
+    for member in process_tree(pid):
+        try:
+            with open(f"/proc/{member}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{member}/statm") as f:
+                pages = int(f.read().split()[1])
+        except OSError:
+            continue  # Exited while we looked
+        # Fields after the command name start at field 3 (state); utime and stime are fields 14 and 15
+        cpu += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        rss += pages * PAGE_SIZE
+    return {"cpu": cpu, "rss": rss}
+
+
+class ResourceMonitor:
+    """
+    Samples a process tree's CPU time and memory on a background thread.
+
+    Usable as a context manager around a scenario; does nothing where /proc is unavailable.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.1):
+        self.pid = pid
+        self.interval = interval
+        self.available = os.path.isdir(f"/proc/{pid}")
+        self.samples: List[Dict[str, float]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.samples.append(tree_usage(self.pid))
+
+    def __enter__(self):
+        if self.available:
+            self.samples.append(tree_usage(self.pid))
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self.samples.append(tree_usage(self.pid))
+
+    def summary(self, elapsed: float) -> Dict[str, Optional[float]]:
+        """CPU seconds used, average cores busy, and peak and mean resident memory in MB."""
+        if len(self.samples) < 2:
+            return {"cpu_seconds": None, "cpu_utilization": None, "rss_peak_mb": None, "rss_mean_mb": None}
+        cpu = self.samples[-1]["cpu"] - self.samples[0]["cpu"]
+        rss = [sample["rss"] / 2**20 for sample in self.samples]
+        return {
+            "cpu_seconds": cpu,
+            "cpu_utilization": cpu / elapsed if elapsed else 0.0,
+            "rss_peak_mb": max(rss),
+            "rss_mean_mb": sum(rss) / len(rss),
+        }
+
+
+def send(base_url: str, call: Dict, timeout: float = 60.0) -> int:
+    """Send one call and return the status code (0 if the connection failed), reading the full body."""
+    url = base_url + call["path"]
+    data, headers = None, {}
+    if call["method"] == "GET":
+        url += "?" + urllib.parse.urlencode(call["params"])
+    else:
+        data, headers = json.dumps(call["body"]).encode(), {"Content-Type": "application/json"}
+    request = urllib.request.Request(url, data=data, headers=headers, method=call["method"])
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return 0
+
+
+def _latency_stats(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies) if latencies else 0.0,
+    }
+
+
+def run_scenario(server: LocalServer, fake: FakeECB, calls: List[Dict], concurrency: int) -> Dict:
+    """
+    Replay calls against a running server with a pool of concurrent clients.
+
+    Returns:
+        Dict: Throughput, status counts, latency percentiles (seconds) overall and
+        per call kind, server resource usage and the ECB requests made
+    """
+    def timed(call):
+        start = time.perf_counter()
+        status = send(server.base_url, call)
+        return call["kind"], time.perf_counter() - start, status
+
+    ecb_before = fake.stats()
+    with ResourceMonitor(server.process.pid) as monitor:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(timed, calls))
+        elapsed = time.perf_counter() - start
+    ecb_after = fake.stats()
+
+    statuses: Dict[str, int] = {}
+    by_kind: Dict[str, List] = {}
+    for kind, latency, status in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        by_kind.setdefault(kind, []).append((latency, status))
+
+    latencies = [latency for _, latency, _ in outcomes]
+    result = {
+        "requests": len(calls),
+        "concurrency": concurrency,
+        "errors": sum(1 for _, _, status in outcomes if not 200 <= status < 400),
+        "statuses": statuses,
+        "elapsed": elapsed,
+        "throughput": len(calls) / elapsed if elapsed else 0.0,
+        **_latency_stats(latencies),
+        "kinds": {kind: dict(_latency_stats([latency for latency, _ in entries]), requests=len(entries),
+                             errors=sum(1 for _, status in entries if not 200 <= status < 400))
+                  for kind, entries in sorted(by_kind.items())},
+        "ecb": {key: ecb_after[key] - ecb_before[key] for key in ecb_after},
+    }
+    result.update(monitor.summary(elapsed))
+    return result
+
+
+def run_load_test(scenarios: List[str], requests: int = 300, concurrency: int = 16, workers: int = 1,
+                  seed: int = 0, ecb_latency_ms: float = 50, ecb_jitter_ms: float = 50,
+                  ecb_error_rate: float = 0.0, admission: bool = False, ecb_pool_size: Optional[int] = None,
+                  reference_date: date = REFERENCE_DATE, env: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+    """
+    Run each scenario against one server and one fake ECB.
+
+    The EURIBOR cache persists across scenarios of a run, as it would in production.
+    Traffic is generated as of reference_date, so runs on different days replay the same calls.
+
+    Returns:
+        Dict[str, Dict]: Scenario results keyed by "loadtest.<scenario>"
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as state_dir, \
+            FakeECB(latency_ms=ecb_latency_ms, jitter_ms=ecb_jitter_ms, error_rate=ecb_error_rate, seed=seed) as fake:
+        server_env = {
+            "EURIBOR_SOURCE": "ecb",
+            "ECB_API_URL": fake.base_url,
+            "STATE_BACKEND": "sqlite",
+            "STATE_SQLITE_PATH": os.path.join(state_dir, "state.db"),
+            "ADMISSION_ENABLED": "1" if admission else "0",
+        }
+        if ecb_pool_size is not None:
+            server_env["ECB_POOL_SIZE"] = str(ecb_pool_size)
+        server_env.update(env or {})
+        with LocalServer(workers=workers, env=server_env) as server:
+            # Warm up imports and the first calculation in every worker
+            for call in build_calls("interactive", 4 * workers, seed=seed + 1, reference_date=reference_date):
+                if call["path"] == "/api/calc":
+                    send(server.base_url, call)
+            for i, scenario in enumerate(scenarios):
+                calls = build_calls(scenario, requests, seed=seed + i, reference_date=reference_date)
+                results[f"loadtest.{scenario}"] = run_scenario(server, fake, calls, concurrency)
+    return results
+
+
+def print_results(results: Dict[str, Dict]) -> None:
+    for name, stats in results.items():
+        print(f"{name:<30} {stats['throughput']:>8.1f} req/s  p50 {format_seconds(stats['p50'])}  "
+              f"p95 {format_seconds(stats['p95'])}  p99 {format_seconds(stats['p99'])}  "
+              f"errors {stats['errors']}/{stats['requests']}")
+        if stats["cpu_seconds"] is not None:
+            print(f"{'':<30} cpu {stats['cpu_seconds']:.2f} s ({stats['cpu_utilization']:.2f} cores)  "
+                  f"rss peak {stats['rss_peak_mb']:.0f} MB  mean {stats['rss_mean_mb']:.0f} MB")
+        print(f"{'':<30} ecb {stats['ecb']['requests']} requests, {stats['ecb']['errors']} errors  "
+              f"statuses {stats['statuses']}")
+        for kind, kind_stats in stats["kinds"].items():
+            print(f"{'':<4}{kind:<26} {kind_stats['requests']:>6}  p50 {format_seconds(kind_stats['p50'])}  "
+                  f"p99 {format_seconds(kind_stats['p99'])}  errors {kind_stats['errors']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mortgage Calculator end-to-end load test")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Scenario to run (repeatable; default all)")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated traffic")
+    parser.add_argument("--ecb-latency-ms", type=float, default=50, help="Fake ECB response latency")
+    parser.add_argument("--ecb-jitter-ms", type=float, default=50, help="Extra random fake ECB latency, up to this")
+    parser.add_argument("--ecb-error-rate", type=float, default=0.0, help="Share of fake ECB requests failing with 503")
+    parser.add_argument("--ecb-pool-size", type=int, help="Server's ECB connection pool size (ECB_POOL_SIZE)")
+    parser.add_argument("--reference-date", type=date.fromisoformat, default=REFERENCE_DATE,
+                        help="Date the traffic is generated as of (YYYY-MM-DD), so runs replay the same calls")
+    parser.add_argument("--admission", action="store_true", help="Keep admission control enabled")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--baseline", help="Compare p50 latency against this earlier report")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown counted as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    scenarios = args.scenario or list(SCENARIOS)
+
+    results = run_load_test(scenarios, requests=args.requests, concurrency=args.concurrency,
+                            workers=args.workers, seed=args.seed, ecb_latency_ms=args.ecb_latency_ms,
+                            ecb_jitter_ms=args.ecb_jitter_ms, ecb_error_rate=args.ecb_error_rate,
+                            admission=args.admission, ecb_pool_size=args.ecb_pool_size,
+                            reference_date=args.reference_date)
+    print_results(results)
+
+    # Stored like benchmark results so benchmarks.harness can compare runs on p50
+    report = build_report({name: dict(stats, median=stats["p50"]) for name, stats in results.items()},
+                          extra={"loadtest": {key: value.isoformat() if isinstance(value, date) else value
+                                              for key, value in vars(args).items()
+                                              if key not in ("output", "baseline", "threshold")}})
+    if args.output:
+        save_report(report, args.output)
+        print(f"Report written to {args.output}")
+
+    if args.baseline:
+        if print_comparison(report, load_report(args.baseline), threshold=args.threshold,
+                            label="scenario", width=30):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
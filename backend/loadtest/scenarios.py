@@ -0,0 +1,90 @@
+"""
+Traffic mixes replayed by the load test.
+
+A call is a dict with the request kind (for per-kind latency), the HTTP
+method, the path, and a JSON body (POST) or query parameters (GET). Each
+scenario is a weighted list of call generators; generators draw loans from
+tools.crosscheck.random_loans so the traffic spans loan types, terms and sizes.
+Dates are relative to a reference date rather than today, so a seed replays
+the same traffic whenever it runs.
+"""
+import random
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from tools.crosscheck import random_loans
+
+TENORS = ["1M", "3M", "6M", "12M"]
+
+# Default "today" of generated traffic
+REFERENCE_DATE = date(2025, 6, 30)
+
+# Chart ranges users pick, in days, and how often
+HISTORY_RANGES = [(30, 0.3), (365, 0.4), (5 * 365, 0.2), (20 * 365, 0.1)]
+
+def interactive_call(rng: random.Random, loan: Dict, reference_date: date) -> Dict:
+    """A calculator page: mostly /api/calc with a monthly or yearly table, some latest-rate lookups."""
+    if rng.random() < 0.1:
+        return {"kind": "euribor.latest", "method": "GET", "path": "/api/euribor/latest",
+                "params": {"tenor": rng.choice(TENORS)}}
+    view = "monthly" if rng.random() < 0.7 else "yearly"
+    return {"kind": f"calc.{view}", "method": "POST", "path": "/api/calc", "body": dict(loan, table_view=view)}
+
+def history_call(rng: random.Random, loan: Dict, reference_date: date) -> Dict:
+    """
+    A rate chart: a range ending on a month boundary of the three years before
+    the reference date, so popular ranges repeat and hit the cache while long
+    tails miss it.
+    """
+    ranges, weights = zip(*HISTORY_RANGES)
+    days = rng.choices(ranges, weights)[0]
+    to_date = (reference_date.replace(day=1) - timedelta(days=30 * rng.randrange(36))).replace(day=1)
+    from_date = to_date - timedelta(days=days)
+    return {"kind": f"euribor.history.{days}d", "method": "GET", "path": "/api/euribor/history",
+            "params": {"tenor": rng.choice(TENORS), "from_date": from_date.isoformat(),
+                       "to_date": to_date.isoformat()}}
+
+def batch_call(rng: random.Random, loan: Dict, reference_date: date) -> Dict:
+    """A batch job: payoff optimization, a refinance sweep over a EURIBOR window, or a schedule query batch."""
+    job = rng.choice(["optimize", "refinance", "schedule_query"])
+    if job == "optimize":
+        body = dict(loan, target="duration", target_value=int(loan["loan_term"] * 12 * 0.8),
+                    variable=rng.choice(["extra_monthly", "extra_annual"]))
+        return {"kind": "batch.optimize", "method": "POST", "path": "/api/optimize/payoff", "body": body}
+    if job == "refinance":
+        start_year = rng.randrange(2005, 2016)
+        body = dict(loan, tenor=rng.choice(TENORS), new_spread=round(rng.uniform(0.5, 2), 2),
+                    start_date=f"{start_year}-01-15", from_date=f"{start_year + 1}-01-01",
+                    to_date=f"{start_year + rng.randrange(2, 9)}-12-31", switching_fee=1500, discount_rate=3)
+        return {"kind": "batch.refinance", "method": "POST", "path": "/api/refinance/analyze", "body": body}
+    months = int(loan["loan_term"] * 12)
+    queries = [{"type": "balance", "month": rng.randrange(1, months + 1)} for _ in range(rng.randrange(50, 200))]
+    return {"kind": "batch.schedule_query", "method": "POST", "path": "/api/schedule/query",
+            "body": dict(loan, queries=queries)}
+
+# Scenario name -> weighted call generators
+SCENARIOS: Dict[str, List[Tuple[float, Callable[[random.Random, Dict, date], Dict]]]] = {
+    "interactive": [(1.0, interactive_call)],
+    "history": [(1.0, history_call)],
+    "batch": [(1.0, batch_call)],
+    "mixed": [(0.8, interactive_call), (0.15, history_call), (0.05, batch_call)],
+}
+
+def build_calls(scenario: str, count: int, seed: int = 0, reference_date: date = REFERENCE_DATE) -> List[Dict]:
+    """
+    The calls of one scenario run, in send order.
+
+    Args:
+        scenario: Key of SCENARIOS
+        count: Number of calls
+        seed: Seed, so runs replay the same traffic
+        reference_date: Date the traffic is generated as of
+
+    Returns:
+        List[Dict]: Calls with kind, method, path and body or params
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Invalid scenario: {scenario}. Must be one of {list(SCENARIOS)}")
+    rng = random.Random(seed)
+    weights, generators = zip(*SCENARIOS[scenario])
+    return [rng.choices(generators, weights)[0](rng, loan, reference_date) for loan in random_loans(count, seed)]
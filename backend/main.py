@@ -1,8 +1,10 @@
 import sys
 import os
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes import router as api_router
+from api.executor import calc_executor
+from api.metrics import MetricsMiddleware, render_metrics
 
 # Add the current directory to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -22,10 +24,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Record per-route latency for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
 
+@app.on_event("shutdown")
+async def shutdown_calc_executor():
+    calc_executor.shutdown()
+
+
 @app.get("/")
 async def root():
     return {"message": "Mortgage Calculator API"}
@@ -36,6 +46,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def metrics():
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""
+Shared setup for the backend tests.
+
+Run from the backend directory:
+
+    python -m pytest tests
+
+Tests use the in-memory state backend and run with admission control off
+unless a test turns it on, so they never touch state.db or each other's limits.
+"""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("ADMISSION_ENABLED", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASE_LOAN = {
+    "house_price": 300000,
+    "down_payment": 60000,
+    "loan_term": 30,
+    "interest_rate": 3.0,
+    "monthly_payment": None,
+    "bank_spread": 1.0,
+    "bank_insurances": 25,
+    "extra_monthly": 0,
+    "extra_annual": 0,
+    "extra_fee_rate": 0,
+    "loan_type": "fixed",
+    "fixed_period": None,
+    "adjusted_interest_rate": None,
+}
+
+
+@pytest.fixture
+def loan():
+    """Factory for calculation parameters: BASE_LOAN with the given overrides."""
+    def make(**overrides):
+        return dict(BASE_LOAN, **overrides)
+    return make
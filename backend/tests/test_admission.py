@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.admission import AdmissionController, AdmissionRejected, _Lane, admission_controller, request_cost
+from main import app
+
+AFFORDABILITY = {"max_monthly_payment": 1500, "down_payment_max": 50000, "spreads": [0.5, 1, 1.5],
+                 "loan_terms": [20, 25, 30], "base_rates": {"1M": 2, "3M": 2.1, "6M": 2.2, "12M": 2.3}}
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def admitted(monkeypatch):
+    """Turn admission on and record the cost of every request admitted."""
+    costs = []
+    admit = admission_controller.admit
+
+    def record(client, cost, priority=None):
+        costs.append(cost)
+        return admit(client, cost, priority)
+
+    monkeypatch.setattr(admission_controller, "enabled", True)
+    monkeypatch.setattr(admission_controller, "admit", record)
+    monkeypatch.setattr(admission_controller, "buckets", {})
+    return costs
+
+
+def test_request_cost_ignores_malformed_views():
+    assert request_cost({"loan_term": 30, "views": 5}) == request_cost({"loan_term": 30})
+    assert request_cost({"loan_term": 1e300}) == request_cost({"loan_term": None})
+
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_malformed_body_is_a_validation_error(client, monkeypatch, enabled):
+    monkeypatch.setattr(admission_controller, "enabled", enabled)
+    assert client.post("/api/calc", json={"house_price": 1, "views": 5}).status_code == 422
+    assert client.post("/api/calc", content=b"not json").status_code == 422
+
+
+def test_absent_grid_fields_are_costed_at_their_defaults(client, admitted):
+    response = client.post("/api/affordability/search", json=AFFORDABILITY)
+    assert response.status_code == 200
+    # 4 default tenors x 3 spreads x 3 terms x 11 default down payment steps
+    assert admitted == [pytest.approx(request_cost({}, 0.0002, 4 * 3 * 3 * 11, rendered=False))]
+
+
+def test_rate_limited_request_gets_retry_after(client, admitted, monkeypatch):
+    monkeypatch.setattr(admission_controller, "burst", 1)
+    monkeypatch.setattr(admission_controller, "rate", 0.5)
+    loan = {"house_price": 300000, "down_payment": 60000, "loan_term": 30, "interest_rate": 3}
+    assert client.post("/api/calc", json=loan).status_code == 200
+    response = client.post("/api/calc", json=loan)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_classify():
+    controller = AdmissionController(enabled=True, bulk_cost=4)
+    assert controller.classify(1) == "interactive"
+    assert controller.classify(4) == "bulk"
+    assert controller.classify(0.1, "bulk") == "bulk"
+
+
+async def settle(predicate):
+    """Let the event loop run until predicate() holds."""
+    for _ in range(100):
+        if predicate():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("condition never held")
+
+
+def test_lane_hands_the_slot_to_the_oldest_waiter():
+    async def scenario():
+        lane = _Lane("test", slots=1, queue_limit=4)
+        assert await lane.acquire(1) == 0.0
+        order = []
+
+        async def waiter(name):
+            await lane.acquire(1)
+            order.append(name)
+
+        tasks = [asyncio.ensure_future(waiter(name)) for name in ("first", "second")]
+        await settle(lambda: len(lane.waiters) == 2)
+        lane.release()
+        # Handed over: the slot never becomes free for a newcomer to take
+        assert lane.in_flight == 1 and len(lane.waiters) == 1
+        await settle(lambda: order == ["first"])
+        lane.release()
+        await asyncio.gather(*tasks)
+        assert order == ["first", "second"]
+        lane.release()
+        assert lane.in_flight == 0 and not lane.waiters
+
+    asyncio.run(scenario())
+
+
+def test_lane_sheds_when_the_queue_is_full_or_the_wait_times_out():
+    async def scenario():
+        lane = _Lane("test", slots=1, queue_limit=1)
+        await lane.acquire(1)
+        queued = asyncio.ensure_future(lane.acquire(0.05))
+        await settle(lambda: len(lane.waiters) == 1)
+        with pytest.raises(AdmissionRejected) as full:
+            await lane.acquire(1)
+        assert full.value.status_code == 503
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await queued
+        assert "timed out" in timed_out.value.detail
+        assert not lane.waiters
+        lane.release()
+        assert lane.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        lane = _Lane("test", slots=1, queue_limit=4)
+        await lane.acquire(1)
+        waiter = asyncio.ensure_future(lane.acquire(1))
+        await settle(lambda: len(lane.waiters) == 1)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert not lane.waiters
+        lane.release()
+        assert lane.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_slot_handed_over_at_the_timeout_is_kept(monkeypatch):
+    async def scenario():
+        lane = _Lane("test", slots=1, queue_limit=4)
+        await lane.acquire(1)
+
+        async def handover_then_timeout(awaitable, timeout):
+            lane.release()
+            raise asyncio.TimeoutError
+
+        monkeypatch.setattr(asyncio, "wait_for", handover_then_timeout)
+        await lane.acquire(1)
+        assert lane.in_flight == 1 and not lane.waiters
+        lane.release()
+        assert lane.in_flight == 0
+
+    asyncio.run(scenario())
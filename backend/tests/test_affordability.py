@@ -0,0 +1,51 @@
+import pytest
+
+from api.affordability import search_affordability
+from api.calculator import solve_for_unknown
+
+GRID = {
+    "base_rates": {"3M": 2.0, "12M": 2.3},
+    "spreads": [0.5, 1.0],
+    "loan_terms": [15, 25, 30],
+    "down_payment_min": 20000,
+    "down_payment_max": 60000,
+    "down_payment_steps": 5,
+    "max_monthly_payment": 1500,
+    "bank_insurances": 30,
+}
+
+
+def test_without_target_best_is_ranked_by_price_per_cost():
+    result = search_affordability(top_k=60, **GRID)
+    assert result["ranked_by"] == "price_per_cost"
+    assert result["feasible"] == result["grid_points"] == 60
+    ratios = [o["house_price"] / (o["down_payment"] + o["total_cost"]) for o in result["best"]]
+    assert ratios == sorted(ratios, reverse=True)
+    # Total cost alone would not tell the options of one term apart
+    assert len({round(o["total_cost"], 6) for o in result["best"] if o["loan_term"] == 25}) == 1
+
+
+def test_with_target_best_is_cheapest_first():
+    result = search_affordability(house_price=300000, top_k=5, **GRID)
+    assert result["ranked_by"] == "total_cost"
+    costs = [o["total_cost"] for o in result["best"]]
+    assert costs == sorted(costs)
+    assert all(o["house_price"] == 300000 for o in result["best"])
+
+
+def test_max_house_price_matches_the_solver():
+    result = search_affordability(top_k=60, **GRID)
+    for option in result["best"][:10]:
+        solved = solve_for_unknown({
+            "house_price": None, "down_payment": option["down_payment"], "loan_term": option["loan_term"],
+            "interest_rate": option["base_rate"], "bank_spread": option["bank_spread"],
+            "monthly_payment": option["monthly_payment"],
+        })
+        assert solved["calculated_value"] == pytest.approx(option["house_price"], rel=1e-9)
+
+
+def test_invalid_grid():
+    with pytest.raises(ValueError):
+        search_affordability(**dict(GRID, spreads=[]))
+    with pytest.raises(ValueError):
+        search_affordability(**dict(GRID, down_payment_steps=0))
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from api.aggregation import FLOW_COLUMNS, SCHEDULE_COLUMNS, aggregate, bucket_starts, schedule_view, schedule_views
+from api.calculator import simulate_schedule
+from api.exact import simulate_schedule_cents
+from api.optimizer import prepare_loan
+from tools.crosscheck import random_loans
+
+LOANS = random_loans(30, seed=5)
+
+
+def monthly_rows(columns):
+    """Rows as the simulation loop used to append them, one dict per month."""
+    return [dict(zip(SCHEDULE_COLUMNS, values), month=month)
+            for month, values in enumerate(zip(*(columns[name] for name in SCHEDULE_COLUMNS)), start=1)]
+
+
+def legacy_yearly(rows):
+    """The yearly table as simulate_amortization built it before views were aggregated in one pass."""
+    table = []
+    year = {name: 0 for name in FLOW_COLUMNS}
+    for row in rows:
+        for name in FLOW_COLUMNS:
+            year[name] += row[name]
+        year["balance"] = row["balance"]
+        if row["month"] % 12 == 0 or row is rows[-1]:
+            table.append(dict(year, period=len(table) + 1))
+            year = {name: 0 for name in FLOW_COLUMNS}
+    return table
+
+
+def simulated(index):
+    data, monthly_payment = prepare_loan(LOANS[index])
+    return simulate_schedule(data, monthly_payment)[0]
+
+
+@pytest.mark.parametrize("index", range(len(LOANS)))
+def test_yearly_view_matches_legacy_aggregation(index):
+    columns = simulated(index)
+    view = schedule_view(columns, "yearly")
+    legacy = legacy_yearly(monthly_rows(columns))
+    assert len(view) == len(legacy)
+    for row, expected in zip(view, legacy):
+        assert row["period"] == expected["period"]
+        for name in SCHEDULE_COLUMNS:
+            assert row[name] == pytest.approx(expected[name], rel=1e-12, abs=1e-9)
+        assert row["end_month"] - row["start_month"] < 12
+
+
+@pytest.mark.parametrize("index", range(0, len(LOANS), 5))
+def test_monthly_view_matches_legacy_rows(index):
+    columns = simulated(index)
+    view = schedule_view(columns, "monthly")
+    assert view == [dict(row, period=row["month"]) for row in monthly_rows(columns)]
+
+
+def test_views_preserve_totals(loan):
+    data, monthly_payment = prepare_loan(loan(loan_type="adjustable", fixed_period=5, adjusted_interest_rate=4,
+                                              extra_annual=1000))
+    columns = simulate_schedule(data, monthly_payment)[0]
+    views = schedule_views(columns, ["quarterly", "yearly", "rate_period", "custom"], fixed_months=60,
+                           custom_buckets=[6, 60, 120])
+    assert [row["end_month"] for row in views["rate_period"]] == [60, len(columns["balance"])]
+    assert [row["end_month"] for row in views["custom"]][:3] == [6, 60, 120]
+    for rows in views.values():
+        assert rows[-1]["balance"] == columns["balance"][-1]
+        for name in FLOW_COLUMNS:
+            assert sum(row[name] for row in rows) == pytest.approx(sum(columns[name]))
+
+
+def test_cents_columns_aggregate_exactly(loan):
+    data, monthly_payment = prepare_loan(loan(extra_monthly=100))
+    columns = simulate_schedule_cents(data, monthly_payment)[0]
+    buckets = aggregate(columns, bucket_starts(len(columns["balance"]), "yearly"))
+    assert buckets["interest"].dtype == np.int64
+    assert int(buckets["interest"].sum()) == int(columns["interest"].sum())
+    rows = schedule_view(columns, "yearly", unit=100)
+    assert rows[0]["interest"] == int(buckets["interest"][0]) / 100
+
+
+def test_empty_schedule():
+    columns = {name: [] for name in SCHEDULE_COLUMNS}
+    assert schedule_view(columns, "yearly") == []
+
+
+def test_invalid_views():
+    columns = simulated(0)
+    with pytest.raises(ValueError):
+        schedule_views(columns, ["weekly"])
+    with pytest.raises(ValueError):
+        schedule_view(columns, "custom")
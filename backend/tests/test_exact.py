@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from api.calculator import loan_parameters
+from api.exact import amortize_cents, to_cents
+from api.optimizer import prepare_loan
+from main import app
+from tools.crosscheck import random_loans
+
+
+def parameters(loans):
+    return [loan_parameters(*prepare_loan(data)) for data in loans]
+
+
+@pytest.fixture(scope="module")
+def loans():
+    return random_loans(400, seed=3)
+
+
+def test_loan_without_extras_ends_at_its_term():
+    # Without folding the rounding residual, about one loan in sixteen ran a stub month past its term
+    loans = [dict(data, extra_monthly=0, extra_annual=0, loan_type="fixed") for data in random_loans(2000, seed=7)]
+    params = parameters(loans)
+    cents = amortize_cents(params)
+    assert (cents["duration"] == [p["term_months"] for p in params]).all()
+    assert (cents["balance"][cents["duration"] - 1, np.arange(len(params))] == 0).all()
+
+
+def test_residual_is_folded_into_the_last_installment(loan):
+    # Rounded half up, the installment used to leave 0.53 for a 241st month
+    params = parameters([loan(house_price=151000, down_payment=0, loan_term=20, interest_rate=3.1,
+                              bank_spread=0, bank_insurances=0)])[0]
+    cents = amortize_cents([params])
+    payments = cents["payment"][:, 0]
+    assert int(cents["duration"][0]) == 240
+    assert int(payments[-1]) == int(payments[0]) + 53
+    assert int(cents["total_payments"][0]) - int(cents["total_interest"][0]) == to_cents(params["principal"])
+
+
+def test_single_loan_matches_batch(loans):
+    params = parameters(loans)
+    batch = amortize_cents(params)
+    for i, p in enumerate(params):
+        single = amortize_cents([p])
+        duration = int(batch["duration"][i])
+        assert int(single["duration"][0]) == duration
+        for name in ("payment", "extra", "fee", "interest", "principal", "balance"):
+            assert np.array_equal(single[name][:, 0], batch[name][:duration, i]), name
+            assert not batch[name][duration:, i].any()
+        for name in ("total_interest", "total_payments", "total_fee", "total_cost"):
+            assert int(single[name][0]) == int(batch[name][i]), name
+
+
+def test_principal_is_repaid_to_the_cent(loans):
+    params = parameters(loans)
+    cents = amortize_cents(params)
+    principal = np.array([to_cents(p["principal"]) for p in params])
+    # Loans still running at the 1000 month cap have a balance left
+    repaid = cents["balance"][cents["duration"] - 1, np.arange(len(params))] == 0
+    assert repaid.mean() > 0.9
+    assert np.array_equal(cents["principal"].sum(axis=0)[repaid], principal[repaid])
+
+
+@pytest.mark.parametrize("amount", [float("inf"), float("-inf"), float("nan"), 1e14])
+def test_amounts_outside_int64_are_rejected(amount):
+    with pytest.raises(ValueError):
+        to_cents(amount)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"principal": 1e17},
+    {"extra_monthly": 1e12, "extra_fee_rate": 1e4},
+    {"r_fixed": 1e7},
+    {"r_adjusted": float("nan")},
+])
+@pytest.mark.parametrize("batch", [1, 2])
+def test_out_of_range_loans_raise_value_error(loan, overrides, batch):
+    params = dict(parameters([loan()])[0], **overrides)
+    with pytest.raises(ValueError):
+        amortize_cents([params] * batch)
+
+
+@pytest.mark.parametrize("body", [
+    '{"house_price": Infinity, "down_payment": 60000, "loan_term": 30, "interest_rate": 3, "precision": "cents"}',
+    '{"house_price": 1e20, "down_payment": 60000, "loan_term": 30, "interest_rate": 3, "precision": "cents"}',
+])
+def test_cents_request_out_of_range_is_a_bad_request(body):
+    response = TestClient(app).post("/api/calc", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from api.executor import CalcExecutor
+
+
+@pytest.fixture
+def make_executor():
+    """Factory for executors, shut down after the test."""
+    executors = []
+
+    def make(**kwargs):
+        executors.append(CalcExecutor(**kwargs))
+        return executors[-1]
+    yield make
+    for executor in executors:
+        executor.shutdown()
+
+
+def run_all(executor, calls):
+    """Run (fn, args, cost) calls concurrently on one event loop."""
+    async def main():
+        return await asyncio.gather(*(executor.run(fn, *args, cost=cost) for fn, args, cost in calls))
+    return asyncio.run(main())
+
+
+def test_calls_up_to_the_threshold_run_inline(make_executor):
+    executor = make_executor(kind="thread", inline_max_cost=120)
+    caller = threading.get_ident()
+    inline, offloaded = run_all(executor, [(threading.get_ident, (), 120), (threading.get_ident, (), 121)])
+    assert inline == caller
+    assert offloaded != caller
+    stats = executor.stats()
+    assert (stats["inline"], stats["offloaded"], stats["in_flight"]) == (1, 1, 0)
+
+
+def test_inline_kind_never_offloads(make_executor):
+    executor = make_executor(kind="inline")
+    assert run_all(executor, [(threading.get_ident, (), 10**6)]) == [threading.get_ident()]
+    assert executor.stats()["offloaded"] == 0
+
+
+def test_process_kind_runs_in_another_process(make_executor):
+    executor = make_executor(kind="process", max_workers=1)
+    assert run_all(executor, [(os.getpid, (), 1000)])[0] != os.getpid()
+    assert run_all(executor, [(os.getpid, (), 1)])[0] == os.getpid()
+
+
+def test_invalid_kind():
+    with pytest.raises(ValueError):
+        CalcExecutor(kind="fiber")
+
+
+def test_semaphore_bounds_calls_on_the_pool(make_executor):
+    executor = make_executor(kind="thread", max_workers=4, max_concurrency=2, inline_max_cost=0)
+    lock = threading.Lock()
+    running = [0, 0]  # now, peak
+
+    def work():
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    run_all(executor, [(work, (), 1)] * 6)
+    assert running[1] == 2
+    stats = executor.stats()
+    assert (stats["offloaded"], stats["in_flight"]) == (6, 0)
+    # Six 50 ms calls two at a time: the last pair waited for two others
+    assert stats["queue_time_max"] >= 0.08
+
+
+def test_queue_time_counts_waiting_for_a_worker(make_executor):
+    executor = make_executor(kind="thread", max_workers=1, max_concurrency=4, inline_max_cost=0)
+    run_all(executor, [(time.sleep, (0.05,), 1)] * 3)
+    stats = executor.stats()
+    # Queued behind 0, 1 and 2 calls: about 0, 50 and 100 ms
+    assert stats["queue_time_max"] == pytest.approx(0.1, abs=0.04)
+    assert stats["queue_time_avg"] == pytest.approx(stats["queue_time_total"] / 3)
+    assert stats["queue_time_avg"] == pytest.approx(0.05, abs=0.03)
+    assert stats["run_time_total"] >= 0.15
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from api.aggregation import SCHEDULE_COLUMNS
+from api.calculator import simulate_schedule
+from api.exact import simulate_schedule_cents
+from api.export import LOAN_COLUMNS, ScheduleFile, build_export, encode_export, write_export
+from api.optimizer import prepare_loan
+from tools.crosscheck import random_loans
+
+LOANS = [dict(data, precision="cents" if i % 3 == 0 else "float") for i, data in enumerate(random_loans(40, seed=9))]
+
+
+def expected_schedule(data):
+    data, monthly_payment = prepare_loan(data)
+    if data["precision"] == "cents":
+        columns, total_interest, total_cost, _ = simulate_schedule_cents(data, monthly_payment)
+        return {name: np.asarray(columns[name]) / 100 for name in SCHEDULE_COLUMNS}, total_interest, total_cost
+    columns, total_interest, total_cost, _ = simulate_schedule(data, monthly_payment)
+    return {name: np.asarray(columns[name]) for name in SCHEDULE_COLUMNS}, total_interest, total_cost
+
+
+def check(schedules: ScheduleFile):
+    assert len(schedules) == len(LOANS)
+    assert set(schedules.loans) == set(LOAN_COLUMNS)
+    for i, data in enumerate(LOANS):
+        columns, total_interest, total_cost = expected_schedule(data)
+        loan = schedules.loan(i)
+        for name in SCHEDULE_COLUMNS:
+            np.testing.assert_array_equal(loan[name], columns[name])
+        assert schedules.loans["total_interest"][i] == total_interest
+        assert schedules.loans["total_cost"][i] == total_cost
+
+
+def test_round_trip_in_memory():
+    body = b"".join(encode_export(build_export(LOANS)))
+    check(ScheduleFile(body))
+
+
+def test_round_trip_through_a_mapped_file(tmp_path):
+    path = str(tmp_path / "schedules.bin")
+    size = write_export(path, LOANS)
+    assert size == (tmp_path / "schedules.bin").stat().st_size
+    with ScheduleFile(path) as schedules:
+        check(schedules)
+        # Views share the mapping rather than copying it
+        assert schedules.loan(0)["balance"].base is not None
+        durations = np.diff(schedules.offsets)
+    assert durations.tolist() == [len(expected_schedule(data)[0]["balance"]) for data in LOANS]
+
+
+def test_sections_are_aligned():
+    body = b"".join(encode_export(build_export(LOANS[:3])))
+    schedules = ScheduleFile(body)
+    start = np.frombuffer(body, dtype=np.uint8).ctypes.data
+    for column in list(schedules.columns.values()) + list(schedules.loans.values()) + [schedules.offsets]:
+        assert (column.ctypes.data - start) % 64 == 0
+
+
+def test_empty_export():
+    schedules = ScheduleFile(b"".join(encode_export(build_export([]))))
+    assert len(schedules) == 0
+    assert len(schedules.columns["balance"]) == 0
+
+
+def test_invalid_files():
+    body = b"".join(encode_export(build_export(LOANS[:2])))
+    with pytest.raises(ValueError):
+        ScheduleFile(b"x" * len(body))
+    with pytest.raises(ValueError):
+        ScheduleFile(body[:len(body) // 2])
+    with pytest.raises(IndexError):
+        ScheduleFile(body).loan(2)
+
+
+def test_invalid_loan_is_named():
+    with pytest.raises(ValueError, match="Loan 1"):
+        build_export([LOANS[0], dict(LOANS[1], precision="decimal")])
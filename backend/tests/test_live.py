@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.admission import admission_controller
+from api.live import LiveSession
+from api.routes import CalculationRequest
+from main import app
+
+LOAN = {"house_price": 300000, "down_payment": 60000, "loan_term": 30, "interest_rate": 3.0}
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_recalculation_returns_result_then_diff(client):
+    with client.websocket_connect("/api/calc/live") as websocket:
+        websocket.send_json({"type": "reset", "fields": LOAN})
+        first = websocket.receive_json()
+        assert first["type"] == "result"
+        assert first["schedule"]["length"] == 360
+        websocket.send_json({"type": "delta", "fields": {"loan_term": 25}})
+        second = websocket.receive_json()
+        assert second["seq"] == 2
+        assert second["summary"]["duration"] == 300
+
+
+def test_recalculations_are_charged_to_the_client(client, monkeypatch):
+    monkeypatch.setattr(admission_controller, "enabled", True)
+    monkeypatch.setattr(admission_controller, "buckets", {})
+    monkeypatch.setattr(admission_controller, "burst", 2)
+    monkeypatch.setattr(admission_controller, "rate", 0.01)
+    with client.websocket_connect("/api/calc/live") as websocket:
+        websocket.send_json({"type": "reset", "fields": LOAN})
+        assert websocket.receive_json()["type"] == "result"
+        websocket.send_json({"type": "delta", "fields": {"loan_term": 25}})
+        refused = websocket.receive_json()
+        assert refused["type"] == "error"
+        assert refused["retry_after"] > 0
+    assert admission_controller.lanes["interactive"].in_flight == 0
+
+
+def test_arithmetic_error_keeps_the_session_open(client):
+    with client.websocket_connect("/api/calc/live") as websocket:
+        websocket.send_json({"type": "reset", "fields": dict(LOAN, loan_term=1e300)})
+        error = websocket.receive_json()
+        assert error["type"] == "error"
+        websocket.send_json({"type": "delta", "fields": {"loan_term": 30}})
+        assert websocket.receive_json()["type"] == "result"
+
+
+class TypingClient:
+    """A websocket client that sends a delta every interval and never pauses."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.sent = 0
+        self.frames = []
+
+    async def receive_text(self):
+        if self.sent:
+            await asyncio.sleep(self.interval)
+        self.sent += 1
+        fields = {"loan_term": 20 + self.sent % 10}
+        if self.sent == 1:
+            fields = dict(LOAN, **fields)
+        return json.dumps({"type": "delta", "fields": fields})
+
+    async def send_json(self, frame):
+        self.frames.append(frame)
+
+
+def test_continuous_edits_still_get_results():
+    async def run():
+        client = TypingClient(interval=0.01)
+        session = LiveSession(lambda fields: CalculationRequest(**fields).dict(), debounce=0.05, max_wait=0.2)
+        task = asyncio.ensure_future(session.serve(client))
+        try:
+            for _ in range(200):
+                if any(frame["type"] == "result" for frame in client.frames):
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+        return client
+
+    client = asyncio.run(run())
+    results = [frame for frame in client.frames if frame["type"] == "result"]
+    assert results
+    # Far more edits arrived than results went out: bursts were still coalesced
+    assert client.sent > 5 * len(results)
@@ -0,0 +1,11 @@
+from datetime import date
+
+from loadtest.scenarios import build_calls
+
+
+def test_history_windows_depend_on_the_reference_date_only():
+    calls = build_calls("history", 50, seed=4)
+    assert calls == build_calls("history", 50, seed=4, reference_date=date(2025, 6, 30))
+    earlier = build_calls("history", 50, seed=4, reference_date=date(2020, 6, 30))
+    assert all(call["params"]["to_date"] <= "2020-06-01" for call in earlier)
+    assert [call["params"]["tenor"] for call in earlier] == [call["params"]["tenor"] for call in calls]
@@ -0,0 +1,86 @@
+import pytest
+
+from api.calculator import simulate_schedule, summarize_amortization
+from api.optimizer import optimize_payoff, prepare_loan
+
+
+def outlay(data, monthly_payment):
+    """Everything paid over the loan, from the simulated schedule: installments, extras, fees, insurances."""
+    columns, _, _, duration = simulate_schedule(data, monthly_payment)
+    return (sum(columns["payment"]) + sum(columns["extra"]) + sum(columns["fee"])
+            + data["bank_insurances"] * duration)
+
+
+def summarize(data, monthly_payment, variable, value):
+    if variable == "lump_sum":
+        return summarize_amortization(data, monthly_payment, lump_sum=value)
+    return summarize_amortization(dict(data, **{variable: value}), monthly_payment)
+
+
+@pytest.mark.parametrize("variable", ["extra_monthly", "extra_annual"])
+@pytest.mark.parametrize("extra_fee_rate", [0, 0.5])
+def test_total_outlay_target_is_met_in_money_paid(loan, variable, extra_fee_rate):
+    data = loan(extra_fee_rate=extra_fee_rate)
+    prepared, monthly_payment = prepare_loan(data)
+    target = outlay(prepared, monthly_payment) - 20000
+
+    result = optimize_payoff(data, "total_outlay", target, variable)
+
+    assert result["value"] > 0
+    paid = outlay(dict(prepared, **{variable: result["value"]}), monthly_payment)
+    assert paid == pytest.approx(result["total_outlay"], abs=0.01)
+    assert paid <= target + 0.01
+
+
+@pytest.mark.parametrize("target", ["duration", "total_interest", "total_outlay"])
+@pytest.mark.parametrize("variable", ["extra_monthly", "extra_annual", "lump_sum"])
+def test_solved_value_is_smallest_meeting_target(loan, target, variable):
+    data = loan(loan_type="adjustable", fixed_period=5, adjusted_interest_rate=5.0, extra_fee_rate=0.5)
+    prepared, monthly_payment = prepare_loan(data)
+    total_interest, total_outlay, _ = summarize_amortization(prepared, monthly_payment)
+    target_value = {"duration": 240, "total_interest": total_interest * 0.7,
+                    "total_outlay": total_outlay - 15000}[target]
+    index = ("total_interest", "total_outlay", "duration").index(target)
+
+    result = optimize_payoff(data, target, target_value, variable)
+
+    assert result[target] <= target_value
+    assert summarize(prepared, monthly_payment, variable, result["value"])[index] <= target_value
+    assert summarize(prepared, monthly_payment, variable, result["value"] - 0.02)[index] > target_value
+
+
+@pytest.mark.parametrize("variable", ["extra_monthly", "lump_sum"])
+def test_outlay_with_fees_is_scanned_for_the_first_crossing(loan, variable):
+    # Fees on large extras outweigh the interest they save, until an extra repays the loan outright
+    # (fee-free): the outlay dips below the target, rises above it, then drops again near the principal
+    data = loan(extra_fee_rate=0.5)
+    prepared, monthly_payment = prepare_loan(data)
+    principal = prepared["house_price"] - prepared["down_payment"]
+    target = 242000
+
+    result = optimize_payoff(data, "total_outlay", target, variable)
+
+    assert result["method"] == "grid_scan"
+    assert result["total_outlay"] <= target
+    assert summarize(prepared, monthly_payment, variable, result["value"] - 0.02)[1] > target
+    assert result["value"] < principal * 0.95
+    grid = [principal * i / 32 for i in range(32)]
+    assert all(summarize(prepared, monthly_payment, variable, x)[1] > target for x in grid if x < result["value"])
+
+
+def test_target_already_met(loan):
+    result = optimize_payoff(loan(), "duration", 360, "extra_monthly")
+    assert result["method"] == "already_met"
+    assert result["value"] == 0
+
+
+def test_unreachable_target_raises(loan):
+    with pytest.raises(ValueError):
+        optimize_payoff(loan(), "total_interest", -1, "extra_annual")
+
+
+def test_invalid_target_and_variable(loan):
+    with pytest.raises(ValueError):
+        optimize_payoff(loan(), "payments", 100, "extra_monthly")
+    with pytest.raises(ValueError):
+        optimize_payoff(loan(), "duration", 100, "extra_weekly")
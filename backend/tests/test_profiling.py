@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+
+from api import profiling
+from api.profiling import RequestProfiler
+
+
+def slow_call(x):
+    return sum(range(x))
+
+
+def test_capture_is_written_by_the_worker(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path), slow_ms=1)
+    capture_id = profiler.record("calc", {"loan_term": 30}, {"solve": 0.5}, 1.0)
+    profiler.flush()
+    with open(tmp_path / f"{capture_id}.json") as f:
+        capture = json.load(f)
+    assert capture["reason"] == "slow"
+    assert capture["request"] == {"loan_term": 30}
+
+
+def test_fast_unprofiled_request_is_not_captured(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path), slow_ms=1000)
+    assert profiler.record("calc", {}, {}, 0.01) is None
+
+
+def test_reprofiles_are_rate_limited(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path), slow_ms=1, reprofile_interval=60)
+    first = profiler.record("calc", {}, {}, 1.0)
+    second = profiler.record("calc", {}, {}, 1.0)
+    assert profiler.reprofile(first, slow_call, (1000,))
+    assert not profiler.reprofile(second, slow_call, (1000,))
+    profiler.flush()
+    with open(tmp_path / f"{first}.json") as f:
+        assert json.load(f)["reprofiled"]
+    assert os.path.exists(tmp_path / f"{first}.prof")
+    assert not os.path.exists(tmp_path / f"{second}.prof")
+
+
+def test_captures_are_dropped_when_the_queue_is_full(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path), slow_ms=1, queue_size=2)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    profiler._submit(block)
+    started.wait()
+    captured = [profiler.record("calc", {}, {}, 1.0) for _ in range(4)]
+    release.set()
+    profiler.flush()
+    assert captured[2:] == [None, None]
+    assert profiler.dropped == 2
+    assert sorted(os.listdir(tmp_path)) == sorted(f"{capture_id}.json" for capture_id in captured[:2])
+
+
+def test_rotation_keeps_the_newest_captures(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path), slow_ms=1, max_captures=3)
+    captured = [profiler.record("calc", {}, {}, 1.0) for _ in range(5)]
+    profiler.flush()
+    assert sorted(os.listdir(tmp_path)) == sorted(f"{capture_id}.json" for capture_id in captured[2:])
+
+
+def test_profile_dir_does_not_depend_on_the_working_directory():
+    assert os.path.isabs(profiling.PROFILE_DIR)
@@ -0,0 +1,135 @@
+import math
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import routes
+from api.calculator import simulate_amortization
+from api.optimizer import prepare_loan
+from api.refinance import RESET_MONTHS, analyze_refinance, history_end
+from api.schedule_query import add_months
+from main import app
+
+START = "2010-01-15"
+
+
+def weekly_history(first: date, last: date, rate=lambda day: 1.5 + math.sin(day.toordinal() / 200)):
+    """One fixing per week, oldest first, like EuriborAPI.get_historical_rates."""
+    history, day = [], first
+    while day <= last:
+        history.append({"date": day.isoformat(), "rate": round(rate(day), 3)})
+        day += timedelta(days=7)
+    return history
+
+
+def reference_fixing(history, start: date, month: int) -> float:
+    """Last fixing on or before the end of the calendar month of loan month month."""
+    month_key = add_months(start, month).isoformat()[:7]
+    return [row for row in history if row["date"][:7] <= month_key][-1]["rate"]
+
+
+def reference_switch(data, payment, history, tenor, new_spread, switch_month, switching_fee=0,
+                     switching_fee_rate=0, discount_rate=0):
+    """Breakeven, net savings and NPV of one switch date, month by month from the float schedule."""
+    rows, _, _, duration = simulate_amortization(dict(data, table_view="monthly"), payment)
+    start = date.fromisoformat(START)
+    period = RESET_MONTHS[tenor]
+    fees = switching_fee + switching_fee_rate / 100 * rows[switch_month - 1]["balance"]
+    cumulative, npv, breakeven = 0.0, -fees, None
+    for month in range(switch_month + 1, duration + 1):
+        reset = switch_month + (month - 1 - switch_month) // period * period
+        new_rate = (reference_fixing(history, start, reset) + new_spread) / 100 / 12
+        saving = rows[month - 1]["interest"] - rows[month - 2]["balance"] * new_rate
+        cumulative += saving
+        if breakeven is None and cumulative >= fees:
+            breakeven = month - switch_month
+        npv += saving / (1 + discount_rate / 100) ** ((month - switch_month) / 12)
+    return breakeven, cumulative - fees, npv
+
+
+@pytest.fixture
+def prepared(loan):
+    return prepare_loan(loan(loan_term=20))
+
+
+@pytest.mark.parametrize("tenor", ["1M", "6M", "12M"])
+def test_matches_a_scalar_resimulation_of_each_switch(prepared, tenor):
+    data, payment = prepared
+    history = weekly_history(date(2011, 1, 1), date(2031, 1, 31))
+    options = {"switching_fee": 1500, "switching_fee_rate": 0.5, "discount_rate": 3}
+    result = analyze_refinance(data, payment, history, tenor, 0.9, START, "2012-01-01", "2014-12-31", **options)
+
+    assert result["candidates"] == 36
+    assert result["rates_extrapolated_from"] is None
+    for candidate in result["results"][::11]:
+        breakeven, net_savings, npv = reference_switch(data, payment, history, tenor, 0.9,
+                                                       candidate["switch_month"], **options)
+        assert candidate["breakeven_month"] == breakeven
+        assert candidate["net_savings"] == pytest.approx(net_savings, rel=1e-9)
+        assert candidate["npv"] == pytest.approx(npv, rel=1e-9)
+
+
+def test_fees_are_charged_once_at_the_switch(prepared):
+    data, payment = prepared
+    history = weekly_history(date(2011, 1, 1), date(2031, 1, 31))
+    free = analyze_refinance(data, payment, history, "3M", 0.5, START, "2013-01-01", "2013-03-31")
+    charged = analyze_refinance(data, payment, history, "3M", 0.5, START, "2013-01-01", "2013-03-31",
+                                switching_fee=1000, switching_fee_rate=1, discount_rate=2)
+    for before, after in zip(free["results"], charged["results"]):
+        assert after["fees"] == pytest.approx(1000 + after["balance"] / 100)
+        assert after["net_savings"] == pytest.approx(before["net_savings"] - after["fees"])
+
+    unaffordable = analyze_refinance(data, payment, history, "3M", 0.5, START, "2013-01-01", "2013-03-31",
+                                     switching_fee=1e9)
+    assert all(r["breakeven_month"] is None for r in unaffordable["results"])
+
+
+def test_same_rate_saves_nothing(prepared):
+    # The current loan pays 3% + 1% spread; EURIBOR at 3% with the same spread changes nothing
+    data, payment = prepared
+    history = weekly_history(date(2011, 1, 1), date(2031, 1, 31), rate=lambda day: 3.0)
+    result = analyze_refinance(data, payment, history, "6M", 1.0, START, "2012-01-01", "2012-12-31",
+                               switching_fee=500, discount_rate=4)
+    for candidate in result["results"]:
+        assert candidate["breakeven_month"] is None
+        assert candidate["net_savings"] == pytest.approx(-500)
+        assert candidate["npv"] == pytest.approx(-500)
+
+
+def test_resets_after_the_history_are_flagged(prepared):
+    data, payment = prepared
+    history = weekly_history(date(2011, 1, 1), date(2015, 6, 30))
+    result = analyze_refinance(data, payment, history, "3M", 0.9, START, "2012-01-01", "2012-12-31")
+    assert result["rates_extrapolated_from"] == history[-1]["date"]
+    # The carried-forward fixing is still what the reference uses for later resets
+    candidate = result["results"][0]
+    _, net_savings, _ = reference_switch(data, payment, history, "3M", 0.9, candidate["switch_month"])
+    assert candidate["net_savings"] == pytest.approx(net_savings, rel=1e-9)
+
+
+def test_history_end_covers_the_loan_until_today(loan):
+    data = loan(loan_term=20)
+    assert history_end(data, START, "2012-12-31", today=date(2020, 5, 1)) == "2020-05-01"
+    assert history_end(data, START, "2012-12-31", today=date(2040, 5, 1)) == "2030-01-15"
+    assert history_end(data, START, "2031-12-31", today=date(2040, 5, 1)) == "2031-12-31"
+    with pytest.raises(ValueError):
+        history_end(data, "15/01/2010", "2012-12-31")
+
+
+def test_route_fetches_fixings_past_the_window(loan, monkeypatch):
+    requested = []
+
+    def fake_history(tenor, from_date, to_date):
+        requested.append((from_date, to_date))
+        return weekly_history(date.fromisoformat(from_date), date.fromisoformat(to_date))
+
+    monkeypatch.setattr(routes, "get_historical_euribor", fake_history)
+    body = dict(loan(loan_term=20), tenor="3M", new_spread=0.9, start_date=START,
+                from_date="2012-01-01", to_date="2012-12-31")
+    response = TestClient(app).post("/api/refinance/analyze", json=body)
+    assert response.status_code == 200
+    assert requested == [("2012-01-01", min(date.today(), date(2030, 1, 15)).isoformat())]
+    # While the loan runs past today, its later resets reuse the last fixing
+    if date.today() < date(2030, 1, 15):
+        assert response.json()["rates_extrapolated_from"] <= requested[0][1]
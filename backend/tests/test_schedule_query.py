@@ -0,0 +1,64 @@
+from datetime import date
+
+import pytest
+
+from api.calculator import simulate_schedule
+from api.optimizer import prepare_loan
+from api.schedule_query import ClosedFormSchedule, add_months, answer_queries
+from tools.crosscheck import random_loans
+
+LOANS = random_loans(60, seed=11)
+
+
+@pytest.mark.parametrize("index", range(len(LOANS)))
+def test_closed_form_matches_simulation(index):
+    data, monthly_payment = prepare_loan(LOANS[index])
+    columns, total_interest, _, duration = simulate_schedule(data, monthly_payment)
+    schedule = ClosedFormSchedule(data, monthly_payment)
+    tolerance = dict(rel=1e-7, abs=1e-3)
+
+    assert schedule.duration == duration
+    for month in sorted({1, 2, 12, duration // 3, duration // 2, duration - 1, duration}):
+        if month >= 1:
+            assert schedule.balance(month) == pytest.approx(columns["balance"][month - 1], **tolerance)
+    for year in range(1, (duration + 11) // 12 + 1):
+        expected = sum(columns["interest"][12 * (year - 1):12 * year])
+        assert schedule.interest_in_year(year) == pytest.approx(expected, **tolerance)
+    assert schedule.interest(1, duration) == pytest.approx(total_interest, **tolerance)
+
+
+def test_payoff_amount(loan):
+    data, monthly_payment = prepare_loan(loan())
+    schedule = ClosedFormSchedule(data, monthly_payment)
+    start = date(2020, 1, 31)
+    # On an installment date, the payoff is the balance after that installment
+    assert schedule.payoff_amount(add_months(start, 24), start) == pytest.approx(schedule.balance(24))
+    # Between installments, interest accrues by day
+    midway = schedule.payoff_amount(date(2022, 2, 14), start)
+    assert schedule.balance(24) < midway < schedule.balance(24) * (1 + schedule.r_fixed)
+    assert schedule.payoff_amount(date(2060, 1, 1), start) == 0
+
+
+def test_answer_queries(loan):
+    data, monthly_payment = prepare_loan(loan(extra_annual=2000))
+    columns, total_interest, _, duration = simulate_schedule(data, monthly_payment)
+    result = answer_queries(data, monthly_payment, [
+        {"type": "balance", "month": 100},
+        {"type": "interest", "from_month": 13, "to_month": 36},
+        {"type": "payoff", "date": "2021-01-01"},
+    ], start_date="2020-01-01")
+
+    assert result["duration"] == duration
+    assert result["total_interest"] == pytest.approx(total_interest)
+    balance, interest, payoff = (r["value"] for r in result["results"])
+    assert balance == pytest.approx(columns["balance"][99])
+    assert interest == pytest.approx(sum(columns["interest"][12:36]))
+    assert payoff == pytest.approx(columns["balance"][11])
+
+
+def test_invalid_queries(loan):
+    data, monthly_payment = prepare_loan(loan())
+    with pytest.raises(ValueError):
+        answer_queries(data, monthly_payment, [{"type": "principal", "month": 1}])
+    with pytest.raises(ValueError):
+        answer_queries(data, monthly_payment, [{"type": "payoff", "date": "2021-01-01"}])
@@ -0,0 +1,215 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from api import shared_state
+from api.shared_state import LazyBackend, MemoryBackend, RedisBackend, SharedMapping, SQLiteBackend
+
+TTL = 0.05
+
+
+class FakeRedisServer:
+    """In-process stand-in for a Redis server: one keyspace of bytes shared by every FakeRedis client."""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.lock = threading.Lock()
+
+    def expire(self):
+        now = time.time()
+        for key, expires_at in list(self.expires.items()):
+            if expires_at <= now:
+                self.data.pop(key, None)
+                del self.expires[key]
+
+
+class FakeRedis:
+    """The subset of the redis-py client RedisBackend uses, returning bytes like the real one."""
+
+    def __init__(self, server: FakeRedisServer):
+        self.server = server
+
+    def get(self, key):
+        self.server.expire()
+        return self.server.data.get(key)
+
+    def set(self, key, value, px=None):
+        self.server.data[key] = value.encode() if isinstance(value, str) else value
+        self.server.expires.pop(key, None)
+        if px is not None:
+            self.server.expires[key] = time.time() + px / 1000
+
+    def delete(self, key):
+        self.server.expire()
+        self.server.expires.pop(key, None)
+        return int(self.server.data.pop(key, None) is not None)
+
+    def incr(self, key):
+        self.server.expire()
+        with self.server.lock:
+            value = int(self.server.data.get(key, b"0")) + 1
+            self.server.data[key] = str(value).encode()
+            return value
+
+    def scan_iter(self, match):
+        self.server.expire()
+        # Redis glob: * and ? are wildcards unless escaped with a backslash
+        pattern = "".join(re.escape(token[1:]) if token.startswith("\\") else
+                          ".*" if token == "*" else "." if token == "?" else re.escape(token)
+                          for token in re.findall(r"\\.|.", match))
+        return [key.encode() for key in list(self.server.data) if re.fullmatch(pattern, key)]
+
+
+def redis_pair():
+    server = FakeRedisServer()
+    return RedisBackend(FakeRedis(server)), RedisBackend(FakeRedis(server))
+
+
+def sqlite_pair(tmp_path):
+    path = str(tmp_path / "state.db")
+    return SQLiteBackend(path), SQLiteBackend(path)
+
+
+@pytest.fixture(params=["redis", "sqlite"])
+def backends(request, tmp_path):
+    """Two backends on the same store, standing in for two workers."""
+    return redis_pair() if request.param == "redis" else sqlite_pair(tmp_path)
+
+
+def test_write_on_one_worker_invalidates_the_other(backends):
+    first = SharedMapping(backends[0], "rates", l1_ttl=TTL)
+    second = SharedMapping(backends[1], "rates", l1_ttl=TTL)
+    first["3M"] = 2.1
+    assert second["3M"] == 2.1
+
+    first["3M"] = 2.2
+    # Served from the second worker's L1 cache until its generation check is due
+    assert second["3M"] == 2.1
+    time.sleep(TTL * 1.5)
+    assert second["3M"] == 2.2
+    assert second.stats()["l1_hits"] == 1
+
+
+def test_delete_and_clear_reach_the_other_worker(backends):
+    first = SharedMapping(backends[0], "scenarios", l1_ttl=TTL)
+    second = SharedMapping(backends[1], "scenarios", l1_ttl=TTL)
+    first["a"] = {"loan_term": 30}
+    first["b"] = [1, 2]
+    assert second["a"] == {"loan_term": 30}
+
+    del first["a"]
+    assert sorted(second) == ["b"]
+    time.sleep(TTL * 1.5)
+    assert "a" not in second
+
+    first.clear()
+    time.sleep(TTL * 1.5)
+    assert "b" not in second
+    assert len(second) == 0
+
+
+def test_write_to_one_key_keeps_the_others_cached(backends):
+    first = SharedMapping(backends[0], "rates", l1_ttl=TTL)
+    second = SharedMapping(backends[1], "rates", l1_ttl=TTL)
+    first["1M"] = 1.9
+    first["3M"] = 2.1
+    assert (second["1M"], second["3M"]) == (1.9, 2.1)
+
+    first["3M"] = 2.2
+    time.sleep(TTL * 1.5)
+    assert second["1M"] == 1.9
+    assert second["3M"] == 2.2
+    # 1M passed its version check; only 3M went back to the backend
+    assert second.stats() == {"l1_hits": 1, "hits": 3, "misses": 0}
+
+
+def test_entries_expire_in_the_backend(backends):
+    first = SharedMapping(backends[0], "history", l1_ttl=TTL, ttl=TTL)
+    second = SharedMapping(backends[1], "history", l1_ttl=60, ttl=TTL)
+    first["3M"] = [2.1, 2.2]
+    assert second["3M"] == [2.1, 2.2]
+    time.sleep(TTL * 1.5)
+    # Neither worker serves it any longer, whatever its L1 TTL
+    assert "3M" not in first
+    assert "3M" not in second
+    assert list(second) == []
+
+
+def test_memory_backend_expires_keys():
+    backend = MemoryBackend(purge_interval=0)
+    backend.set("a", "1", ttl=TTL)
+    backend.set("b", "2")
+    assert backend.keys("") == ["a", "b"]
+    time.sleep(TTL * 1.5)
+    assert backend.get("a") is None
+    assert backend.keys("") == ["b"]
+    backend.set("c", "3")
+    assert sorted(backend._data) == ["b", "c"]
+
+
+def test_sqlite_purges_expired_rows(tmp_path):
+    path = str(tmp_path / "state.db")
+    backend = SQLiteBackend(path, purge_interval=0)
+    for i in range(10):
+        backend.set(f"history:{i}", "[]", ttl=TTL)
+    backend.set("scenarios:a", "{}")
+    time.sleep(TTL * 1.5)
+    assert backend.get("history:0") is None
+    assert not backend.delete("history:0")
+    backend.set("scenarios:b", "{}")
+    with sqlite3.connect(path) as connection:
+        assert [row[0] for row in connection.execute("SELECT key FROM state ORDER BY key")] == \
+            ["scenarios:a", "scenarios:b"]
+
+
+def test_sqlite_adds_the_expiry_column_to_old_files(tmp_path):
+    path = str(tmp_path / "state.db")
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        connection.execute("INSERT INTO state VALUES ('scenarios:a', '1')")
+    connection.close()
+    backend = SQLiteBackend(path)
+    assert backend.get("scenarios:a") == "1"
+    backend.set("history:3M", "[]", ttl=60)
+    assert backend.keys("") == ["history:3M", "scenarios:a"]
+
+
+def test_own_writes_keep_the_l1_cache(backends):
+    mapping = SharedMapping(backends[0], "rates", l1_ttl=60)
+    mapping["1M"] = 1.9
+    mapping["3M"] = 2.1
+    assert mapping["1M"] == 1.9
+    assert mapping.stats() == {"l1_hits": 1, "hits": 0, "misses": 0}
+
+
+def test_namespaces_do_not_overlap(backends):
+    plain = SharedMapping(backends[0], "rates", l1_ttl=0)
+    glob = SharedMapping(backends[1], "rat*", l1_ttl=0)
+    plain["3M"] = 2.1
+    glob["6M"] = 2.3
+    assert list(plain) == ["3M"]
+    assert list(glob) == ["6M"]
+
+
+def test_lazy_backend_is_created_on_first_use():
+    created = []
+
+    def factory():
+        created.append(MemoryBackend())
+        return created[-1]
+
+    backend = LazyBackend(factory)
+    mapping = SharedMapping(backend, "rates")
+    assert created == []
+    mapping["3M"] = 2.1
+    assert len(created) == 1
+    assert created[0].get("rates:3M") == "2.1"
+
+
+def test_sqlite_path_does_not_depend_on_the_working_directory():
+    assert os.path.isabs(shared_state.STATE_SQLITE_PATH)
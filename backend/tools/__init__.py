@@ -0,0 +1 @@
+"""Command-line tools for operating the Mortgage Calculator backend."""
@@ -0,0 +1,152 @@
+"""
+Cross-check the float amortization fast path against the exact integer-cent mode.
+
+Usage (from the backend directory):
+
+    python -m tools.crosscheck                       # 1000 random loans
+    python -m tools.crosscheck --count 5000 --seed 7
+    python -m tools.crosscheck request.json          # calc request bodies, e.g. from profiles/*.json
+    python -m tools.crosscheck --json report.json    # also write every loan's divergence
+
+For each loan both engines simulate the full monthly schedule; the report
+shows how far the float totals and balances drift from the cent-exact ones,
+how often the durations differ, and how far the float schedule's interest
+rows, rounded to the cent as displayed, are from its own total interest.
+The exact mode's rows always add up.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+from typing import Dict, List
+
+from api.calculator import loan_parameters, simulate_amortization
+from api.exact import amortize_cents
+from api.optimizer import prepare_loan
+
+LOAN_TYPES = [
+    {"loan_type": "fixed"},
+    {"loan_type": "full_variable"},
+    {"loan_type": "adjustable", "fixed_period": 5, "adjusted_interest_rate": 4.0},
+    {"loan_type": "adjustable", "fixed_period": 2, "adjusted_interest_rate": 1.5},
+]
+
+
+def random_loans(count: int, seed: int) -> List[Dict]:
+    """Random but plausible calculation requests with monthly_payment as the unknown."""
+    rng = random.Random(seed)
+    loans = []
+    for _ in range(count):
+        house_price = round(rng.uniform(50000, 1500000), 2)
+        loans.append(dict({
+            "house_price": house_price,
+            "down_payment": round(house_price * rng.uniform(0, 0.5), 2),
+            "loan_term": rng.choice([5, 10, 15, 20, 25, 30, 35, 40]),
+            "interest_rate": round(rng.uniform(-0.5, 6), 3),
+            "monthly_payment": None,
+            "bank_spread": round(rng.uniform(0, 2.5), 3),
+            "bank_insurances": rng.choice([0, 12.5, 25, 40.33]),
+            "extra_monthly": rng.choice([0, 0, 50, 125.55]),
+            "extra_annual": rng.choice([0, 0, 1000, 2500.75]),
+            "extra_fee_rate": rng.choice([0, 0.5, 2]),
+        }, **rng.choice(LOAN_TYPES)))
+    return loans
+
+
+def load_requests(paths: List[str]) -> List[Dict]:
+    """Calculation requests from JSON files: bare request bodies or profiling captures."""
+    loans = []
+    for path in paths:
+        with open(path) as f:
+            content = json.load(f)
+        if isinstance(content, dict) and "request" in content:
+            if content.get("kind") != "calc":
+                continue
+            content = content["request"]
+        loans.extend(content if isinstance(content, list) else [content])
+    return loans
+
+
+def crosscheck(loans: List[Dict]) -> List[Dict]:
+    """
+    Simulate every loan with both engines and measure their divergence.
+
+    Returns:
+        List[Dict]: One entry per loan with the cent-exact and float totals,
+        their differences and the largest per-month balance difference
+    """
+    prepared = [prepare_loan(dict(data, table_view="monthly")) for data in loans]
+
+    # One vectorized pass for the exact engine
+    cents = amortize_cents([loan_parameters(data, payment) for data, payment in prepared])
+
+    results = []
+    for i, (data, monthly_payment) in enumerate(prepared):
+        rows, total_interest, total_cost, duration = simulate_amortization(data, monthly_payment)
+        exact_duration = int(cents["duration"][i])
+        exact_balances = cents["balance"][:exact_duration, i] / 100
+        common = min(duration, exact_duration)
+        balance_diff = max((abs(rows[m]["balance"] - exact_balances[m]) for m in range(common)), default=0.0)
+        results.append({
+            "loan": data,
+            "duration": duration,
+            "exact_duration": exact_duration,
+            "total_interest": total_interest,
+            "exact_total_interest": int(cents["total_interest"][i]) / 100,
+            "total_cost": total_cost,
+            "exact_total_cost": int(cents["total_cost"][i]) / 100,
+            "interest_diff": total_interest - int(cents["total_interest"][i]) / 100,
+            "cost_diff": total_cost - int(cents["total_cost"][i]) / 100,
+            "max_balance_diff": float(balance_diff),
+            # What a reader of the float schedule sees: the rows shown to the cent don't add up to the total
+            "float_statement_gap": round(sum(round(row["interest"], 2) for row in rows) - round(total_interest, 2), 2),
+        })
+    return results
+
+
+def print_report(results: List[Dict], top: int) -> None:
+    print(f"{len(results)} loans")
+    mismatched = sum(1 for r in results if r["duration"] != r["exact_duration"])
+    print(f"  duration differs:        {mismatched} ({mismatched / max(len(results), 1):.1%})")
+    for key, label in (("interest_diff", "total interest"), ("cost_diff", "total cost"),
+                       ("max_balance_diff", "monthly balance"), ("float_statement_gap", "float row sum gap")):
+        values = [abs(r[key]) for r in results]
+        if values:
+            print(f"  {label + ':':<24} max {max(values):10.2f}  mean {statistics.mean(values):8.4f}  "
+                  f"median {statistics.median(values):8.4f}")
+
+    if top:
+        print("\nLargest total cost divergence:")
+        for r in sorted(results, key=lambda r: abs(r["cost_diff"]), reverse=True)[:top]:
+            loan = r["loan"]
+            print(f"  {loan.get('loan_type', 'fixed'):<13} {loan['loan_term']!s:>4}y "
+                  f"principal {loan['house_price'] - loan['down_payment']:>12.2f}  "
+                  f"cost diff {r['cost_diff']:+9.2f}  interest diff {r['interest_diff']:+9.2f}  "
+                  f"months {r['duration']} vs {r['exact_duration']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report divergence between float and exact-cents amortization")
+    parser.add_argument("requests", nargs="*", help="JSON files with calculation requests or profiling captures")
+    parser.add_argument("--count", type=int, default=1000, help="Random loans to check when no files are given")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the random loans")
+    parser.add_argument("--top", type=int, default=10, help="Worst loans to list")
+    parser.add_argument("--json", help="Write the per-loan results to this path")
+    args = parser.parse_args(argv)
+
+    loans = load_requests(args.requests) if args.requests else random_loans(args.count, args.seed)
+    if not loans:
+        parser.error("no calculation requests found")
+
+    results = crosscheck(loans)
+    print_report(results, args.top)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Replay captured requests written by the profiling subsystem (api/profiling.py).
+
+Usage (from the backend directory):
+
+    python -m tools.replay profiles/<capture>.json            # re-run locally, report timings
+    python -m tools.replay profiles/<capture>.json --profile  # ... under cProfile
+    python -m tools.replay --dir profiles --kind calc         # every calc capture
+    python -m tools.replay profiles/<capture>.json --url http://localhost:8000
+    python -m tools.replay --show profiles/<capture>.prof     # print a stored profile
+"""
+import argparse
+import cProfile
+import glob
+import io
+import json
+import os
+import pstats
+import statistics
+import sys
+import time
+import urllib.parse
+import urllib.request
+from typing import Callable, Dict, List
+
+from api.calculator import run_calculation_timed
+from api.euribor import EuriborAPI
+
+
+def load_capture(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def local_call(capture: Dict) -> Callable[[], None]:
+    """Build a zero-argument callable that re-runs a capture in process, bypassing caches."""
+    request = capture["request"]
+    kind = capture["kind"]
+    if kind == "calc":
+        return lambda: run_calculation_timed(request)
+    if kind == "euribor_latest":
+        return lambda: EuriborAPI().get_latest_rate(request["tenor"])
+    if kind == "euribor_history":
+        return lambda: EuriborAPI().get_historical_rates(request["tenor"], request["from_date"], request["to_date"])
+    raise ValueError(f"Unknown capture kind: {kind}")
+
+
+def remote_call(capture: Dict, base_url: str) -> Callable[[], None]:
+    """Build a zero-argument callable that re-sends a capture to a running server."""
+    request = capture["request"]
+    kind = capture["kind"]
+    if kind == "calc":
+        http_request = urllib.request.Request(
+            f"{base_url}/api/calc", data=json.dumps(request).encode(),
+            headers={"Content-Type": "application/json"})
+    elif kind == "euribor_latest":
+        http_request = urllib.request.Request(
+            f"{base_url}/api/euribor/latest?{urllib.parse.urlencode(request)}")
+    elif kind == "euribor_history":
+        http_request = urllib.request.Request(
+            f"{base_url}/api/euribor/history?{urllib.parse.urlencode(request)}")
+    else:
+        raise ValueError(f"Unknown capture kind: {kind}")
+    
+    def call():
+        with urllib.request.urlopen(http_request, timeout=60) as response:
+            response.read()
+    return call
+
+
+def print_profile(profile: pstats.Stats, top: int) -> None:
+    stream = io.StringIO()
+    profile.stream = stream
+    profile.sort_stats("cumulative").print_stats(top)
+    print(stream.getvalue())
+
+
+def replay(capture: Dict, call: Callable[[], None], repeat: int, profile: bool, top: int) -> List[float]:
+    """
+    Run a capture repeat times and print its timings next to the captured ones.
+    
+    Returns:
+        List[float]: Duration of each run in seconds
+    """
+    durations = []
+    profiler = cProfile.Profile() if profile else None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        call()
+        if profiler:
+            profiler.disable()
+        durations.append(time.perf_counter() - start)
+    
+    captured_ms = capture["duration"] * 1000
+    print(f"{capture['id']} ({capture['kind']}, {capture['reason']})")
+    print(f"  captured: {captured_ms:.3f} ms  stages: "
+          + ", ".join(f"{k}={v * 1000:.3f} ms" for k, v in capture.get("stages", {}).items()))
+    print(f"  replayed: median {statistics.median(durations) * 1000:.3f} ms, "
+          f"min {min(durations) * 1000:.3f} ms over {repeat} run(s)")
+    if profiler:
+        print_profile(pstats.Stats(profiler), top)
+    return durations
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay captured slow/profiled requests")
+    parser.add_argument("captures", nargs="*", help="Capture JSON files")
+    parser.add_argument("--dir", help="Replay every capture in this directory")
+    parser.add_argument("--kind", choices=["calc", "euribor_latest", "euribor_history"], help="Only replay captures of this kind")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per capture")
+    parser.add_argument("--profile", action="store_true", help="Profile local replays and print the hottest functions")
+    parser.add_argument("--top", type=int, default=25, help="Functions to show with --profile/--show")
+    parser.add_argument("--url", help="Send captures to this server instead of running them locally")
+    parser.add_argument("--show", help="Print a stored .prof artifact and exit")
+    args = parser.parse_args(argv)
+    
+    if args.show:
+        print_profile(pstats.Stats(args.show), args.top)
+        return 0
+    
+    paths = list(args.captures)
+    if args.dir:
+        paths.extend(sorted(glob.glob(os.path.join(args.dir, "*.json"))))
+    if not paths:
+        parser.error("no captures given")
+    
+    for path in paths:
+        capture = load_capture(path)
+        if args.kind and capture["kind"] != args.kind:
+            continue
+        call = remote_call(capture, args.url.rstrip("/")) if args.url else local_call(capture)
+        replay(capture, call, args.repeat, args.profile and not args.url, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,12 @@
 'use client';
 
-import React, { useState } from 'react';
-import { euriborService, calculatorService } from '../services/api';
+import React, { useEffect, useRef, useState } from 'react';
+import {
+  euriborService,
+  calculatorService,
+  createLiveCalculation,
+  LiveCalculationSession,
+} from '../services/api';
 
 interface FormData {
   housePrice: string;
@@ -22,6 +27,27 @@ interface CalculationResult {
   duration: number;
 }
 
+// Form field names mapped to the API's calculation fields
+const fieldNames: Record<keyof FormData, string> = {
+  housePrice: 'house_price',
+  downPayment: 'down_payment',
+  loanTerm: 'loan_term',
+  interestRate: 'interest_rate',
+  monthlyPayment: 'monthly_payment',
+  bankSpread: 'bank_spread',
+  loanType: 'loan_type',
+};
+
+const toFieldValue = (name: string, value: string) => {
+  if (name === 'loanType') {
+    return value;
+  }
+  if (name === 'bankSpread') {
+    return parseFloat(value) || 0;
+  }
+  return parseFloat(value) || null;
+};
+
 export default function MortgageCalculator() {
   const [formData, setFormData] = useState<FormData>({
     housePrice: '',
@@ -36,6 +62,17 @@ export default function MortgageCalculator() {
   const [result, setResult] = useState<CalculationResult | null>(null);
   const [euriborRate, setEuriborRate] = useState<number | null>(null);
   const [loading, setLoading] = useState(false);
+  const liveSession = useRef<LiveCalculationSession | null>(null);
+
+  // Live session: each edit is sent as a one-field delta and results stream back
+  useEffect(() => {
+    const session = createLiveCalculation(
+      (liveResult) => setResult(liveResult as CalculationResult),
+      () => setResult(null),
+    );
+    liveSession.current = session;
+    return () => session.close();
+  }, []);
 
   const handleInputChange = (e: React.ChangeEvent<HTMLInputElement | HTMLSelectElement>) => {
     const { name, value } = e.target;
@@ -43,6 +80,7 @@ export default function MortgageCalculator() {
       ...prev,
       [name]: value
     }));
+    liveSession.current?.update({ [fieldNames[name as keyof FormData]]: toFieldValue(name, value) });
   };
 
   const handleCalculate = async (e: React.FormEvent) => {
@@ -43,4 +43,118 @@ export const calculatorService = {
   },
 };
 
+export interface LiveCalculationResult {
+  calculated_field: string;
+  calculated_value: number;
+  total_borrowed: number | null;
+  total_interest: number;
+  total_cost: number;
+  duration: number;
+  amortization: any[];
+}
+
+export interface LiveCalculationSession {
+  update: (fields: Record<string, unknown>) => void;
+  reset: (fields: Record<string, unknown>) => void;
+  close: () => void;
+}
+
+// Opens a live recalculation session: field edits are sent as deltas and the
+// server replies with only the summary values and schedule rows that changed,
+// which are merged into the last full result here. If the connection drops,
+// it reconnects with exponential backoff and resends every field as a reset,
+// since the new server session starts empty. A refused recalculation (rate
+// limited) is retried the same way once the server's retry_after has passed.
+const LIVE_RECONNECT_MIN_MS = 500;
+const LIVE_RECONNECT_MAX_MS = 10000;
+
+export const createLiveCalculation = (
+  onResult: (result: LiveCalculationResult) => void,
+  onError: (detail: string) => void,
+): LiveCalculationSession => {
+  const url = `${API_BASE_URL.replace(/^http/, 'ws')}/api/calc/live`;
+  let socket: WebSocket;
+  let fields: Record<string, unknown> = {};
+  let current: LiveCalculationResult | null = null;
+  let attempts = 0;
+  let closed = false;
+  let timer: ReturnType<typeof setTimeout> | undefined;
+
+  const resync = () => {
+    if (socket.readyState === WebSocket.OPEN && Object.keys(fields).length > 0) {
+      socket.send(JSON.stringify({ type: 'reset', fields }));
+    }
+  };
+
+  const later = (action: () => void, delay: number) => {
+    clearTimeout(timer);
+    timer = setTimeout(action, delay);
+  };
+
+  const connect = () => {
+    socket = new WebSocket(url);
+
+    socket.onopen = () => {
+      attempts = 0;
+      // A new server session knows nothing: send the full inputs and rebuild the result
+      current = null;
+      resync();
+    };
+
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type === 'error') {
+        onError(message.detail);
+        if (message.retry_after !== undefined) {
+          later(resync, message.retry_after * 1000);
+        }
+        return;
+      }
+      const schedule = message.schedule;
+      let amortization: any[];
+      if (schedule.full) {
+        amortization = schedule.full;
+      } else {
+        amortization = (current?.amortization ?? []).slice(0, schedule.length);
+        schedule.rows.forEach(([index, row]: [number, any]) => {
+          amortization[index] = row;
+        });
+      }
+      current = { ...(current as LiveCalculationResult), ...message.summary, amortization };
+      onResult(current);
+    };
+
+    socket.onerror = () => onError('Live calculation connection failed');
+
+    socket.onclose = () => {
+      if (closed) {
+        return;
+      }
+      const delay = Math.min(LIVE_RECONNECT_MIN_MS * 2 ** attempts, LIVE_RECONNECT_MAX_MS);
+      attempts += 1;
+      later(connect, delay);
+    };
+  };
+
+  const send = (message: { type: string; fields: Record<string, unknown> }) => {
+    fields = message.type === 'reset' ? { ...message.fields } : { ...fields, ...message.fields };
+    if (socket.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify(message));
+    }
+    // Otherwise the edit is in fields and goes out with the reset sent on (re)connect
+  };
+
+  connect();
+
+  return {
+    update: (fields) => send({ type: 'delta', fields }),
+    reset: (fields) => send({ type: 'reset', fields }),
+    close: () => {
+      closed = true;
+      clearTimeout(timer);
+      socket.close();
+    },
+  };
+};
+
 export default api;
\ No newline at end of file